@@ -1,27 +1,67 @@
 from __future__ import annotations
 import os
+import selectors
 import subprocess
 import threading
 import time
 from abc import ABC, abstractmethod
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
 
-from ..models import MinerDefinition, MinerMetrics
+from ..exit_cause import ExitCause, ExitPatterns, classify
+from ..logging_setup import get_logger
+from ..logwriter import LogWriterOptions, MinerLogWriter
+from ..models import MinerDefinition
+from ..profiling import timings
+from ..shares import ShareAnalytics
+from ..state import MinerStats
 from ..utils import now_seconds, ensure_executable
 
 
+# Recent stdout/stderr lines kept for exit classification
+OUTPUT_TAIL_LINES = 20
+# How long start() waits for the previous process's pump (e.g. inside a telemetry poll)
+PUMP_EXIT_TIMEOUT_SEC = 5.0
+
+HASHRATE_SCALE = {"h": 1.0, "kh": 1e3, "mh": 1e6, "gh": 1e9}
+
+
+def scale_hashrate(value: str, unit: str) -> float:
+    return float(value) * HASHRATE_SCALE.get(unit.lower(), 1.0)
+
+
 class MinerAdapter(ABC):
-    def __init__(self, definition: MinerDefinition, log_dir: str) -> None:
+    # Expected hashes per unit of share difficulty reported by this miner
+    share_diff_multiplier: float = 1.0
+    # Miner-specific (category, regex) pairs checked before exit_cause.PATTERNS
+    exit_patterns: ExitPatterns = ()
+    # Reports a hashrate on a schedule, so its silence means a stall (see health.PerformanceHealth)
+    reports_periodically: bool = False
+
+    def __init__(self, definition: MinerDefinition, log_dir: str, log_options: Optional[LogWriterOptions] = None) -> None:
         self.definition = definition
         self.log_dir = log_dir
         os.makedirs(self.log_dir, exist_ok=True)
+        # Writers outlive individual processes; they reopen lazily after close()
+        self.stdout_log = MinerLogWriter(os.path.join(self.log_dir, f"{definition.id}.out.log"), log_options)
+        self.stderr_log = MinerLogWriter(os.path.join(self.log_dir, f"{definition.id}.err.log"), log_options)
         self.process: Optional[subprocess.Popen] = None
-        self.metrics: MinerMetrics = MinerMetrics(id=definition.id)
+        # cgroup.procs of the miner's cgroup v2 leaf, set by MinerManager; None = nice/affinity only
+        self.cgroup_procs: Optional[str] = None
+        self.logger = get_logger(__name__)
+        # Written only by the pump thread, one seqlock section per line; read via snapshot()
+        self.metrics = MinerStats()
+        # Pool the next start() launches against; chosen by MinerManager from definition.endpoints()
+        self.active_pool: Optional[str] = next(iter(definition.endpoints()), None)
+        self.shares = ShareAnalytics(diff_to_hashes=self.diff_multiplier())
         self.last_start_time: float = 0.0
+        self.output_tail: Deque[str] = deque(maxlen=OUTPUT_TAIL_LINES)
         self.restarts: int = 0
-        self._stdout_thread: Optional[threading.Thread] = None
-        self._stderr_thread: Optional[threading.Thread] = None
+        self._pump_thread: Optional[threading.Thread] = None
+        # Replaced per process: a late pump only ever sees its own, already set, event
         self._stop_event = threading.Event()
+        # Serializes start()/stop() of this miner; MinerManager spawns outside its own lock
+        self._proc_lock = threading.Lock()
 
     @abstractmethod
     def build_command(self) -> List[str]:
@@ -31,75 +71,220 @@ class MinerAdapter(ABC):
     def parse_stdout_line(self, line: str) -> None:
         ...
 
+    def build_bench_command(self, threads: Optional[int], seconds: float, print_interval: int, size: str = "1M") -> List[str]:
+        """Command line for the miner's own offline benchmark; no pool arguments."""
+        raise NotImplementedError(f"{self.definition.type} has no offline benchmark mode")
+
+    def parse_bench_line(self, line: str) -> Optional[float]:
+        """Final H/s reported at the end of a benchmark, if ``line`` carries it."""
+        return None
+
+    def diff_multiplier(self) -> float:
+        return self.definition.share_diff_multiplier or self.share_diff_multiplier
+
     def preflight(self) -> None:
         if not os.path.exists(self.definition.executable):
             raise FileNotFoundError(f"Executable not found: {self.definition.executable}")
         ensure_executable(self.definition.executable)
 
     def start(self) -> None:
+        with self._proc_lock:
+            self._start_locked()
+
+    def _start_locked(self) -> None:
         if self.process and self.process.poll() is None:
             return
+        self._retire_pump()
         self.preflight()
         cmd = self.build_command()
-        stdout_path = os.path.join(self.log_dir, f"{self.definition.id}.out.log")
-        stderr_path = os.path.join(self.log_dir, f"{self.definition.id}.err.log")
-        stdout_f = open(stdout_path, "a", buffering=1, encoding="utf-8")
-        stderr_f = open(stderr_path, "a", buffering=1, encoding="utf-8")
         env = os.environ.copy()
         # Apply per-miner environment overrides
         for k, v in (self.definition.env or {}).items():
             env[str(k)] = str(v)
-        self.process = subprocess.Popen(
+        try:
+            self.process = self._spawn(cmd, env, self.cgroup_procs)
+        except subprocess.SubprocessError as e:
+            if not self.cgroup_procs:
+                raise
+            # Joining the cgroup failed in the child (e.g. delegation revoked): run unconfined
+            self.logger.warning(
+                f"cgroup placement failed for {self.definition.id}, starting without it: {e}",
+                extra={"miner_id": self.definition.id},
+            )
+            self.cgroup_procs = None
+            self.process = self._spawn(cmd, env, None)
+        self._verify_placement()
+        self.last_start_time = now_seconds()
+        self.shares.diff_to_hashes = self.diff_multiplier()
+        self.shares.reset(self.last_start_time)
+        self.output_tail.clear()
+        self._stop_event = threading.Event()
+        self._pump_thread = threading.Thread(
+            target=self._pump,
+            args=(self.process, self._stop_event, self.open_telemetry()),
+            name=f"pump-{self.definition.id}",
+            daemon=True,
+        )
+        self._pump_thread.start()
+
+    def _retire_pump(self) -> None:
+        """Wait for the previous process's pump, so ``metrics`` never has two writers."""
+        t = self._pump_thread
+        if not t or not t.is_alive() or t is threading.current_thread():
+            return
+        # The process may have exited on its own, with its pipes still held open by a child
+        self._stop_event.set()
+        t.join(timeout=PUMP_EXIT_TIMEOUT_SEC)
+        if t.is_alive():
+            raise RuntimeError(f"output reader of the previous {self.definition.id} process is still running")
+
+    def _spawn(self, cmd: List[str], env: Dict[str, str], cgroup_procs: Optional[str]) -> subprocess.Popen:
+        return subprocess.Popen(
             cmd,
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             cwd=os.getcwd(),
             env=env,
-            text=True,
-            bufsize=1,
+            bufsize=0,
+            preexec_fn=self._child_setup(cgroup_procs),
         )
-        # Apply niceness and CPU affinity if configured
-        try:
-            if self.definition.nice is not None and self.process and self.process.pid:
-                os.nice(0)  # ensure we can call
+
+    def _child_setup(self, cgroup_procs: Optional[str]):
+        """Placement applied in the child between fork and exec, so no miner thread escapes it."""
+        nice = self.definition.nice
+        cpus = [int(c) for c in self.definition.cpu_affinity or []]
+        if not cgroup_procs and nice is None and not cpus:
+            return None
+
+        def _setup() -> None:
+            # Only raw os calls here: the child of a threaded parent must not take Python locks
+            if cgroup_procs:
+                fd = os.open(cgroup_procs, os.O_WRONLY)
                 try:
-                    os.setpriority(os.PRIO_PROCESS, self.process.pid, int(self.definition.nice))
-                except AttributeError:
+                    os.write(fd, b"0")
+                finally:
+                    os.close(fd)
+            # Also with a cgroup: cpuset may not be delegated, and within one it is a no-op
+            if cpus and hasattr(os, "sched_setaffinity"):
+                try:
+                    os.sched_setaffinity(0, cpus)
+                except OSError:
                     pass
-            if self.definition.cpu_affinity and self.process and self.process.pid:
+            if nice is not None:
                 try:
-                    import psutil  # type: ignore
-                    ps = psutil.Process(self.process.pid)
-                    ps.cpu_affinity(list(map(int, self.definition.cpu_affinity)))
-                except Exception:
+                    os.setpriority(os.PRIO_PROCESS, 0, int(nice))
+                except OSError:
                     pass
-        except Exception:
+
+        return _setup
+
+    def _verify_placement(self) -> None:
+        # Affinity/nice errors can't be reported from the child; check the result instead
+        pid = self.process.pid
+        d = self.definition
+        try:
+            if d.cpu_affinity and hasattr(os, "sched_getaffinity"):
+                want = {int(c) for c in d.cpu_affinity}
+                got = os.sched_getaffinity(pid)
+                if got != want:
+                    self.logger.warning(
+                        f"cpu_affinity for {d.id} not applied: wanted {sorted(want)}, got {sorted(got)}",
+                        extra={"miner_id": d.id},
+                    )
+            if d.nice is not None and os.getpriority(os.PRIO_PROCESS, pid) != int(d.nice):
+                self.logger.warning(
+                    f"nice {d.nice} for {d.id} not applied (raising priority needs CAP_SYS_NICE)",
+                    extra={"miner_id": d.id},
+                )
+        except OSError:
+            # Already exited; update_statuses() reports that
             pass
-        self.last_start_time = now_seconds()
-        self._stop_event.clear()
-        self._stdout_thread = threading.Thread(target=self._pump, args=(self.process.stdout, stdout_f), daemon=True)
-        self._stderr_thread = threading.Thread(target=self._pump, args=(self.process.stderr, stderr_f), daemon=True)
-        self._stdout_thread.start()
-        self._stderr_thread.start()
 
-    def _pump(self, stream, file_obj):
+    def _pump(self, process: subprocess.Popen, stop_event: threading.Event, telemetry: Any) -> None:
+        """Read both pipes from one thread, so the parser (and ``metrics``) has a single writer."""
+        parse_hist = timings.histogram("adapter.parse")
+        perf = time.perf_counter
+        sel = selectors.DefaultSelector()
+        # fd -> [log writer, partial last line]
+        for stream, writer in ((process.stdout, self.stdout_log), (process.stderr, self.stderr_log)):
+            sel.register(stream.fileno(), selectors.EVENT_READ, [writer, b""])
+        timeout = 0.5
         try:
-            for line in iter(stream.readline, ''):
-                file_obj.write(line)
-                self.parse_stdout_line(line)
-                if self._stop_event.is_set():
-                    break
+            while sel.get_map() and not stop_event.is_set():
+                for key, _ in sel.select(timeout=timeout):
+                    pending = key.data
+                    chunk = os.read(key.fd, 65536)
+                    if chunk:
+                        lines = (pending[1] + chunk).split(b"\n")
+                        pending[1] = lines.pop()
+                    else:
+                        # EOF: flush a final unterminated line
+                        sel.unregister(key.fd)
+                        lines = [pending[1]] if pending[1] else []
+                    writer = pending[0]
+                    for raw in lines:
+                        line = raw.rstrip(b"\r").decode("utf-8", "replace") + "\n"
+                        writer.write(line)
+                        self.output_tail.append(line)
+                        t0 = perf()
+                        with self.metrics:
+                            self.parse_stdout_line(line)
+                        parse_hist.observe(perf() - t0)
+                wait = self.poll_telemetry(telemetry)
+                timeout = 0.5 if wait is None else max(0.0, min(0.5, wait))
         finally:
-            try:
-                stream.close()
-            except Exception:
-                pass
-            try:
-                file_obj.flush(); file_obj.close()
-            except Exception:
-                pass
+            self.close_telemetry(process, telemetry)
+            sel.close()
+            for stream in (process.stdout, process.stderr):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+            self.stdout_log.flush()
+            self.stderr_log.flush()
+
+    def open_telemetry(self) -> Any:
+        """Telemetry state of the process just spawned, owned by its pump from here on.
+
+        It is handed to poll_telemetry() and close_telemetry() rather than kept on the
+        adapter, so a pump outliving its process never touches the next one's.
+        """
+        return None
+
+    def poll_telemetry(self, telemetry: Any) -> Optional[float]:
+        """Called by the pump thread after each read; returns seconds until it wants to run again.
+
+        Adapters with a side channel (e.g. a miner API) query it here, so ``metrics`` keeps
+        a single writer. None: no telemetry beyond the output streams.
+        """
+        return None
+
+    def close_telemetry(self, process: subprocess.Popen, telemetry: Any) -> None:
+        """Called when the pump for ``process`` ends."""
+
+    def classify_exit(self, oom_killed: bool = False, drain_timeout: float = 0.2) -> Optional[ExitCause]:
+        """Why the last process exited; None while it runs (or never ran)."""
+        if not self.process or self.process.poll() is None:
+            return None
+        # Let the pump read the final lines, which usually carry the reason
+        t = self._pump_thread
+        if t and t.is_alive() and t is not threading.current_thread():
+            t.join(timeout=drain_timeout)
+        return classify(self.process.returncode, list(self.output_tail), self.exit_patterns, oom_killed)
+
+    def flush_logs(self) -> None:
+        self.stdout_log.flush()
+        self.stderr_log.flush()
+
+    def close_logs(self) -> None:
+        self.stdout_log.close()
+        self.stderr_log.close()
 
     def stop(self) -> None:
+        with self._proc_lock:
+            self._stop_locked()
+
+    def _stop_locked(self) -> None:
         self._stop_event.set()
         if self.process and self.process.poll() is None:
             try:
@@ -112,6 +297,11 @@ class MinerAdapter(ABC):
                     self.process.kill()
             except Exception:
                 pass
+        t = self._pump_thread
+        if t and t.is_alive() and t is not threading.current_thread():
+            t.join(timeout=1.0)
+        self.stdout_log.close()
+        self.stderr_log.close()
         self.process = None
 
     def status(self) -> str:
@@ -0,0 +1,140 @@
+from __future__ import annotations
+import select
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+
+def parse_reply(text: str) -> List[Dict[str, str]]:
+    """cpuminer API reply -> records: "A=1;B=x|A=2;B=y|" -> [{"A": "1", "B": "x"}, {"A": "2", "B": "y"}]."""
+    records: List[Dict[str, str]] = []
+    for chunk in text.strip().strip("\x00").split("|"):
+        rec: Dict[str, str] = {}
+        for field in chunk.split(";"):
+            key, sep, value = field.partition("=")
+            if sep and key.strip():
+                rec[key.strip()] = value.strip()
+        if rec:
+            records.append(rec)
+    return records
+
+
+def _num(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value not in (None, "") else None
+    except ValueError:
+        return None
+
+
+def summary_values(rec: Dict[str, str]) -> Dict[str, Any]:
+    """Fields of a ``summary`` record, in MinerMetrics units (H/s, counts, °C)."""
+    out: Dict[str, Any] = {}
+    hs = _num(rec.get("HS"))
+    if hs is None and _num(rec.get("KHS")) is not None:
+        hs = _num(rec.get("KHS")) * 1e3
+    out["hashrate_hs"] = hs
+    for key, name in (("ACC", "accepted"), ("REJ", "rejected"), ("STALE", "stale")):
+        v = _num(rec.get(key))
+        if v is not None:
+            out[name] = int(v)
+    temp = _num(rec.get("TEMP"))
+    # 0 means "no sensor"
+    out["temperature_c"] = temp if temp else None
+    extra: Dict[str, Any] = {}
+    for key, name in (("DIFF", "difficulty"), ("UPTIME", "api_uptime_sec"), ("SOL", "solved"), ("FREQ", "cpu_freq_khz")):
+        v = _num(rec.get(key))
+        if v is not None:
+            extra[name] = v
+    for key, name in (("ALGO", "algo"), ("VER", "version"), ("URL", "pool")):
+        if rec.get(key):
+            extra[name] = rec[key]
+    out["extra"] = extra
+    return out
+
+
+def thread_rates(records: List[Dict[str, str]]) -> Dict[str, float]:
+    """``threads`` records -> {cpu index: H/s}; builds report H/s, kH/s or KHS."""
+    rates: Dict[str, float] = {}
+    for rec in records:
+        cpu = rec.get("CPU")
+        if cpu is None:
+            continue
+        for key, scale in (("H/s", 1.0), ("kH/s", 1e3), ("KHS", 1e3)):
+            v = _num(rec.get(key))
+            if v is not None:
+                rates[cpu] = v * scale
+                break
+    return rates
+
+
+class CpuMinerApiClient:
+    """Client for cpuminer-opt's text API (``-b host:port``).
+
+    The connection is kept open and reused while the server allows it. cpuminer-opt itself
+    closes after every reply, which is detected once (EOF after a reply, or a reused socket
+    found closed); from then on each request reconnects, a loopback connect well under a
+    millisecond.
+    """
+
+    def __init__(self, host: str, port: int, timeout: float = 1.0) -> None:
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.persistent = True
+        self._sock: Optional[socket.socket] = None
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def close(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def request(self, command: str) -> str:
+        reused = self._sock is not None
+        if self._sock is None:
+            self._sock = self._connect()
+        try:
+            reply, closed = self._exchange(self._sock, command)
+        except OSError:
+            self.close()
+            if not reused:
+                raise
+            reply, closed = "", True
+        if not reply and reused:
+            # The kept-open socket was closed by the server meanwhile: retry once on a new one
+            self.persistent = False
+            self.close()
+            self._sock = self._connect()
+            reply, closed = self._exchange(self._sock, command)
+        if closed:
+            self.persistent = False
+            self.close()
+        elif not self.persistent:
+            self.close()
+        return reply
+
+    def _exchange(self, sock: socket.socket, command: str):
+        sock.sendall(command.encode())
+        buf = b""
+        deadline = time.monotonic() + self.timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise socket.timeout(f"no complete reply to {command!r}")
+            sock.settimeout(remaining)
+            chunk = sock.recv(65536)
+            if not chunk:
+                return buf.decode("utf-8", "replace"), True
+            buf += chunk
+            # Replies end with "|"; an EOF already queued behind it means one reply per connection
+            if buf.rstrip(b"\x00\r\n ").endswith(b"|"):
+                if select.select([sock], [], [], 0)[0] and not sock.recv(1, socket.MSG_PEEK):
+                    return buf.decode("utf-8", "replace"), True
+                return buf.decode("utf-8", "replace"), False
@@ -1,39 +1,235 @@
 from __future__ import annotations
-from typing import List
+from collections import deque
+from typing import Deque, List, Optional, Set
 import re
+import threading
+import time
 
+from ..exit_cause import CONFIG, CONNECTIVITY
 from ..models import MinerDefinition
-from .base import MinerAdapter
+from ..profiling import timings
+from ..shares import ACCEPTED, REJECTED, STALE
+from ..utils import find_free_port
+from .base import MinerAdapter, scale_hashrate
+from .cpuminer_api import CpuMinerApiClient, parse_reply, summary_values, thread_rates
+
+
+_HASHRATE_RE = re.compile(r"(\d+\.?\d*)\s*(H|kH|MH|GH)/s", re.IGNORECASE)
+_THREAD_RE = re.compile(r"CPU\s*#(\d+):\s*(\d+\.?\d*)\s*(H|kH|MH|GH)/s", re.IGNORECASE)
+# "12 Submitted Diff 0.0012345, Block 123456, Job 1a2b"
+_SUBMIT_RE = re.compile(r"Submitted\s+Diff\s+([0-9.eE+-]+)", re.IGNORECASE)
+# The current share's outcome is spelled out, the other counters are abbreviated:
+# "12 Accepted 11 S0 R1 B0, 3.212 sec (31ms)", "13 A11 Stale 1 R1 B0, ...", "14 A11 S1 Rejected 2 B0, ..."
+_RESULT_RE = re.compile(
+    r"\b(?:(Accepted)\s+|A)(\d+)\s+(?:(Stale)\s+|S)(\d+)\s+(?:(Rejected)\s+|R)(\d+)\s+(?:BLOCK SOLVED\s+|B)(\d+)"
+)
+_LATENCY_RE = re.compile(r"\((\d+)\s*ms\)")
+# Older cpuminer builds: "accepted: 1/1 (diff 0.001), 2.50 kH/s yes!"
+_LEGACY_SHARE_RE = re.compile(r"accepted:\s*(\d+)/(\d+)", re.IGNORECASE)
+_LEGACY_DIFF_RE = re.compile(r"diff\s+([0-9.eE+-]+)", re.IGNORECASE)
+
+# Stratum difficulty is in Bitcoin units (2**32 hashes) except where cpuminer applies a
+# target factor; override with MinerDefinition.share_diff_multiplier for anything else.
+_DIFF_FACTOR_65536 = ("scrypt", "yescrypt", "yespower")
+
+# Fatal messages specific to this miner, see exit_cause.classify
+_EXIT_PATTERNS = (
+    (CONFIG, re.compile(
+        r"no algo(?:rithm)? specified|unknown algo(?:rithm)? parameter|try [`']?cpuminer --help", re.IGNORECASE
+    )),
+    (CONNECTIVITY, re.compile(r"retry after \d+ seconds|json_rpc_call failed", re.IGNORECASE)),
+)
+
+# cpuminer-opt's default API port; instances get the next free ones
+API_PORT_BASE = 4048
+_api_ports_lock = threading.Lock()
+_api_ports: Set[int] = set()
+
+
+def _reserve_api_port() -> int:
+    # find_free_port only checks bind-ability; the set keeps concurrent starts apart
+    with _api_ports_lock:
+        start = API_PORT_BASE
+        while True:
+            port = find_free_port(start)
+            if port not in _api_ports:
+                _api_ports.add(port)
+                return port
+            start = port + 1
+
+
+def _release_api_port(port: int) -> None:
+    with _api_ports_lock:
+        _api_ports.discard(port)
+
+
+class _ApiPoller:
+    """API client and poll schedule of one miner process; used by that process's pump only."""
+
+    __slots__ = ("client", "next_poll")
+
+    def __init__(self, client: CpuMinerApiClient, next_poll: float) -> None:
+        self.client = client
+        self.next_poll = next_poll
+
+    def close(self) -> None:
+        self.client.close()
+        _release_api_port(self.client.port)
 
 
 class CpuMinerOptAdapter(MinerAdapter):
+    share_diff_multiplier: float = float(2 ** 32)
+    exit_patterns = _EXIT_PATTERNS
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._pending_diffs: Deque[float] = deque(maxlen=64)
+        # API telemetry (definition.api_telemetry) of the command being built, until start() hands it to the pump
+        self._api: Optional[_ApiPoller] = None
+
+    @property
+    def reports_periodically(self) -> bool:
+        # Without the API, the hashrate is printed only along with a share
+        return self.definition.api_telemetry
+
+    def diff_multiplier(self) -> float:
+        if self.definition.share_diff_multiplier:
+            return self.definition.share_diff_multiplier
+        algo = (self.definition.algo or "").lower()
+        if algo.startswith(_DIFF_FACTOR_65536):
+            return self.share_diff_multiplier / 65536.0
+        return self.share_diff_multiplier
+
     def build_command(self) -> List[str]:
         d: MinerDefinition = self.definition
         cmd: List[str] = [d.executable]
         if d.algo:
             cmd += ["-a", d.algo]
-        if d.pool_url:
-            cmd += ["-o", d.pool_url]
+        pool = self.active_pool or d.pool_url
+        if pool:
+            cmd += ["-o", pool]
         if d.wallet:
             cmd += ["-u", d.wallet]
         if d.password:
             cmd += ["-p", d.password]
         if d.threads and d.threads != "auto":
             cmd += ["-t", str(d.threads)]
+        if d.api_telemetry:
+            self._close_api()
+            # First poll once the miner had a moment to bind
+            self._api = _ApiPoller(
+                CpuMinerApiClient("127.0.0.1", _reserve_api_port()), time.monotonic() + min(1.0, d.api_interval_sec)
+            )
+            cmd += ["-b", f"127.0.0.1:{self._api.client.port}"]
         cmd += d.extra_args or []
         return cmd
 
+    def open_telemetry(self) -> Optional[_ApiPoller]:
+        poller, self._api = self._api, None
+        return poller
+
+    def poll_telemetry(self, poller: Optional[_ApiPoller]) -> Optional[float]:
+        if poller is None:
+            return None
+        api = poller.client
+        now = time.monotonic()
+        if now < poller.next_poll:
+            return poller.next_poll - now
+        interval = max(0.2, float(self.definition.api_interval_sec))
+        poller.next_poll = now + interval
+        status = dict(self.metrics.extra.get("api") or {"port": api.port, "polls": 0, "failures": 0})
+        t0 = time.perf_counter()
+        try:
+            summary = parse_reply(api.request("summary"))
+            threads = thread_rates(parse_reply(api.request("threads")))
+        except OSError as e:
+            # Refused until the miner has bound the port, and for a while after it dies
+            status.update(ok=False, error=str(e) or type(e).__name__, failures=status["failures"] + 1)
+            with self.metrics:
+                self.metrics.extra["api"] = status
+            return interval
+        elapsed = time.perf_counter() - t0
+        timings.observe("adapter.api_poll", elapsed)
+        status.update(
+            ok=bool(summary), error=None if summary else "empty summary", polls=status["polls"] + 1,
+            latency_ms=round(elapsed * 1000.0, 3), last_poll_ts=time.time(), persistent=api.persistent,
+        )
+        with self.metrics:
+            if summary:
+                values = summary_values(summary[0])
+                self.metrics.extra.update(values.pop("extra"))
+                for name, value in values.items():
+                    if value is not None or name == "temperature_c":
+                        setattr(self.metrics, name, value)
+            if threads:
+                self.metrics.extra["threads_hs"] = threads
+                if self.metrics.hashrate_hs is None:
+                    self.metrics.hashrate_hs = sum(threads.values())
+            self.metrics.extra["api"] = status
+        return interval
+
+    def close_telemetry(self, process, poller: Optional[_ApiPoller]) -> None:
+        if poller is not None:
+            poller.close()
+
+    def _close_api(self) -> None:
+        # A client built for a start that never spawned
+        poller, self._api = self._api, None
+        if poller is not None:
+            poller.close()
+
+    def build_bench_command(self, threads: Optional[int], seconds: float, print_interval: int, size: str = "1M") -> List[str]:
+        # --benchmark hashes offline against a fake work unit; --time-limit bounds the run
+        d: MinerDefinition = self.definition
+        cmd: List[str] = [d.executable, "--benchmark", f"--time-limit={max(1, int(seconds))}"]
+        if d.algo:
+            cmd += ["-a", d.algo]
+        if threads:
+            cmd += ["-t", str(threads)]
+        return cmd
+
     def parse_stdout_line(self, line: str) -> None:
-        # Typical format: "[2023-..] accepted: 1/1 (diff ...), 2.50 kH/s"
-        m = re.search(r"(\d+\.?\d*)\s*(H|kH|MH|GH)/s", line)
-        if m:
-            val = float(m.group(1))
-            unit = m.group(2)
-            scale = {"H": 1.0, "kH": 1e3, "MH": 1e6, "GH": 1e9}.get(unit, 1.0)
-            from ..models import MinerMetrics
-            self.metrics.hashrate_hs = val * scale
-        if "accepted" in line.lower():
-            m2 = re.search(r"accepted:\s*(\d+)/(\d+)", line, re.IGNORECASE)
+        lower = line.lower()
+        if "submitted" in lower:
+            m = _SUBMIT_RE.search(line)
+            if m:
+                try:
+                    self._pending_diffs.append(float(m.group(1)))
+                except ValueError:
+                    pass
+                return
+        if "accepted" in lower or "rejected" in lower or "stale" in lower:
+            m = _RESULT_RE.search(line)
+            if m:
+                outcome = STALE if m.group(3) else REJECTED if m.group(5) else ACCEPTED
+                self.metrics.accepted = int(m.group(2))
+                self.metrics.stale = int(m.group(4))
+                self.metrics.rejected = int(m.group(6))
+                lat = _LATENCY_RE.search(line)
+                diff = self._pending_diffs.popleft() if self._pending_diffs else None
+                self.shares.record(outcome, difficulty=diff, latency_ms=float(lat.group(1)) if lat else None)
+                return
+        if "h/s" in lower:
+            t = _THREAD_RE.search(line)
+            if t:
+                threads = dict(self.metrics.extra.get("threads_hs") or {})
+                threads[t.group(1)] = scale_hashrate(t.group(2), t.group(3))
+                self.metrics.extra["threads_hs"] = threads
+            elif "net hash" not in lower and "network" not in lower:
+                # First rate on the line is the miner's own ("Miner TTF @ 2.5 kh/s ..., Net TTF @ ...")
+                m = _HASHRATE_RE.search(line)
+                if m:
+                    self.metrics.hashrate_hs = scale_hashrate(m.group(1), m.group(2))
+        if "accepted" in lower:
+            m2 = _LEGACY_SHARE_RE.search(line)
             if m2:
-                self.metrics.accepted = int(m2.group(1))
-                self.metrics.rejected = int(m2.group(2)) - int(m2.group(1))
+                accepted, total = int(m2.group(1)), int(m2.group(2))
+                prev = (self.metrics.accepted or 0) + (self.metrics.rejected or 0)
+                self.metrics.accepted = accepted
+                self.metrics.rejected = total - accepted
+                if total > prev:
+                    d = _LEGACY_DIFF_RE.search(line)
+                    self.shares.record(
+                        ACCEPTED if "yes" in lower else REJECTED,
+                        difficulty=float(d.group(1)) if d else None,
+                    )
@@ -1,19 +1,60 @@
 from __future__ import annotations
-from typing import List
+from typing import List, Optional
 import re
 
+from ..exit_cause import CONFIG, CONNECTIVITY
 from ..models import MinerDefinition
-from .base import MinerAdapter
+from ..shares import ACCEPTED, REJECTED, STALE
+from .base import MinerAdapter, scale_hashrate
+
+
+# "miner    speed 10s/60s/15m 4286.5 4290.1 n/a H/s max 4322.0 H/s"
+_SPEED_RE = re.compile(r"speed\s+10s/60s/15m\s+(\S+)\s+(\S+)\s+(\S+)\s+(H|kH|MH|GH)/s", re.IGNORECASE)
+_HASHRATE_RE = re.compile(r"(\d+\.?\d*)\s*(H|kH|MH|GH)/s")
+# "cpu      accepted (12/0) diff 120001 (48 ms)"
+# "cpu      rejected (12/1) diff 120001 "Low difficulty share" (48 ms)"
+_SHARE_RE = re.compile(
+    r"\b(accepted|rejected)\s+\((\d+)/(\d+)\)\s+diff\s+(\d+)(.*?)(?:\((\d+)\s*ms\))?\s*$",
+    re.IGNORECASE,
+)
+_LEGACY_SHARE_RE = re.compile(r"accepted:\s*(\d+)/(\d+)", re.IGNORECASE)
+_STALE_HINTS = ("stale", "expired", "job not found", "invalid job id")
+# "bench    benchmark finished in 35.123 seconds (hash sum = 0x...)"
+_BENCH_DONE_RE = re.compile(r"benchmark finished in\s+([0-9.]+)\s*s", re.IGNORECASE)
+_BENCH_SIZE_RE = re.compile(r"^(\d+)([KM])$", re.IGNORECASE)
+
+# Fatal messages specific to this miner, see exit_cause.classify
+_EXIT_PATTERNS = (
+    (CONFIG, re.compile(
+        r"no valid configuration found|no pool or pool url specified|xmrig: (?:unrecognized|invalid) option", re.IGNORECASE
+    )),
+    (CONNECTIVITY, re.compile(r"\bnet\s+.*\b(?:read|connect|dns) error", re.IGNORECASE)),
+)
+
+
+def _speed(value: str, unit: str) -> float | None:
+    try:
+        return scale_hashrate(value, unit)
+    except ValueError:
+        # "n/a" until the window has filled
+        return None
 
 
 class XMRigAdapter(MinerAdapter):
+    exit_patterns = _EXIT_PATTERNS
+    # "speed 10s/60s/15m" every print-time (60 s by default)
+    reports_periodically = True
+    # Hash count of the current --bench run, to turn its duration into H/s
+    _bench_hashes: Optional[int] = None
+
     def build_command(self) -> List[str]:
         d: MinerDefinition = self.definition
         cmd: List[str] = [d.executable]
         if d.algo:
             cmd += ["-a", d.algo]
-        if d.pool_url:
-            cmd += ["-o", d.pool_url]
+        pool = self.active_pool or d.pool_url
+        if pool:
+            cmd += ["-o", pool]
         if d.wallet:
             cmd += ["-u", d.wallet]
         if d.password:
@@ -25,21 +66,56 @@ class XMRigAdapter(MinerAdapter):
         cmd += d.extra_args or []
         return cmd
 
+    def build_bench_command(self, threads: Optional[int], seconds: float, print_interval: int, size: str = "1M") -> List[str]:
+        # --bench runs a fixed number of RandomX hashes offline (no --submit/--verify)
+        d: MinerDefinition = self.definition
+        m = _BENCH_SIZE_RE.match(size)
+        self._bench_hashes = int(m.group(1)) * (1000 if m.group(2).upper() == "K" else 1000000) if m else None
+        cmd: List[str] = [d.executable, f"--bench={size}", f"--print-time={max(1, print_interval)}", "--no-color"]
+        if d.algo:
+            cmd += ["-a", d.algo]
+        if threads:
+            cmd += ["-t", str(threads)]
+        return cmd
+
+    def parse_bench_line(self, line: str) -> Optional[float]:
+        m = _BENCH_DONE_RE.search(line)
+        if m and self._bench_hashes and float(m.group(1)) > 0:
+            return self._bench_hashes / float(m.group(1))
+        return None
+
     def parse_stdout_line(self, line: str) -> None:
-        # XMRig log samples include hashrate like "speed 3000.0 H/s" or "1.20 kH/s"
-        m = re.search(r"(\d+\.?\d*)\s*(H|kH|MH|GH)/s", line)
-        if m:
-            val = float(m.group(1))
-            unit = m.group(2)
-            scale = {"H": 1.0, "kH": 1e3, "MH": 1e6, "GH": 1e9}.get(unit, 1.0)
-            self.metrics.hashrate_hs = val * scale
-        # Accepted/rejected shares
-        if "accepted" in line.lower():
-            try:
-                # Example: "accepted: 1/1 (100%)"
-                m2 = re.search(r"accepted:\s*(\d+)/(\d+)", line, re.IGNORECASE)
-                if m2:
-                    self.metrics.accepted = int(m2.group(1))
-                    self.metrics.rejected = int(m2.group(2)) - int(m2.group(1))
-            except Exception:
-                pass
+        lower = line.lower()
+        if "h/s" in lower:
+            m = _SPEED_RE.search(line)
+            if m:
+                unit = m.group(4)
+                s10, s60, s15m = (_speed(m.group(i), unit) for i in (1, 2, 3))
+                if s10 is not None:
+                    self.metrics.hashrate_hs = s10
+                self.metrics.extra["hashrate_60s_hs"] = s60
+                self.metrics.extra["hashrate_15m_hs"] = s15m
+            else:
+                m = _HASHRATE_RE.search(line)
+                if m:
+                    self.metrics.hashrate_hs = scale_hashrate(m.group(1), m.group(2))
+        if "accepted" in lower or "rejected" in lower:
+            m2 = _SHARE_RE.search(line)
+            if m2:
+                if m2.group(1).lower() == "accepted":
+                    outcome = ACCEPTED
+                else:
+                    reason = m2.group(5).lower()
+                    outcome = STALE if any(h in reason for h in _STALE_HINTS) else REJECTED
+                latency = float(m2.group(6)) if m2.group(6) else None
+                self.shares.record(outcome, difficulty=float(m2.group(4)), latency_ms=latency)
+                self.metrics.accepted = int(m2.group(2))
+                # XMRig's reject count includes stale shares; report them apart, like cpuminer-opt
+                self.metrics.stale = self.shares.stale
+                self.metrics.rejected = max(0, int(m2.group(3)) - self.shares.stale)
+                return
+            # Older builds: "accepted: 1/1 (100%)"
+            m3 = _LEGACY_SHARE_RE.search(line)
+            if m3:
+                self.metrics.accepted = int(m3.group(1))
+                self.metrics.rejected = int(m3.group(2)) - int(m3.group(1))
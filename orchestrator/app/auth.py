@@ -1,41 +1,190 @@
 from __future__ import annotations
+import hmac
+import threading
 import time
-from typing import Callable, Dict
-from fastapi import Header, HTTPException, Request
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+from fastapi import Header, HTTPException, Request, Response
 
-# Simple token bucket per IP
+from .logging_setup import get_logger
+
+
+@dataclass
+class BucketSpec:
+    capacity: float = 120.0
+    refill_per_sec: float = 2.0
+
+
+@dataclass
+class RateLimitDecision:
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the requested cost is available again (0 when allowed)
+    retry_after: float
+
+    def headers(self) -> Dict[str, str]:
+        h = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            h["Retry-After"] = str(max(1, int(self.retry_after + 0.999)))
+        return h
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class _Shard:
+    __slots__ = ("lock", "entries", "evictions")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Tuple[str, str], _Bucket]" = OrderedDict()
+        # Counted per shard, under its own lock
+        self.evictions = 0
+
+
+# Token bucket per (bucket name, client key), LRU-bounded and sharded
 class RateLimiter:
-    def __init__(self, capacity: int = 60, refill_per_sec: float = 1.0):
-        self.capacity = capacity
-        self.tokens: Dict[str, float] = {}
-        self.updated_at: Dict[str, float] = {}
-        self.refill_per_sec = refill_per_sec
-
-    def allow(self, ip: str) -> bool:
-        now = time.time()
-        last = self.updated_at.get(ip, now)
-        tokens = min(
-            self.capacity,
-            self.tokens.get(ip, float(self.capacity)) + (now - last) * self.refill_per_sec,
-        )
-        if tokens < 1.0:
-            self.tokens[ip] = tokens
-            self.updated_at[ip] = now
-            return False
-        self.tokens[ip] = tokens - 1.0
-        self.updated_at[ip] = now
-        return True
+    def __init__(
+        self,
+        capacity: float = 60,
+        refill_per_sec: float = 1.0,
+        max_clients: int = 100_000,
+        shards: int = 16,
+        buckets: Optional[Dict[str, BucketSpec]] = None,
+    ):
+        self.buckets: Dict[str, BucketSpec] = {"default": BucketSpec(capacity, refill_per_sec)}
+        self.buckets.update(buckets or {})
+        self._shards: List[_Shard] = [_Shard() for _ in range(max(1, shards))]
+        # Per-shard cap; the least recently seen client is evicted first
+        self._shard_capacity = max(1, max_clients // len(self._shards))
+
+    @property
+    def capacity(self) -> float:
+        return self.buckets["default"].capacity
 
+    @property
+    def evictions(self) -> int:
+        return sum(s.evictions for s in self._shards)
+
+    def _shard(self, key: Tuple[str, str]) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def check(self, client: str, cost: float = 1.0, bucket: str = "default") -> RateLimitDecision:
+        spec = self.buckets.get(bucket) or self.buckets["default"]
+        key = (bucket, client)
+        shard = self._shard(key)
+        now = time.monotonic()
+        with shard.lock:
+            b = shard.entries.get(key)
+            if b is None:
+                b = _Bucket(spec.capacity, now)
+                shard.entries[key] = b
+                if len(shard.entries) > self._shard_capacity:
+                    shard.entries.popitem(last=False)
+                    shard.evictions += 1
+            else:
+                shard.entries.move_to_end(key)
+                b.tokens = min(spec.capacity, b.tokens + (now - b.updated_at) * spec.refill_per_sec)
+                b.updated_at = now
+            allowed = b.tokens >= cost
+            if allowed:
+                b.tokens -= cost
+                retry_after = 0.0
+            else:
+                retry_after = (cost - b.tokens) / spec.refill_per_sec if spec.refill_per_sec > 0 else 60.0
+            remaining = int(b.tokens)
+        return RateLimitDecision(allowed=allowed, limit=int(spec.capacity), remaining=remaining, retry_after=retry_after)
+
+    def allow(self, ip: str, cost: float = 1.0, bucket: str = "default") -> bool:
+        return self.check(ip, cost, bucket).allowed
+
+    def size(self) -> int:
+        return sum(len(s.entries) for s in self._shards)
+
+
+@dataclass
+class RoutePolicy:
+    # "METHOD /path/template" -> cost; unlisted routes cost default_cost
+    costs: Dict[str, float] = field(default_factory=dict)
+    # "METHOD /path/template" -> bucket name; unlisted routes use "default"
+    buckets: Dict[str, str] = field(default_factory=dict)
+    default_cost: float = 1.0
+
+    def resolve(self, request: Request) -> Tuple[float, str]:
+        route = request.scope.get("route")
+        path = getattr(route, "path", request.url.path)
+        key = f"{request.method} {path}"
+        return self.costs.get(key, self.default_cost), self.buckets.get(key, "default")
+
+
+DEFAULT_ROUTE_COSTS: Dict[str, float] = {
+    "POST /api/miners/{miner_id}/start": 5,
+    "POST /api/miners/{miner_id}/stop": 5,
+    "POST /api/miners/{miner_id}/restart": 10,
+    "POST /api/miners/all/start": 20,
+    "POST /api/miners/all/stop": 20,
+    "POST /api/groups/{group_id}/start": 10,
+    "POST /api/groups/{group_id}/stop": 10,
+    "POST /api/groups/{group_id}/restart": 20,
+    "POST /api/config/reload": 20,
+    "GET /api/logs/{miner_id}": 5,
+    "POST /api/bench/runs": 20,
+    "GET /api/debug/profile": 30,
+    "GET /api/debug/tracemalloc": 30,
+}
 
 rate_limiter = RateLimiter(capacity=120, refill_per_sec=2.0)
+route_policy = RoutePolicy(costs=dict(DEFAULT_ROUTE_COSTS))
+
+
+def configure_rate_limiting(cfg) -> None:
+    """Rebuild the module-level limiter and route policy from ``RateLimitConfig``."""
+    global rate_limiter, route_policy
+    buckets = {name: BucketSpec(**spec) for name, spec in (cfg.buckets or {}).items()}
+    rate_limiter = RateLimiter(
+        capacity=cfg.capacity,
+        refill_per_sec=cfg.refill_per_sec,
+        max_clients=cfg.max_clients,
+        shards=cfg.shards,
+        buckets=buckets,
+    )
+    costs = dict(DEFAULT_ROUTE_COSTS)
+    costs.update(cfg.route_costs or {})
+    route_buckets = dict(cfg.route_buckets or {})
+    default_cost = _clamp_cost("default_cost", cfg.default_cost, rate_limiter.buckets["default"])
+    for route, cost in costs.items():
+        bucket = route_buckets.get(route, "default")
+        costs[route] = _clamp_cost(route, cost, rate_limiter.buckets.get(bucket) or rate_limiter.buckets["default"])
+    route_policy = RoutePolicy(costs=costs, buckets=route_buckets, default_cost=default_cost)
+
+
+def _clamp_cost(route: str, cost: float, spec: BucketSpec) -> float:
+    # A cost above the bucket's capacity could never be paid: every request would get a 429
+    if cost <= spec.capacity:
+        return cost
+    get_logger(__name__).warning(f"rate limit cost {cost} for {route} exceeds its bucket capacity {spec.capacity}; using {spec.capacity}")
+    return spec.capacity
 
 
 def verify_api_key(get_api_key: Callable[[], str]):
-    async def _dependency(request: Request, x_api_key: str | None = Header(default=None)) -> None:
+    async def _dependency(request: Request, response: Response, x_api_key: str | None = Header(default=None)) -> None:
         client_ip = request.client.host if request.client else "unknown"
-        if not rate_limiter.allow(client_ip):
-            raise HTTPException(status_code=429, detail="Too Many Requests")
+        cost, bucket = route_policy.resolve(request)
+        decision = rate_limiter.check(client_ip, cost, bucket)
+        if not decision.allowed:
+            raise HTTPException(status_code=429, detail="Too Many Requests", headers=decision.headers())
+        response.headers.update(decision.headers())
         expected = get_api_key()
-        if not expected or not x_api_key or x_api_key != expected:
-            raise HTTPException(status_code=401, detail="Unauthorized")
+        if not expected or not x_api_key or not hmac.compare_digest(x_api_key.encode(), expected.encode()):
+            raise HTTPException(status_code=401, detail="Unauthorized", headers=decision.headers())
     return _dependency
@@ -0,0 +1,439 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import psutil
+
+from .logging_setup import get_logger
+from .models import BenchLayout, MinerDefinition
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS hosts (
+    fingerprint TEXT PRIMARY KEY,
+    info TEXT NOT NULL,
+    first_seen REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS bench_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    job_id TEXT,
+    host TEXT NOT NULL,
+    miner_id TEXT NOT NULL,
+    miner_type TEXT NOT NULL,
+    binary_version TEXT NOT NULL,
+    algo TEXT NOT NULL,
+    layout TEXT NOT NULL,
+    threads INTEGER,
+    cpus TEXT,
+    status TEXT NOT NULL,
+    hashrate_hs REAL,
+    hashrate_min_hs REAL,
+    hashrate_max_hs REAL,
+    reported_hs REAL,
+    samples INTEGER NOT NULL DEFAULT 0,
+    warmup_sec REAL,
+    duration_sec REAL,
+    exit_code INTEGER,
+    error TEXT,
+    command TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_bench_key ON bench_results (host, binary_version, algo, layout);
+CREATE INDEX IF NOT EXISTS ix_bench_ts ON bench_results (ts);
+"""
+
+
+def compact_cpus(cpus: List[int]) -> str:
+    """[0, 1, 2, 3, 8] -> "0-3,8"."""
+    out: List[str] = []
+    ordered = sorted(set(int(c) for c in cpus))
+    i = 0
+    while i < len(ordered):
+        j = i
+        while j + 1 < len(ordered) and ordered[j + 1] == ordered[j] + 1:
+            j += 1
+        out.append(str(ordered[i]) if i == j else f"{ordered[i]}-{ordered[j]}")
+        i = j + 1
+    return ",".join(out)
+
+
+def _cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if line.lower().startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or "unknown"
+
+
+def host_fingerprint() -> Tuple[str, Dict[str, Any]]:
+    """Stable id for the hardware results are comparable on: CPU model, core counts, memory."""
+    info = {
+        "cpu_model": _cpu_model(),
+        "machine": platform.machine(),
+        "system": platform.system(),
+        "logical_cpus": psutil.cpu_count(logical=True),
+        "physical_cores": psutil.cpu_count(logical=False),
+        "mem_gb": round(psutil.virtual_memory().total / 2 ** 30),
+    }
+    digest = hashlib.sha256(json.dumps(info, sort_keys=True).encode()).hexdigest()[:16]
+    return digest, info
+
+
+_version_cache: Dict[Tuple[Any, ...], str] = {}
+
+
+def binary_version(executable: str, env: Optional[Dict[str, str]] = None) -> str:
+    """``<first --version line> @<sha256 prefix>``; the hash separates custom builds of one release."""
+    st = os.stat(executable)
+    key = (os.path.abspath(executable), st.st_mtime, st.st_size, tuple(sorted((env or {}).items())))
+    cached = _version_cache.get(key)
+    if cached:
+        return cached
+    label = "unknown"
+    try:
+        proc = subprocess.run(
+            [executable, "--version"], capture_output=True, text=True, timeout=10, stdin=subprocess.DEVNULL, env=env
+        )
+        for line in (proc.stdout + proc.stderr).splitlines():
+            if line.strip():
+                label = line.strip().lstrip("* ").split("  ")[0][:80]
+                break
+    except (OSError, subprocess.SubprocessError):
+        pass
+    h = hashlib.sha256()
+    with open(executable, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    version = f"{label} @{h.hexdigest()[:12]}"
+    _version_cache[key] = version
+    return version
+
+
+class BenchStore:
+    """SQLite results database; one short-lived connection per call."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def add_host(self, fingerprint: str, info: Dict[str, Any]) -> None:
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO hosts (fingerprint, info, first_seen) VALUES (?, ?, ?)",
+                (fingerprint, json.dumps(info, sort_keys=True), time.time()),
+            )
+
+    def hosts(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute("SELECT fingerprint, info, first_seen FROM hosts ORDER BY first_seen").fetchall()
+        return [{"fingerprint": r["fingerprint"], "info": json.loads(r["info"]), "first_seen": r["first_seen"]} for r in rows]
+
+    def insert(self, result: Dict[str, Any]) -> int:
+        cols = sorted(result)
+        with self._lock, self._connect() as conn:
+            cur = conn.execute(
+                f"INSERT INTO bench_results ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+                [result[c] for c in cols],
+            )
+            return int(cur.lastrowid)
+
+    @staticmethod
+    def _where(filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        clauses = [f"{k} = ?" for k, v in filters.items() if v is not None]
+        params = [v for v in filters.values() if v is not None]
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def results(self, limit: int = 200, **filters: Any) -> List[Dict[str, Any]]:
+        where, params = self._where(filters)
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM bench_results{where} ORDER BY ts DESC LIMIT ?", params + [max(1, limit)]
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def compare(self, **filters: Any) -> List[Dict[str, Any]]:
+        """Successful runs grouped by host, binary, algo and layout, ranked within each host/algo."""
+        where, params = self._where(dict(filters, status="ok"))
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT host, miner_type, binary_version, algo, layout, COUNT(*) AS runs,"
+                " AVG(hashrate_hs) AS mean_hs, MAX(hashrate_hs) AS best_hs, MIN(hashrate_hs) AS worst_hs,"
+                " MAX(ts) AS last_ts"
+                f" FROM bench_results{where}"
+                " GROUP BY host, miner_type, binary_version, algo, layout"
+                " ORDER BY host, algo, mean_hs DESC",
+                params,
+            ).fetchall()
+        out = [dict(r) for r in rows]
+        best: Dict[Tuple[str, str], float] = {}
+        for r in out:
+            k = (r["host"], r["algo"])
+            best[k] = max(best.get(k, 0.0), r["mean_hs"] or 0.0)
+        for r in out:
+            top = best[(r["host"], r["algo"])]
+            r["relative_to_best"] = round(r["mean_hs"] / top, 4) if top else None
+        return out
+
+
+@dataclass
+class BenchJob:
+    id: str
+    cases: List[Dict[str, Any]]
+    warmup_sec: float
+    duration_sec: float
+    status: str = "queued"  # queued | running | done | failed | cancelled
+    created: float = field(default_factory=time.time)
+    finished: Optional[float] = None
+    completed: int = 0
+    current: Optional[Dict[str, Any]] = None
+    result_ids: List[int] = field(default_factory=list)
+    error: Optional[str] = None
+
+
+class BenchRunner:
+    """Runs miners' built-in benchmarks one at a time, pinned to a CPU set, with no pool connection."""
+
+    def __init__(
+        self,
+        store: BenchStore,
+        get_config: Callable[[], Any],
+        definitions: Callable[[], Dict[str, MinerDefinition]],
+        running_miners: Callable[[], List[str]],
+        log_dir: str,
+        adapters: Dict[str, Any],
+    ) -> None:
+        self.store = store
+        self.get_config = get_config
+        self.definitions = definitions
+        self.running_miners = running_miners
+        self.log_dir = log_dir
+        self.adapters = adapters
+        self.logger = get_logger(__name__)
+        self.host, self.host_info = host_fingerprint()
+        store.add_host(self.host, self.host_info)
+        self._lock = threading.Lock()
+        self._job: Optional[BenchJob] = None
+        self._cancel = threading.Event()
+        self._proc: Optional[subprocess.Popen] = None
+
+    def job(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return asdict(self._job) if self._job else None
+
+    def start_job(
+        self,
+        miner_ids: List[str],
+        layouts: List[BenchLayout],
+        warmup_sec: Optional[float] = None,
+        duration_sec: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        cfg = self.get_config()
+        defs = self.definitions()
+        ids = miner_ids or list(defs)
+        unknown = [mid for mid in ids if mid not in defs]
+        if unknown:
+            raise KeyError(f"unknown miners: {', '.join(unknown)}")
+        with self._lock:
+            if self._job and self._job.status in ("queued", "running"):
+                raise RuntimeError("a benchmark job is already running")
+            running = self.running_miners()
+            if running:
+                raise RuntimeError(f"stop running miners first: {', '.join(running)}")
+            cases = [
+                {"miner_id": mid, "layout": layout.model_dump()}
+                for mid in ids
+                for layout in (layouts or [BenchLayout()])
+            ]
+            self._job = BenchJob(
+                id=uuid.uuid4().hex[:12],
+                cases=cases,
+                warmup_sec=cfg.warmup_sec if warmup_sec is None else max(0.0, warmup_sec),
+                duration_sec=cfg.duration_sec if duration_sec is None else max(1.0, duration_sec),
+            )
+            self._cancel.clear()
+            job = self._job
+        threading.Thread(target=self._run, args=(job,), name="bench-runner", daemon=True).start()
+        return asdict(job)
+
+    def cancel(self) -> bool:
+        with self._lock:
+            if not self._job or self._job.status not in ("queued", "running"):
+                return False
+        self._cancel.set()
+        proc = self._proc
+        if proc and proc.poll() is None:
+            proc.terminate()
+        return True
+
+    def _run(self, job: BenchJob) -> None:
+        job.status = "running"
+        cfg = self.get_config()
+        try:
+            for i, case in enumerate(job.cases):
+                if self._cancel.is_set():
+                    job.status = "cancelled"
+                    break
+                running = self.running_miners()
+                if running:
+                    # A miner started mid-job (autoswitch, API): results would no longer be isolated
+                    raise RuntimeError(f"miners started during benchmark: {', '.join(running)}")
+                job.current = case
+                d = self.definitions().get(case["miner_id"])
+                if d is None:
+                    raise KeyError(f"miner {case['miner_id']} was removed")
+                result = self._run_case(job, d, BenchLayout(**case["layout"]), cfg)
+                job.result_ids.append(self.store.insert(result))
+                job.completed += 1
+                if i + 1 < len(job.cases) and self._cancel.wait(cfg.cooldown_sec):
+                    job.status = "cancelled"
+                    break
+            else:
+                job.status = "done"
+        except Exception as e:
+            self.logger.error(f"benchmark job {job.id} failed: {e}")
+            job.status = "failed"
+            job.error = str(e)
+        job.current = None
+        job.finished = time.time()
+
+    def _run_case(self, job: BenchJob, d: MinerDefinition, layout: BenchLayout, cfg) -> Dict[str, Any]:
+        # Strip everything network related; the adapter only contributes command line and parsing
+        offline = d.model_copy(update={"pool_url": None, "pools": [], "wallet": None, "password": None})
+        adapter = self.adapters[d.type](offline, os.path.join(self.log_dir, "bench"))
+        cpus = list(layout.cpus or d.cpu_affinity or [])
+        threads = layout.threads or (d.threads if isinstance(d.threads, int) else None) or (len(cpus) or None)
+        seconds = job.warmup_sec + job.duration_sec
+        result: Dict[str, Any] = {
+            "ts": time.time(),
+            "job_id": job.id,
+            "host": self.host,
+            "miner_id": d.id,
+            "miner_type": d.type,
+            "binary_version": "unknown",
+            "algo": d.algo or "default",
+            "layout": BenchLayout(threads=threads, cpus=cpus).key(),
+            "threads": threads,
+            "cpus": compact_cpus(cpus) if cpus else None,
+            "status": "failed",
+            "samples": 0,
+            "warmup_sec": job.warmup_sec,
+            "duration_sec": job.duration_sec,
+        }
+        env = os.environ.copy()
+        env.update({str(k): str(v) for k, v in (d.env or {}).items()})
+        try:
+            adapter.preflight()
+            result["binary_version"] = binary_version(d.executable, env)
+            cmd = adapter.build_bench_command(threads, seconds, cfg.sample_interval_sec, cfg.xmrig_bench_size)
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+        result["command"] = " ".join(cmd)
+
+        def _pin() -> None:
+            # In the child before exec, so every miner thread inherits the CPU set
+            if cpus and hasattr(os, "sched_setaffinity"):
+                os.sched_setaffinity(0, cpus)
+
+        self.logger.info(f"benchmark {d.id} layout={result['layout']}: {result['command']}", extra={"miner_id": d.id})
+        samples: List[Tuple[float, float]] = []
+        # Per-thread rates reported since the last sample, with when they were reported
+        thread_rates: Dict[str, Tuple[float, float]] = {}
+        reported: Optional[float] = None
+        t0 = time.monotonic()
+        try:
+            proc = subprocess.Popen(
+                cmd,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                env=env,
+                text=True,
+                bufsize=1,
+                preexec_fn=_pin,
+                start_new_session=True,
+            )
+        except Exception as e:
+            result["error"] = str(e)
+            return result
+        self._proc = proc
+        timer = threading.Timer(seconds, proc.terminate)
+        timer.daemon = True
+        timer.start()
+        try:
+            m = adapter.metrics
+            for line in iter(proc.stdout.readline, ""):
+                adapter.stdout_log.write(line)
+                hashrate_ts, threads = m.hashrate_ts, m.extra.get("threads_hs")
+                adapter.parse_stdout_line(line)
+                reported = adapter.parse_bench_line(line) or reported
+                now = time.monotonic() - t0
+                # Only rates parsed from this line count: "n/a" speed lines leave the previous
+                # value in place, and reusing it would repeat stale (or warm-up) readings
+                if m.hashrate_ts != hashrate_ts:
+                    if m.hashrate_hs:
+                        samples.append((now, float(m.hashrate_hs)))
+                    thread_rates.clear()
+                elif m.extra.get("threads_hs") is not threads:
+                    latest = m.extra["threads_hs"]
+                    thread_rates.update((cpu, (now, hs)) for cpu, hs in latest.items() if (threads or {}).get(cpu) != hs)
+                    if len(thread_rates) >= len(latest):
+                        # Every thread reported since the last sample; stamped with the oldest report
+                        total = sum(hs for _, hs in thread_rates.values())
+                        if total:
+                            samples.append((min(t for t, _ in thread_rates.values()), total))
+                        thread_rates.clear()
+            try:
+                result["exit_code"] = proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                result["exit_code"] = proc.wait()
+        finally:
+            timer.cancel()
+            self._proc = None
+            adapter.stdout_log.close()
+        # Warm-up discard: caches, huge pages and turbo settle in the first seconds
+        kept = [hs for t, hs in samples if t >= job.warmup_sec]
+        result["samples"] = len(kept)
+        result["reported_hs"] = reported
+        if kept:
+            result.update(
+                status="ok",
+                hashrate_hs=statistics.median(kept),
+                hashrate_min_hs=min(kept),
+                hashrate_max_hs=max(kept),
+            )
+        elif reported:
+            result.update(status="ok", hashrate_hs=reported)
+        else:
+            result["error"] = "cancelled" if self._cancel.is_set() else (
+                f"no hashrate after {job.warmup_sec:.0f}s warm-up (exit code {result.get('exit_code')})"
+            )
+        return result
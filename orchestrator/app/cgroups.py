@@ -0,0 +1,271 @@
+from __future__ import annotations
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .logging_setup import get_logger
+from .models import MinerDefinition
+
+
+CGROUP_ROOT = "/sys/fs/cgroup"
+CPU_MAX_PERIOD_USEC = 100000
+CONTROLLERS = ("cpu", "cpuset", "memory")
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$", re.IGNORECASE)
+_SIZE_UNITS = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+
+
+def parse_size(value: Any) -> str:
+    """memory.max value from bytes or "512M"/"2G"/"max"."""
+    if value is None or str(value).strip().lower() == "max":
+        return "max"
+    if isinstance(value, (int, float)):
+        return str(int(value))
+    m = _SIZE_RE.match(str(value))
+    if not m:
+        raise ValueError(f"invalid memory size: {value!r}")
+    return str(int(float(m.group(1)) * _SIZE_UNITS[m.group(2).lower()]))
+
+
+def parse_cpu_max(value: Any) -> str:
+    """cpu.max value from a core count (2.5 -> "250000 100000") or a raw "quota period"/"max"."""
+    if value is None:
+        return "max"
+    if isinstance(value, (int, float)):
+        return f"{max(1000, int(float(value) * CPU_MAX_PERIOD_USEC))} {CPU_MAX_PERIOD_USEC}"
+    text = str(value).strip()
+    try:
+        return parse_cpu_max(float(text))
+    except ValueError:
+        return text
+
+
+def cgroup_limits(d: MinerDefinition, all_cpus: str = "") -> Dict[str, str]:
+    """Interface file -> value for a miner; unset limits are written as their defaults.
+
+    ``all_cpus`` (the parent's ``cpuset.cpus.effective``) is written when the miner has no
+    affinity, so a leaf that was pinned before gets every CPU back.
+    """
+    return {
+        "cpu.weight": str(int(d.cpu_weight)) if d.cpu_weight else "100",
+        "cpu.max": parse_cpu_max(d.cpu_max),
+        "cpuset.cpus": ",".join(str(int(c)) for c in d.cpu_affinity) if d.cpu_affinity else all_cpus,
+        "memory.max": parse_size(d.memory_max),
+    }
+
+
+def _safe_name(miner_id: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", miner_id) or "_"
+
+
+class CgroupManager:
+    """Per-miner cgroup v2 leaves under an orchestrator-owned subtree.
+
+    Layout, with ``base`` the delegated cgroup (by default the one this process runs in)::
+
+        base/orchestrator/      this process, moved out so base can enable controllers
+        base/miners/<id>/       one leaf per miner, limits from its definition
+
+    Without an explicit ``base``, our own cgroup is used only if it is really delegated to
+    us (owned by our user, or marked by systemd's ``Delegate=``) and holds no process but
+    ours. Otherwise, or when cgroup v2 isn't mounted, ``available`` stays False with a
+    ``reason`` and callers fall back to nice/affinity. ``root`` and ``proc_cgroup`` can point
+    at a fake tree for testing.
+    """
+
+    def __init__(
+        self,
+        root: str = CGROUP_ROOT,
+        base: Optional[str] = None,
+        controllers: Tuple[str, ...] = CONTROLLERS,
+        proc_cgroup: str = "/proc/self/cgroup",
+    ) -> None:
+        self.root = root
+        self.base_rel = base
+        self.wanted = tuple(controllers)
+        self.proc_cgroup = proc_cgroup
+        self.logger = get_logger(__name__)
+        self.available = False
+        self.reason: Optional[str] = "not set up"
+        self.base: Optional[str] = None
+        self.controllers: List[str] = []
+        self._lock = threading.Lock()
+        # leaf -> (usage_usec, monotonic) of the previous stats() call, for cpu_percent
+        self._last_usage: Dict[str, Tuple[int, float]] = {}
+
+    def _own_path(self) -> str:
+        with open(self.proc_cgroup, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return line[3:].strip()
+        raise OSError("process is not in a cgroup v2 hierarchy")
+
+    @staticmethod
+    def _read(path: str) -> str:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    @staticmethod
+    def _write(path: str, value: str) -> None:
+        # cgroupfs needs one write() per value
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, value.encode())
+        finally:
+            os.close(fd)
+
+    def setup(self) -> bool:
+        try:
+            self._setup()
+            self.available = True
+            self.reason = None
+            self.logger.info(f"cgroup placement enabled under {self.base}/miners (controllers: {', '.join(self.controllers)})")
+        except (OSError, ValueError) as e:
+            self.available = False
+            self.reason = str(e)
+            self.logger.warning(f"cgroup placement unavailable, falling back to nice/affinity: {e}")
+        return self.available
+
+    def _setup(self) -> None:
+        if not os.path.exists(os.path.join(self.root, "cgroup.controllers")):
+            raise OSError(f"cgroup v2 is not mounted at {self.root}")
+        own = self._own_path()
+        rel = (self.base_rel or own).strip("/")
+        base = os.path.join(self.root, rel) if rel else self.root
+        if not os.access(os.path.join(base, "cgroup.subtree_control"), os.W_OK):
+            raise OSError(f"{base} is not delegated to this user (cgroup.subtree_control not writable)")
+        if not self.base_rel and not self._delegated(base):
+            # Writable isn't enough: root can write anywhere, including a login session's scope
+            raise OSError(f"{base} is not delegated (no Delegate= and not owned by uid {os.geteuid()}); set cgroups.base")
+        available = self._read(os.path.join(base, "cgroup.controllers")).split()
+        controllers = [c for c in self.wanted if c in available]
+        if not controllers:
+            raise OSError(f"none of {', '.join(self.wanted)} available in {base}")
+        # No internal processes: a cgroup with controllers enabled for children can't hold
+        # processes itself, so we move to a sibling leaf. Only ourselves: anything else in
+        # there (a shell, sibling services) isn't ours to move, so give up instead
+        if rel == own.strip("/") and rel:
+            others = [p for p in self._read(os.path.join(base, "cgroup.procs")).split() if p != str(os.getpid())]
+            if others:
+                raise OSError(f"{base} also holds {len(others)} other processes; set cgroups.base to a dedicated cgroup")
+            leaf = os.path.join(base, "orchestrator")
+            os.makedirs(leaf, exist_ok=True)
+            self._write(os.path.join(leaf, "cgroup.procs"), str(os.getpid()))
+        for parent in (base, os.path.join(base, "miners")):
+            os.makedirs(parent, exist_ok=True)
+            for c in controllers:
+                self._write(os.path.join(parent, "cgroup.subtree_control"), f"+{c}")
+        self.base = base
+        self.controllers = controllers
+
+    @staticmethod
+    def _delegated(base: str) -> bool:
+        euid = os.geteuid()
+        if euid != 0:
+            try:
+                return all(os.stat(os.path.join(base, f)).st_uid == euid for f in ("cgroup.procs", "cgroup.subtree_control"))
+            except OSError:
+                return False
+        # Everything is root's; systemd marks delegated cgroups with an xattr instead
+        for attr in ("trusted.delegate", "user.delegate"):
+            try:
+                if os.getxattr(base, attr).strip(b"\0") == b"1":
+                    return True
+            except (OSError, AttributeError):
+                pass
+        return False
+
+    def leaf(self, miner_id: str) -> Optional[str]:
+        return os.path.join(self.base, "miners", _safe_name(miner_id)) if self.base else None
+
+    def prepare(self, d: MinerDefinition) -> Optional[str]:
+        """Create/update the miner's leaf and apply its limits; returns the leaf's cgroup.procs path."""
+        if not self.available:
+            return None
+        leaf = self.leaf(d.id)
+        try:
+            os.makedirs(leaf, exist_ok=True)
+        except OSError as e:
+            self.logger.warning(f"cannot create cgroup for {d.id}: {e}", extra={"miner_id": d.id})
+            return None
+        try:
+            all_cpus = self._read(os.path.join(self.base, "miners", "cpuset.cpus.effective")).strip()
+        except OSError:
+            all_cpus = ""
+        for name, value in cgroup_limits(d, all_cpus).items():
+            if name.split(".", 1)[0] not in self.controllers:
+                continue
+            try:
+                self._write(os.path.join(leaf, name), value)
+            except OSError as e:
+                self.logger.warning(f"cgroup {name}={value!r} for {d.id} failed: {e}", extra={"miner_id": d.id})
+        return os.path.join(leaf, "cgroup.procs")
+
+    def remove(self, miner_id: str) -> None:
+        leaf = self.leaf(miner_id)
+        if not leaf:
+            return
+        with self._lock:
+            self._last_usage.pop(leaf, None)
+        try:
+            os.rmdir(leaf)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Still populated (e.g. a miner child outlived it) or a fake tree with files in it
+            self.logger.warning(f"cannot remove cgroup {leaf}: {e}", extra={"miner_id": miner_id})
+
+    def stats(self, miner_id: str) -> Dict[str, Any]:
+        """CPU and memory accounting for every process/thread in the miner's leaf."""
+        leaf = self.leaf(miner_id)
+        if not leaf or not self.available:
+            return {}
+        out: Dict[str, Any] = {}
+        try:
+            cpu = dict(line.split() for line in self._read(os.path.join(leaf, "cpu.stat")).splitlines() if line.strip())
+            usage = int(cpu.get("usage_usec", 0))
+            out.update(
+                cpu_usage_usec=usage,
+                cpu_user_usec=int(cpu.get("user_usec", 0)),
+                cpu_system_usec=int(cpu.get("system_usec", 0)),
+                cpu_nr_throttled=int(cpu.get("nr_throttled", 0)),
+                cpu_throttled_usec=int(cpu.get("throttled_usec", 0)),
+            )
+            now = time.monotonic()
+            with self._lock:
+                prev = self._last_usage.get(leaf)
+                self._last_usage[leaf] = (usage, now)
+            if prev and now > prev[1] and usage >= prev[0]:
+                out["cpu_percent"] = round((usage - prev[0]) / ((now - prev[1]) * 1e6) * 100.0, 2)
+        except (OSError, ValueError):
+            pass
+        for name, key in (("memory.current", "memory_bytes"), ("memory.peak", "memory_peak_bytes")):
+            try:
+                out[key] = int(self._read(os.path.join(leaf, name)).strip())
+            except (OSError, ValueError):
+                pass
+        oom = self.oom_kills(miner_id)
+        if oom is not None:
+            out["oom_kills"] = oom
+        return out
+
+    def oom_kills(self, miner_id: str) -> Optional[int]:
+        """OOM kills in the miner's leaf since it was created (memory.events)."""
+        leaf = self.leaf(miner_id)
+        if not leaf or not self.available:
+            return None
+        try:
+            events = dict(line.split() for line in self._read(os.path.join(leaf, "memory.events")).splitlines() if line.strip())
+            return int(events.get("oom_kill", 0))
+        except (OSError, ValueError):
+            return None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "available": self.available,
+            "reason": self.reason,
+            "base": self.base,
+            "controllers": list(self.controllers),
+        }
@@ -2,7 +2,7 @@ from __future__ import annotations
 import os
 import threading
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import yaml
 
@@ -11,11 +11,28 @@ CONFIG_PATH_DEFAULT = os.path.join(os.path.dirname(os.path.dirname(__file__)), "
 CONFIG_PATH_DEFAULT = os.path.abspath(CONFIG_PATH_DEFAULT)
 
 
+@dataclass
+class RateLimitConfig:
+    capacity: float = 120
+    refill_per_sec: float = 2.0
+    # Upper bound on tracked clients; least recently seen ones are evicted
+    max_clients: int = 100000
+    shards: int = 16
+    default_cost: float = 1.0
+    # "METHOD /path/template" -> token cost (merged over built-in defaults)
+    route_costs: Dict[str, float] = field(default_factory=dict)
+    # "METHOD /path/template" -> bucket name from ``buckets``
+    route_buckets: Dict[str, str] = field(default_factory=dict)
+    # name -> {capacity, refill_per_sec}
+    buckets: Dict[str, Dict[str, float]] = field(default_factory=dict)
+
+
 @dataclass
 class ApiConfig:
     host: str = "0.0.0.0"
     port: int = 8765
     api_key: str = "change-me-32chars-min"
+    rate_limit: RateLimitConfig = field(default_factory=RateLimitConfig)
 
 
 @dataclass
@@ -31,12 +48,24 @@ class MinerConfig:
     type: str = "xmrig"
     enabled: bool = True
     executable: str = ""
+    env: Dict[str, str] = field(default_factory=dict)
     algo: Optional[str] = None
     pool_url: Optional[str] = None
+    pools: List[str] = field(default_factory=list)
     wallet: Optional[str] = None
     password: Optional[str] = None
     threads: str | int | None = None
     donate_level: Optional[int] = None
+    share_diff_multiplier: Optional[float] = None
+    nice: Optional[int] = None
+    cpu_affinity: List[int] = field(default_factory=list)
+    cpu_weight: Optional[int] = None
+    cpu_max: float | str | None = None
+    memory_max: int | str | None = None
+    # Count, "per_numa_node" or "per_l3_domain"; see topology.expand_replicas
+    replicas: int | str | None = None
+    api_telemetry: bool = False
+    api_interval_sec: float = 5.0
     extra_args: List[str] = field(default_factory=list)
 
 
@@ -45,6 +74,52 @@ class SchedulingConfig:
     autoswitch: bool = False
     autoswitch_interval_sec: int = 600
     cpu_limit_percent: int = 95
+    # Start enabled miners as soon as the orchestrator is up
+    autostart: bool = False
+    # Miners preflighted/spawned concurrently by start-all and autostart
+    start_concurrency: int = 8
+
+
+@dataclass
+class PoolsConfig:
+    probe_enabled: bool = True
+    probe_interval_sec: int = 30
+    probe_timeout_sec: float = 3.0
+    stratum_handshake: bool = True
+    # A pool is considered down after this many consecutive failed probes
+    down_after_failures: int = 2
+    # Latency failover: only when the active pool is slower than max_latency_ms
+    # and a candidate is at least switch_margin (fraction) faster
+    max_latency_ms: float = 250.0
+    switch_margin: float = 0.3
+    # Reject-rate failover, evaluated once min_shares were submitted on the pool
+    max_reject_ratio: float = 0.05
+    min_shares: int = 20
+    # Hysteresis: minimum time on a pool before a non-outage switch
+    min_dwell_sec: int = 600
+
+
+@dataclass
+class HealthConfig:
+    enabled: bool = True
+    # Nothing is judged during this long after a start (dataset init, pool login)
+    grace_sec: float = 120.0
+    # Baseline: median of per-minute hashrate over the window, once min_sec of it is collected
+    baseline_window_sec: float = 3600.0
+    baseline_min_sec: float = 600.0
+    # Stalled: hashrate at or below stall_hashrate_hs, or none reported, for stall_after_sec
+    stall_hashrate_hs: float = 0.0
+    stall_after_sec: float = 120.0
+    # Degraded: below drop_ratio of the baseline for drop_after_sec
+    drop_ratio: float = 0.5
+    drop_after_sec: float = 300.0
+    # No accepted share for this long (0 disables); size it to the pool difficulty
+    share_stall_sec: float = 1800.0
+    # Escalation: an event on detection, then pool failover, then restart, this far apart
+    escalate_after_sec: float = 180.0
+    failover: bool = True
+    restart: bool = True
+    max_restarts_per_hour: int = 3
 
 
 @dataclass
@@ -53,6 +128,44 @@ class LoggingConfig:
     directory: str = "logs/miners"
     rotate_mb: int = 50
     keep: int = 10
+    flush_interval_sec: float = 1.0
+    compress: bool = True
+    # Orchestrator log records waiting for the writer thread; excess records are dropped
+    queue_size: int = 10000
+
+
+@dataclass
+class CgroupsConfig:
+    # Off by default: it moves this process into a new cgroup (see cgroups.CgroupManager)
+    enabled: bool = False
+    root: str = "/sys/fs/cgroup"
+    # Delegated cgroup (relative to root) to create miner leaves under; default: our own,
+    # if systemd delegated it (Delegate=yes) or it is owned by our user
+    base: Optional[str] = None
+    controllers: List[str] = field(default_factory=lambda: ["cpu", "cpuset", "memory"])
+
+
+@dataclass
+class JournalConfig:
+    enabled: bool = True
+    path: str = "var/state/journal.sqlite"
+    batch_size: int = 500
+    flush_interval_sec: float = 0.5
+    # Events waiting for the writer thread; excess events are dropped and counted
+    queue_size: int = 50000
+    retention_days: float = 90.0
+
+
+@dataclass
+class BenchConfig:
+    db_path: str = "var/state/bench.sqlite"
+    # Samples from the first warmup_sec of each run are discarded
+    warmup_sec: float = 20.0
+    duration_sec: float = 60.0
+    cooldown_sec: float = 5.0
+    sample_interval_sec: int = 5
+    # XMRig --bench size (hash count): 1M or 10M
+    xmrig_bench_size: str = "1M"
 
 
 @dataclass
@@ -61,7 +174,12 @@ class AppConfig:
     telemetry: TelemetryConfig = field(default_factory=TelemetryConfig)
     miners: List[MinerConfig] = field(default_factory=list)
     scheduling: SchedulingConfig = field(default_factory=SchedulingConfig)
+    pools: PoolsConfig = field(default_factory=PoolsConfig)
     logging: LoggingConfig = field(default_factory=LoggingConfig)
+    bench: BenchConfig = field(default_factory=BenchConfig)
+    journal: JournalConfig = field(default_factory=JournalConfig)
+    cgroups: CgroupsConfig = field(default_factory=CgroupsConfig)
+    health: HealthConfig = field(default_factory=HealthConfig)
 
 
 class ConfigLoader:
@@ -101,15 +219,26 @@ class ConfigLoader:
             return False
 
     def _parse(self, data: dict) -> AppConfig:
-        api = data.get("api", {})
+        api = dict(data.get("api", {}))
+        rate_limit = api.pop("rate_limit", None) or {}
         telemetry = data.get("telemetry", {})
         scheduling = data.get("scheduling", {})
+        pools = data.get("pools", {})
         logging_cfg = data.get("logging", {})
+        bench = data.get("bench", {})
+        journal = data.get("journal", {})
+        cgroups = data.get("cgroups", {})
+        health = data.get("health", {})
         miners = [MinerConfig(**m) for m in data.get("miners", [])]
         return AppConfig(
-            api=ApiConfig(**api),
+            api=ApiConfig(rate_limit=RateLimitConfig(**rate_limit), **api),
             telemetry=TelemetryConfig(**telemetry),
             miners=miners,
             scheduling=SchedulingConfig(**scheduling),
+            pools=PoolsConfig(**pools),
             logging=LoggingConfig(**logging_cfg),
+            bench=BenchConfig(**bench),
+            journal=JournalConfig(**journal),
+            cgroups=CgroupsConfig(**cgroups),
+            health=HealthConfig(**health),
         )
@@ -2,7 +2,7 @@ from __future__ import annotations
 import threading
 import time
 from dataclasses import dataclass
-from typing import List, Dict, Any
+from typing import Any, Callable, Dict, List, Optional
 
 
 @dataclass
@@ -14,10 +14,12 @@ class Event:
 
 
 class EventLogger:
-    def __init__(self, capacity: int = 5000) -> None:
+    def __init__(self, capacity: int = 5000, sink: Optional[Callable[[Event], None]] = None) -> None:
         self.capacity = capacity
         self._lock = threading.Lock()
         self._events: List[Event] = []
+        # Persistent journal; must not block (EventJournal.append only enqueues)
+        self.sink = sink
 
     def emit(self, level: str, message: str, **ctx: Any) -> None:
         e = Event(ts=time.time(), level=level.upper(), message=message, ctx=ctx)
@@ -26,6 +28,8 @@ class EventLogger:
             if len(self._events) > self.capacity:
                 # keep last capacity
                 self._events = self._events[-self.capacity :]
+        if self.sink:
+            self.sink(e)
 
     def list(self, limit: int = 200) -> List[Event]:
         with self._lock:
@@ -0,0 +1,124 @@
+from __future__ import annotations
+import re
+import signal
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Pattern, Sequence, Tuple
+
+
+# Failure categories, most specific first
+CONFIG = "config"
+RESOURCE = "resource"
+CONNECTIVITY = "connectivity"
+CRASH = "crash"
+
+
+@dataclass(frozen=True)
+class ExitPolicy:
+    # False: leave the miner exited until an operator starts it again
+    restart: bool = True
+    # Restart against the next pool instead of the one that failed
+    failover: bool = False
+    # Multiplies the watchdog's exponential backoff
+    backoff_factor: float = 1.0
+    # Counts towards crash-loop quarantine; outages shouldn't park a miner for good
+    quarantine: bool = True
+
+
+POLICIES = {
+    CONFIG: ExitPolicy(restart=False),
+    RESOURCE: ExitPolicy(backoff_factor=4.0),
+    CONNECTIVITY: ExitPolicy(failover=True, quarantine=False),
+    CRASH: ExitPolicy(),
+}
+
+
+@dataclass(frozen=True)
+class ExitCause:
+    category: str
+    reason: str
+    returncode: Optional[int] = None
+    # Output line the category was inferred from
+    line: Optional[str] = None
+
+    @property
+    def policy(self) -> ExitPolicy:
+        return POLICIES.get(self.category, POLICIES[CRASH])
+
+    def summary(self) -> str:
+        return f"{self.category}: {self.reason}" + (f" ({self.line})" if self.line else "")
+
+
+ExitPatterns = Sequence[Tuple[str, Pattern[str]]]
+
+
+def _rx(*alternatives: str) -> Pattern[str]:
+    return re.compile("|".join(alternatives), re.IGNORECASE)
+
+
+# Output patterns shared by all miners; adapters add their own via ``exit_patterns``.
+# No CONFIG here: it parks the miner, so it only comes from a miner's own fatal messages.
+PATTERNS: ExitPatterns = (
+    (RESOURCE, _rx(
+        r"out of memory", r"cannot allocate memory", r"failed to allocate", r"allocation failed",
+        r"bad_alloc", r"mmap.{0,20}failed", r"too many open files", r"no space left on device",
+    )),
+    (CONNECTIVITY, _rx(
+        r"connection refused", r"connect(?:ion)? (?:error|failed)", r"network is unreachable",
+        r"no route to host", r"name or service not known", r"could not resolve", r"dns error",
+        r"getaddrinfo", r"connection (?:reset|timed out)", r"no active pools", r"stratum.{0,40}fail",
+    )),
+)
+# Warnings miners recover from on their own, e.g. XMRig falling back from 1GB to 2MB pages
+NON_FATAL = _rx(r"using 1gb pages", r"huge ?pages?")
+# Only the last lines before an exit say why; earlier ones are startup noise or pool chatter
+FINAL_LINES = 3
+
+_CONFIG_EXIT_CODES = {
+    126: "binary not executable",
+    127: "binary or loader not found",
+}
+
+
+def _signal_name(signum: int) -> str:
+    try:
+        return signal.Signals(signum).name
+    except ValueError:
+        return f"signal {signum}"
+
+
+def classify(
+    returncode: Optional[int],
+    lines: Iterable[str],
+    patterns: ExitPatterns = (),
+    oom_killed: bool = False,
+) -> ExitCause:
+    """Failure category of a miner exit from its return code (negative = signal) and last output lines.
+
+    Only the final FINAL_LINES lines count, newest first: the first one that matches decides.
+    Within a line, ``patterns`` (adapter specific) are checked before the shared ones, and
+    config beats resource beats connectivity.
+    """
+    tail: List[str] = [ln.strip() for ln in lines if ln and ln.strip()]
+    if oom_killed:
+        return ExitCause(RESOURCE, "killed by the OOM killer (memory.max reached)", returncode)
+    if returncode is not None and returncode < 0:
+        sig = -returncode
+        if sig == signal.SIGILL:
+            return ExitCause(CONFIG, "illegal instruction: binary built for a newer CPU", returncode)
+        if sig in (signal.SIGKILL, signal.SIGXCPU):
+            # Nobody else sends miners SIGKILL; on hosts without cgroup accounting it's the OOM killer
+            return ExitCause(RESOURCE, f"killed by {_signal_name(sig)} (likely out of memory)", returncode)
+    if returncode in _CONFIG_EXIT_CODES:
+        return ExitCause(CONFIG, _CONFIG_EXIT_CODES[returncode], returncode)
+    ordered = [(cat, rx) for category in (CONFIG, RESOURCE, CONNECTIVITY)
+               for cat, rx in list(patterns) + list(PATTERNS) if cat == category]
+    for ln in reversed(tail[-FINAL_LINES:]):
+        if NON_FATAL.search(ln):
+            continue
+        for category, rx in ordered:
+            m = rx.search(ln)
+            if m:
+                return ExitCause(category, f"matched {m.group(0).lower()!r}", returncode, ln[:200])
+    if returncode is not None and returncode < 0:
+        return ExitCause(CRASH, f"killed by {_signal_name(-returncode)}", returncode)
+    return ExitCause(CRASH, f"exit code {returncode}", returncode)
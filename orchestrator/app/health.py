@@ -0,0 +1,176 @@
+from __future__ import annotations
+import statistics
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+from .config import HealthConfig
+from .state import HealthState
+
+
+# Baseline samples are averaged per bucket; the baseline is the median of the buckets
+BUCKET_SEC = 60.0
+RESTART_WINDOW_SEC = 3600.0
+
+STOPPED = "stopped"
+WARMING_UP = "warming_up"
+HEALTHY = "healthy"
+STALLED = "stalled"
+DEGRADED = "degraded"
+NO_SHARES = "no_shares"
+
+# Actions returned by PerformanceHealth.evaluate(), in escalation order
+DETECTED = "detected"
+FAILOVER = "failover"
+RESTART = "restart"
+RECOVERED = "recovered"
+
+
+class PerformanceHealth:
+    """Hashrate health of one running miner, evaluated on every watchdog pass.
+
+    The baseline is the median per-minute hashrate over ``baseline_window_sec``, learned
+    from healthy readings only, so a miner that slowly degrades can't drag it down with it.
+    A problem has to last for its own threshold before it counts; escalation then moves
+    one step per ``escalate_after_sec`` (event, pool failover, restart) and only resets
+    once the miner is healthy again, across the restarts it caused.
+    """
+
+    def __init__(self) -> None:
+        # Read lock-free by the API; everything else is the watchdog's own
+        self.status = HealthState()
+        self._buckets: Deque[float] = deque()
+        self._baseline: Optional[float] = None
+        self._bucket_sum = 0.0
+        self._bucket_n = 0
+        self._bucket_start: Optional[float] = None
+        self._sample_ts: Optional[float] = None
+        # Start time of the run being judged; share tracking and pending problems are per run
+        self._run: Optional[float] = None
+        self._accepted: Optional[int] = None
+        self._accepted_at = 0.0
+        self._share_ts: Optional[float] = None
+        self._problem: Optional[str] = None
+        self._since = 0.0
+        self._level = 0
+        self._acted_at = 0.0
+        self._last_action: Optional[str] = None
+        self._restarts: Deque[float] = deque()
+
+    def evaluate(
+        self,
+        cfg: HealthConfig,
+        now: float,
+        started_at: Optional[float],
+        stats: Dict[str, Any],
+        can_failover: bool,
+        reports_periodically: bool = True,
+    ) -> Optional[str]:
+        """Judge one pass; returns the action to take (DETECTED, FAILOVER, RESTART, RECOVERED) or None.
+
+        ``started_at`` is None while the miner isn't running; ``stats`` is a MinerStats snapshot.
+        Without ``reports_periodically`` the miner may print a hashrate only along with a
+        share, so its silence is left to ``share_stall_sec``.
+        """
+        while self._restarts and now - self._restarts[0] > RESTART_WINDOW_SEC:
+            self._restarts.popleft()
+        hs, hs_ts = stats["hashrate_hs"], stats["hashrate_ts"]
+        if started_at is None:
+            self._run = None
+            self._problem = None
+            self._write(STOPPED, None, None, None)
+            return None
+        if started_at != self._run:
+            self._run = started_at
+            self._accepted, self._accepted_at = stats["accepted"], started_at
+            self._problem = None
+        if stats["accepted"] != self._accepted:
+            self._accepted, self._accepted_at = stats["accepted"], now
+            self._share_ts = now
+        if now - started_at < cfg.grace_sec:
+            self._write(WARMING_UP, None, None, hs)
+            return None
+
+        fresh = hs_ts is not None and hs_ts >= started_at
+        silent = now - (hs_ts if fresh else started_at)
+        problem: Optional[str] = None
+        if reports_periodically and silent >= cfg.stall_after_sec:
+            problem, reason, since, sustain = STALLED, f"no hashrate reported for {silent:.0f}s", now - silent, cfg.stall_after_sec
+        elif fresh and (hs or 0.0) <= cfg.stall_hashrate_hs:
+            problem, reason, since, sustain = STALLED, f"hashrate {hs or 0.0:.1f} H/s", None, cfg.stall_after_sec
+        elif fresh and self._baseline and hs < self._baseline * cfg.drop_ratio:
+            problem, reason, since, sustain = (
+                DEGRADED, f"{hs:.1f} H/s, {hs / self._baseline:.0%} of baseline {self._baseline:.1f} H/s", None, cfg.drop_after_sec
+            )
+        elif cfg.share_stall_sec > 0 and now - self._accepted_at >= cfg.share_stall_sec:
+            problem, reason, since, sustain = (
+                NO_SHARES, f"no accepted share for {now - self._accepted_at:.0f}s", self._accepted_at, cfg.share_stall_sec
+            )
+
+        if problem is None:
+            self._problem = None
+            if fresh and hs_ts != self._sample_ts:
+                self._sample_ts = hs_ts
+                self._sample(cfg, hs, now)
+            action = None
+            if self._level:
+                self._level = 0
+                action = self._act(RECOVERED, now)
+            self._write(HEALTHY, None, None, hs)
+            return action
+
+        if since is None:
+            since = self._since if problem == self._problem else now
+        self._problem, self._since = problem, since
+        if now - since < sustain:
+            # Not sustained yet: reported healthy, but kept out of the baseline
+            self._write(HEALTHY, None, None, hs)
+            return None
+        action = None
+        if self._level == 0:
+            self._level = 1
+            action = self._act(DETECTED, now)
+        elif now - self._acted_at >= cfg.escalate_after_sec and len(self._restarts) < cfg.max_restarts_per_hour:
+            if self._level == 1 and cfg.failover and can_failover:
+                self._level = 2
+                action = self._act(FAILOVER, now)
+            elif cfg.restart:
+                self._level = 3
+                action = self._act(RESTART, now)
+            if action:
+                # Both restart the miner, so both count towards the hourly budget
+                self._restarts.append(now)
+        self._write(problem, reason, since, hs)
+        return action
+
+    def _act(self, action: str, now: float) -> str:
+        self._acted_at = now
+        self._last_action = action
+        return action
+
+    def _sample(self, cfg: HealthConfig, hs: float, now: float) -> None:
+        if self._bucket_start is None:
+            self._bucket_start = now
+        self._bucket_sum += hs
+        self._bucket_n += 1
+        if now - self._bucket_start < BUCKET_SEC:
+            return
+        self._buckets.append(self._bucket_sum / self._bucket_n)
+        self._bucket_sum, self._bucket_n, self._bucket_start = 0.0, 0, None
+        while len(self._buckets) > max(1, int(cfg.baseline_window_sec // BUCKET_SEC)):
+            self._buckets.popleft()
+        if len(self._buckets) * BUCKET_SEC >= cfg.baseline_min_sec:
+            self._baseline = statistics.median(self._buckets)
+
+    def _write(self, state: str, reason: Optional[str], since: Optional[float], hs: Optional[float]) -> None:
+        with self.status as st:
+            st.state = state
+            st.reason = reason
+            st.since_ts = since
+            st.baseline_hs = self._baseline
+            st.baseline_minutes = len(self._buckets)
+            st.hashrate_hs = hs
+            st.last_share_ts = self._share_ts
+            st.level = self._level
+            st.last_action = self._last_action
+            st.last_action_ts = self._acted_at or None
+            st.restarts_last_hour = len(self._restarts)
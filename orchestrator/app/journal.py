@@ -0,0 +1,296 @@
+from __future__ import annotations
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .events import Event
+from .logging_setup import get_logger
+
+
+EXITED = "miner exited"
+QUARANTINED = "miner quarantined due to crash loop"
+RELEASED = "miner quarantine released"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    message TEXT NOT NULL,
+    miner_id TEXT,
+    ctx TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_events_ts ON events (ts);
+CREATE INDEX IF NOT EXISTS ix_events_miner_ts ON events (miner_id, ts);
+CREATE INDEX IF NOT EXISTS ix_events_level_ts ON events (level, ts);
+"""
+
+_PRUNE_EVERY_SEC = 3600.0
+
+
+class EventJournal:
+    """Append-only SQLite (WAL) journal of events.
+
+    ``append`` only enqueues, so it is safe on the emit path; a writer thread inserts in
+    batches of up to ``batch_size`` or every ``flush_interval_sec``. When the queue is full
+    events are dropped and counted rather than blocking the caller.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        batch_size: int = 500,
+        flush_interval_sec: float = 0.5,
+        queue_size: int = 50000,
+        retention_days: float = 90.0,
+    ) -> None:
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_sec = flush_interval_sec
+        self.retention_days = retention_days
+        self.logger = get_logger(__name__)
+        self._queue: "queue.Queue[Optional[Event]]" = queue.Queue(maxsize=max(1, queue_size))
+        self._lock = threading.Lock()
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self._pruned_at = 0.0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+        self._thread = threading.Thread(target=self._run, name="event-journal", daemon=True)
+        self._thread.start()
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.row_factory = sqlite3.Row
+        # WAL: readers (API queries) never block the writer and vice versa
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = self._open()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def append(self, event: Event) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _run(self) -> None:
+        # One long-lived connection for the writer; queries open their own
+        conn = self._open()
+        try:
+            self._drain(conn)
+        finally:
+            conn.close()
+
+    def _drain(self, conn: sqlite3.Connection) -> None:
+        stop = False
+        while not stop:
+            batch: List[Event] = []
+            taken = 0
+            try:
+                item = self._queue.get(timeout=self.flush_interval_sec)
+                taken += 1
+                deadline = time.monotonic() + self.flush_interval_sec
+                while item is not None:
+                    batch.append(item)
+                    timeout = deadline - time.monotonic()
+                    if len(batch) >= self.batch_size or timeout <= 0:
+                        break
+                    item = self._queue.get(timeout=timeout)
+                    taken += 1
+                stop = item is None
+            except queue.Empty:
+                pass
+            if stop:
+                # Drain what was queued before close()
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    taken += 1
+                    if item is not None:
+                        batch.append(item)
+            if batch:
+                self._write(conn, batch)
+            for _ in range(taken):
+                self._queue.task_done()
+            if time.time() - self._pruned_at >= _PRUNE_EVERY_SEC:
+                self._prune(conn)
+
+    def _write(self, conn: sqlite3.Connection, batch: List[Event]) -> None:
+        rows = []
+        for e in batch:
+            ctx = dict(e.ctx)
+            miner_id = ctx.pop("miner_id", None)
+            rows.append((e.ts, e.level, e.message, miner_id, json.dumps(ctx, default=str) if ctx else None))
+        try:
+            with conn:
+                conn.executemany("INSERT INTO events (ts, level, message, miner_id, ctx) VALUES (?, ?, ?, ?, ?)", rows)
+            with self._lock:
+                self.written += len(rows)
+                self.batches += 1
+        except sqlite3.Error as e:
+            with self._lock:
+                self.errors += 1
+                self.dropped += len(rows)
+            self.logger.error(f"event journal write failed: {e}")
+
+    def _prune(self, conn: sqlite3.Connection) -> None:
+        self._pruned_at = time.time()
+        if self.retention_days <= 0:
+            return
+        try:
+            with conn:
+                conn.execute("DELETE FROM events WHERE ts < ?", (time.time() - self.retention_days * 86400,))
+        except sqlite3.Error as e:
+            self.logger.error(f"event journal prune failed: {e}")
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until everything appended so far has been written."""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        if not self._thread.is_alive():
+            return
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "path": self.path,
+                "queued": self._queue.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "errors": self.errors,
+            }
+
+    @staticmethod
+    def _row(r: sqlite3.Row) -> Dict[str, Any]:
+        ctx = json.loads(r["ctx"]) if r["ctx"] else {}
+        if r["miner_id"] is not None:
+            ctx["miner_id"] = r["miner_id"]
+        return {"id": r["id"], "ts": r["ts"], "level": r["level"], "message": r["message"], "ctx": ctx}
+
+    def query(
+        self,
+        miner_id: Optional[str] = None,
+        level: Optional[str] = None,
+        message: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        before_id: Optional[int] = None,
+        limit: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """Newest first; page backwards with ``before_id`` = smallest id of the previous page."""
+        clauses, params = self._filters(miner_id, level, since, until)
+        if message:
+            clauses.append("message = ?")
+            params.append(message)
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"SELECT * FROM events{where} ORDER BY ts DESC, id DESC LIMIT ?", params + [max(1, limit)]
+            ).fetchall()
+        return [self._row(r) for r in rows]
+
+    def summary(
+        self, miner_id: Optional[str] = None, level: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Event counts per miner, level and message over a time range."""
+        clauses, params = self._filters(miner_id, level, since, until)
+        where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT miner_id, level, message, COUNT(*) AS count, MIN(ts) AS first_ts, MAX(ts) AS last_ts"
+                f" FROM events{where} GROUP BY miner_id, level, message ORDER BY count DESC",
+                params,
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    @staticmethod
+    def _filters(
+        miner_id: Optional[str], level: Optional[str], since: Optional[float], until: Optional[float]
+    ) -> Tuple[List[str], List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        if miner_id:
+            clauses.append("miner_id = ?")
+            params.append(miner_id)
+        if level:
+            clauses.append("level = ?")
+            params.append(level.upper())
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        if until is not None:
+            clauses.append("ts <= ?")
+            params.append(until)
+        return clauses, params
+
+    def crash_state(
+        self, window_sec: float, now: Optional[float] = None, skip_categories: Iterable[str] = ()
+    ) -> Dict[str, Tuple[List[float], bool]]:
+        """Per miner: exit timestamps within ``window_sec`` since the last quarantine release, and
+        whether it is still quarantined (last quarantine event not followed by a release).
+        Exits whose ``category`` is in ``skip_categories`` are not counted."""
+        now = now or time.time()
+        skip = list(skip_categories)
+        state: Dict[str, Tuple[List[float], bool]] = {}
+        with self._connect() as conn:
+            # SQLite returns the row holding MAX(ts) for the bare column
+            marks = {
+                r["miner_id"]: (r["message"], r["ts"])
+                for r in conn.execute(
+                    "SELECT miner_id, message, MAX(ts) AS ts FROM events"
+                    " WHERE message IN (?, ?) AND miner_id IS NOT NULL GROUP BY miner_id",
+                    (QUARANTINED, RELEASED),
+                )
+            }
+            exits: Dict[str, List[float]] = {}
+            skip_sql = (
+                f" AND COALESCE(json_extract(ctx, '$.category'), '') NOT IN ({', '.join('?' * len(skip))})" if skip else ""
+            )
+            for r in conn.execute(
+                f"SELECT miner_id, ts FROM events WHERE message = ? AND ts >= ? AND miner_id IS NOT NULL{skip_sql} ORDER BY ts",
+                [EXITED, now - window_sec] + skip,
+            ):
+                exits.setdefault(r["miner_id"], []).append(r["ts"])
+        for mid in set(marks) | set(exits):
+            mark = marks.get(mid)
+            released_at = mark[1] if mark and mark[0] == RELEASED else 0.0
+            state[mid] = (
+                [t for t in exits.get(mid, []) if t > released_at],
+                bool(mark and mark[0] == QUARANTINED),
+            )
+        return state
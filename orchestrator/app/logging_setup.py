@@ -1,23 +1,116 @@
+import atexit
+import contextvars
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
-from typing import Optional
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Iterator, Optional
 
 _DEFAULT_LOG_LEVEL = os.environ.get("MINER_LOG_LEVEL", "INFO").upper()
 
+# Correlation fields stamped onto every record emitted in the current context
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+miner_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("miner_id", default=None)
 
-def setup_logging(log_directory: str, level: str | int = _DEFAULT_LOG_LEVEL) -> None:
+_CONTEXT_VARS = {"request_id": request_id_var, "miner_id": miner_id_var}
+
+# Attributes every LogRecord has; anything else came in through ``extra=`` and is emitted as a field
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+_listener: Optional["_DrainingListener"] = None
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+
+@contextmanager
+def log_context(**fields: Optional[str]) -> Iterator[None]:
+    """Bind ``request_id`` / ``miner_id`` for every log record emitted inside the block."""
+    tokens = [(_CONTEXT_VARS[k], _CONTEXT_VARS[k].set(v)) for k, v in fields.items()]
+    try:
+        yield
+    finally:
+        for var, token in reversed(tokens):
+            var.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        for name, var in _CONTEXT_VARS.items():
+            # An explicit extra={"miner_id": ...} wins over the ambient context
+            if getattr(record, name, None) is None:
+                setattr(record, name, var.get())
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(record.created))
+            + f".{int(record.msecs):03d}"
+            + time.strftime("%z", time.localtime(record.created)),
+            "lvl": record.levelname,
+            "msg": record.getMessage(),
+            "logger": record.name,
+            "thread": record.threadName,
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and value is not None and not key.startswith("_"):
+                out[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that never blocks the caller: records are dropped (and counted) when full."""
+
+    def __init__(self, q: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(q)
+        self._dropped_lock = threading.Lock()
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback on the emitting thread, but keep them as
+        # separate fields instead of QueueHandler's pre-formatted text
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class _DrainingListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        # The stock put_nowait fails on a full queue and would leave the thread running
+        self.queue.put(self._sentinel, timeout=5)
+
+
+def setup_logging(log_directory: str, level: str | int = _DEFAULT_LOG_LEVEL, queue_size: int = 10000) -> None:
+    global _listener, _queue_handler
     os.makedirs(log_directory, exist_ok=True)
     root_logger = logging.getLogger()
     root_logger.setLevel(level)
 
+    formatter = JsonFormatter()
+
     # Console handler
     ch = logging.StreamHandler()
     ch.setLevel(level)
-    ch.setFormatter(logging.Formatter(
-        fmt='{"ts":"%(asctime)s","lvl":"%(levelname)s","msg":"%(message)s","logger":"%(name)s"}',
-        datefmt="%Y-%m-%dT%H:%M:%S%z",
-    ))
+    ch.setFormatter(formatter)
 
     # Rotating file handler
     fh = RotatingFileHandler(
@@ -27,18 +120,47 @@ def setup_logging(log_directory: str, level: str | int = _DEFAULT_LOG_LEVEL) ->
         encoding="utf-8",
     )
     fh.setLevel(level)
-    fh.setFormatter(logging.Formatter(
-        fmt='{"ts":"%(asctime)s","lvl":"%(levelname)s","msg":"%(message)s","logger":"%(name)s"}',
-        datefmt="%Y-%m-%dT%H:%M:%S%z",
-    ))
+    fh.setFormatter(formatter)
 
     # Avoid duplicate handlers if reconfigured
+    shutdown_logging()
     for h in list(root_logger.handlers):
         root_logger.removeHandler(h)
 
-    root_logger.addHandler(ch)
-    root_logger.addHandler(fh)
+    # Callers only enqueue; console and file I/O happen on the listener thread
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=max(1, queue_size))
+    _queue_handler = DroppingQueueHandler(q)
+    _queue_handler.addFilter(ContextFilter())
+    _listener = _DrainingListener(q, ch, fh, respect_handler_level=True)
+    _listener.start()
+    root_logger.addHandler(_queue_handler)
+
+
+def shutdown_logging() -> None:
+    """Drain the queue and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()
+        except Exception:
+            pass
+        for h in _listener.handlers:
+            try:
+                h.close()
+            except Exception:
+                pass
+        _listener = None
+
+
+def logging_stats() -> Dict[str, int]:
+    h = _queue_handler
+    if h is None:
+        return {"queued": 0, "capacity": 0, "dropped": 0}
+    return {"queued": h.queue.qsize(), "capacity": h.queue.maxsize, "dropped": h.dropped}
 
 
 def get_logger(name: Optional[str] = None) -> logging.Logger:
     return logging.getLogger(name)
+
+
+atexit.register(shutdown_logging)
@@ -1,33 +1,90 @@
 from __future__ import annotations
-import os
 import glob
+import gzip
+import os
 import shutil
-from typing import Optional
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
 
+from .logging_setup import get_logger
 
-def rotate_logs(directory: str, rotate_mb: int, keep: int) -> None:
-    os.makedirs(directory, exist_ok=True)
-    max_bytes = max(1, rotate_mb) * 1024 * 1024
-    for path in glob.glob(os.path.join(directory, "*.log")):
-        try:
-            size = os.path.getsize(path)
-            if size < max_bytes:
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def segment_path(path: str, index: int, compress: bool) -> str:
+    return f"{path}.{index}.gz" if compress else f"{path}.{index}"
+
+
+def shift_segments(path: str, keep: int, compress: bool) -> None:
+    """Make room for a new ``.1`` segment: ``.N`` -> ``.N+1``, dropping anything past ``keep``.
+
+    Both compressed and plain segments are shifted, so a segment left uncompressed by a
+    failed compression still counts towards ``keep``.
+    """
+    for i in range(keep, 0, -1):
+        for gz in (compress, not compress):
+            src = segment_path(path, i, gz)
+            if not os.path.exists(src):
                 continue
-            # Rotate: file -> file.1, shift older up to .keep
-            for i in range(keep, 0, -1):
-                older = f"{path}.{i}"
-                oldest = f"{path}.{i+1}"
-                if os.path.exists(older):
-                    if i == keep:
-                        try:
-                            os.remove(older)
-                        except FileNotFoundError:
-                            pass
-                    else:
-                        shutil.move(older, oldest)
-            shutil.move(path, f"{path}.1")
-            # Recreate file
-            open(path, "w").close()
-        except Exception:
-            # Best-effort; ignore rotation errors
-            pass
+            if i >= keep:
+                os.remove(src)
+            else:
+                os.replace(src, segment_path(path, i + 1, gz))
+
+
+def compress_segment(src: str, dest: str) -> None:
+    tmp = dest + ".tmp"
+    try:
+        with open(src, "rb") as fin, gzip.open(tmp, "wb", compresslevel=6) as fout:
+            shutil.copyfileobj(fin, fout, 1024 * 1024)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.remove(src)
+
+
+def finalize_rotation(path: str, rotated: str, keep: int, compress: bool) -> None:
+    """Turn a renamed-away live file into segment ``.1`` (gzip-compressed if requested)."""
+    try:
+        if keep <= 0:
+            os.remove(rotated)
+            return
+        shift_segments(path, keep, compress)
+        if compress:
+            compress_segment(rotated, segment_path(path, 1, True))
+        else:
+            os.replace(rotated, segment_path(path, 1, False))
+    except Exception as e:
+        get_logger(__name__).error(f"log rotation of {path} failed: {e}")
+        if not os.path.exists(rotated):
+            return
+        try:
+            # Keep it as a plain segment; shift_segments() ages those out too
+            os.replace(rotated, segment_path(path, 1, False))
+        except OSError as e2:
+            get_logger(__name__).error(f"could not keep rotated segment {rotated}: {e2}")
+
+
+def stale_rotations(path: str) -> List[str]:
+    """``.rotating.<pid>.<n>`` files of ``path`` left by another process that died mid-rotation."""
+    own = f"{path}.rotating.{os.getpid()}."
+    # Ours may still be queued for finalize_rotation()
+    return sorted(p for p in glob.glob(glob.escape(path) + ".rotating.*") if not p.startswith(own))
+
+
+def submit(fn: Callable[..., None], *args) -> Future:
+    """Run rotation work on the single background worker.
+
+    One worker serializes segment shifting, so back-to-back rotations of the same file
+    can't race each other.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="log-rotate")
+        return _executor.submit(fn, *args)
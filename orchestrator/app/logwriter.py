@@ -0,0 +1,151 @@
+from __future__ import annotations
+import itertools
+import os
+import threading
+import time
+import weakref
+from dataclasses import dataclass
+from typing import List, Optional
+
+from . import logrotate
+from .profiling import timings
+
+
+@dataclass
+class LogWriterOptions:
+    max_bytes: int = 50 * 1024 * 1024
+    keep: int = 10
+    flush_interval_sec: float = 1.0
+    buffer_bytes: int = 64 * 1024
+    compress: bool = True
+
+
+_rotation_seq = itertools.count(1)
+
+
+class MinerLogWriter:
+    """Batched append-only log file with inline size rotation.
+
+    Lines are buffered and written with one ``write`` per batch; a batch is flushed when it
+    reaches ``buffer_bytes`` or is older than ``flush_interval_sec`` (enforced by a shared
+    flusher thread when the miner goes quiet). Rotation happens on the writer's own byte
+    count, so no directory scans are needed and the handle is always reopened on the new file.
+    """
+
+    def __init__(self, path: str, options: Optional[LogWriterOptions] = None) -> None:
+        self.path = path
+        self.options = options or LogWriterOptions()
+        self._lock = threading.Lock()
+        self._buf: List[str] = []
+        self._buf_bytes = 0
+        self._first_buffered = 0.0
+        self._fd: Optional[int] = None
+        self._size = 0
+        for rotated in logrotate.stale_rotations(path):
+            logrotate.submit(logrotate.finalize_rotation, path, rotated, self.options.keep, self.options.compress)
+        _flusher.register(self)
+
+    def write(self, line: str) -> None:
+        with self._lock:
+            if not self._buf:
+                self._first_buffered = time.monotonic()
+            self._buf.append(line)
+            # Character count is close enough to bytes for the batching bound
+            self._buf_bytes += len(line)
+            if self._buf_bytes >= self.options.buffer_bytes:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def flush_if_due(self, now: float) -> None:
+        with self._lock:
+            if self._buf and now - self._first_buffered >= self.options.flush_interval_sec:
+                self._flush_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            self._flush_locked()
+            self._close_locked()
+
+    def _open_locked(self) -> None:
+        if self._fd is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            self._size = os.fstat(self._fd).st_size
+
+    def _close_locked(self) -> None:
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+
+    def _flush_locked(self) -> None:
+        if not self._buf:
+            return
+        t0 = time.perf_counter()
+        data = "".join(self._buf).encode("utf-8", errors="replace")
+        self._buf.clear()
+        self._buf_bytes = 0
+        try:
+            self._open_locked()
+            if self._size > 0 and self._size + len(data) > self.options.max_bytes:
+                self._rotate_locked()
+            view = memoryview(data)
+            while view:
+                n = os.write(self._fd, view)
+                view = view[n:]
+            self._size += len(data)
+        except OSError:
+            # Disk full or similar: drop the batch rather than wedge the pump thread
+            self._close_locked()
+        timings.observe("log.flush", time.perf_counter() - t0)
+
+    def _rotate_locked(self) -> None:
+        self._close_locked()
+        rotated = f"{self.path}.rotating.{os.getpid()}.{next(_rotation_seq)}"
+        try:
+            os.replace(self.path, rotated)
+        except FileNotFoundError:
+            # Removed underneath us; just start a fresh file
+            self._open_locked()
+            return
+        self._open_locked()
+        logrotate.submit(
+            logrotate.finalize_rotation, self.path, rotated, self.options.keep, self.options.compress
+        )
+
+
+class _Flusher:
+    """One thread enforcing the time bound for every live writer."""
+
+    def __init__(self, interval_sec: float = 0.25) -> None:
+        self.interval_sec = interval_sec
+        self._writers: "weakref.WeakSet[MinerLogWriter]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, writer: MinerLogWriter) -> None:
+        with self._lock:
+            self._writers.add(writer)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="log-flusher", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.interval_sec)
+            now = time.monotonic()
+            with self._lock:
+                writers = list(self._writers)
+            for w in writers:
+                try:
+                    w.flush_if_due(now)
+                except Exception:
+                    pass
+
+
+_flusher = _Flusher()
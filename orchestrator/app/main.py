@@ -1,49 +1,63 @@
 from __future__ import annotations
+import asyncio
 import os
-import threading
 import time
-from typing import List
+from contextlib import asynccontextmanager
+from typing import List, Optional
 
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware import Middleware
+from fastapi.responses import JSONResponse
 import uuid
 
-from .config import ConfigLoader
 from .auth import verify_api_key
-from .metrics import SystemMetricsCollector
-from .miner_manager import MinerManager
-from .models import HealthResponse, MinerRuntime, MinerMetrics
-from .logging_setup import setup_logging, get_logger
-from .models import MinerDefinition
-from .events import EventLogger
-from .logrotate import rotate_logs
+from .models import BenchRunRequest, HealthResponse, MinerGroup, MinerHealth, MinerRuntime, MinerMetrics, PoolStatus, ShareReport
+from .logging_setup import get_logger, log_context, logging_stats
+from .profiling import timings
+from .services import Services, StartupReport
 
 APP_VERSION = "1.0.0"
+MAX_PROFILE_SECONDS = 300.0
 
+_IMPORTED_AT = time.perf_counter()
 
-def create_app() -> FastAPI:
-    cfg_loader = ConfigLoader()
-    cfg = cfg_loader.config
 
-    setup_logging(cfg.logging.directory, cfg.logging.level)
+def create_app(config_path: Optional[str] = None) -> FastAPI:
+    """Build the API. Side-effect free: config, logging, managers and miners come up in the lifespan."""
+    svc = Services(config_path, StartupReport(origin=_IMPORTED_AT))
     logger = get_logger(__name__)
 
-    # Simple Request ID middleware
-    def request_id_middleware(app):
-        async def middleware(request: Request, call_next):
-            req_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
-            response = await call_next(request)
-            response.headers["X-Request-ID"] = req_id
-            return response
-        return middleware
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        try:
+            svc.start()
+        except Exception as e:
+            svc.report.set_phase("failed", error=str(e))
+            raise
+        app.state.miner_manager = svc.miner_manager
+        # Miners spawn in the background; the API serves (and reports not-ready) meanwhile
+        svc.spawn()
+        logger.info(f"orchestrator serving: {svc.report.snapshot()}")
+        try:
+            yield
+        finally:
+            svc.stop()
 
-    app = FastAPI(title="Advanced Mining Suite", version=APP_VERSION)
+    app = FastAPI(title="Advanced Mining Suite", version=APP_VERSION, lifespan=lifespan)
+    app.state.services = svc
 
+    # Request ID middleware: bound to every log record emitted while handling the request
     @app.middleware("http")
     async def add_request_id(request: Request, call_next):
         req_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
-        response = await call_next(request)
+        t0 = time.perf_counter()
+        with log_context(request_id=req_id):
+            response = await call_next(request)
+        # The router stores the matched route in the shared scope; unmatched paths share one bucket
+        route = request.scope.get("route")
+        timings.observe(
+            f"route.{request.method} {getattr(route, 'path', '<unmatched>')}", time.perf_counter() - t0
+        )
         response.headers["X-Request-ID"] = req_id
         return response
 
@@ -57,128 +71,305 @@ def create_app() -> FastAPI:
     )
 
     # Auth dependency
-    api_key_dep = verify_api_key(lambda: cfg_loader.config.api.api_key)
-
-    # Managers
-    events = EventLogger()
-    miner_manager = MinerManager(
-        log_directory=cfg.logging.directory,
-        get_scheduling=lambda: cfg_loader.config.scheduling,
-        events=events,
-    )
-
-    # Register miners
-    for m in cfg.miners:
-        try:
-            miner_manager.register(MinerDefinition(**m.__dict__))
-        except Exception as e:
-            logger.error(f"failed registering miner {m.id}: {e}")
+    api_key_dep = verify_api_key(svc.api_key)
 
-    # System metrics
-    sys_metrics = SystemMetricsCollector(interval_sec=cfg.telemetry.metrics_interval_sec)
-    if cfg.telemetry.enable_system_metrics:
-        sys_metrics.start()
-
-    # Background updater
-    def background_loop() -> None:
-        last_rotate = 0.0
-        while True:
-            try:
-                if cfg_loader.maybe_reload():
-                    logger.info("config reloaded")
-                    # Apply dynamic changes for miners (add/update/remove)
-                    # Build set of desired IDs
-                    desired = {m.id: m for m in cfg_loader.config.miners}
-                    miner_manager.synchronize(desired)
-                miner_manager.update_statuses()
-                miner_manager.watchdog()
-                # Rotate logs roughly once per minute
-                now = time.time()
-                if now - last_rotate > 60:
-                    rotate_logs(cfg.logging.directory, cfg.logging.rotate_mb, cfg.logging.keep)
-                    last_rotate = now
-            except Exception as e:
-                logger.error(f"background loop error: {e}")
-            time.sleep(2)
-
-    threading.Thread(target=background_loop, name="bg-loop", daemon=True).start()
+    def _health() -> HealthResponse:
+        r = svc.report
+        return HealthResponse(
+            status="ok", version=APP_VERSION, live=True, ready=r.ready, phase=r.phase, ready_after_ms=r.ready_after_ms
+        )
 
+    # Liveness: the process serves requests. Readiness: startup, including the initial spawn, finished
     @app.get("/api/health", response_model=HealthResponse)
     async def health():
-        return HealthResponse(status="ok", version=APP_VERSION)
+        return _health()
+
+    @app.get("/api/health/ready", response_model=HealthResponse)
+    async def health_ready():
+        h = _health()
+        return JSONResponse(h.model_dump(), status_code=200 if h.ready else 503)
+
+    @app.get("/api/metrics/startup", dependencies=[Depends(api_key_dep)])
+    async def get_startup():
+        return svc.report.snapshot()
 
     @app.get("/api/miners", dependencies=[Depends(api_key_dep)], response_model=List[MinerRuntime])
     async def list_miners():
-        return [rt for _, rt in miner_manager.list_miners()]
+        return [rt for _, rt in svc.miner_manager.list_miners()]
+
+    def _released(action, miner_id: str) -> None:
+        # Blocking manager calls run on a worker thread, off the event loop
+        svc.miner_manager.release_quarantine(miner_id)
+        action(miner_id)
+
+    # Registered before the {miner_id} routes, which would otherwise capture "all"
+    @app.post("/api/miners/all/start", dependencies=[Depends(api_key_dep)])
+    async def start_all():
+        await asyncio.to_thread(svc.miner_manager.start_all)
+        return {"status": "starting"}
+
+    @app.post("/api/miners/all/stop", dependencies=[Depends(api_key_dep)])
+    async def stop_all():
+        await asyncio.to_thread(svc.miner_manager.stop_all)
+        return {"status": "stopped"}
 
     @app.post("/api/miners/{miner_id}/start", dependencies=[Depends(api_key_dep)])
     async def start_miner(miner_id: str):
-        if miner_id not in miner_manager.adapters:
+        if miner_id not in svc.miner_manager.adapters:
             raise HTTPException(status_code=404, detail="Miner not found")
-        miner_manager.start(miner_id)
+        # An operator start is the way out of quarantine
+        await asyncio.to_thread(_released, svc.miner_manager.start, miner_id)
         return {"status": "starting"}
 
     @app.post("/api/miners/{miner_id}/stop", dependencies=[Depends(api_key_dep)])
     async def stop_miner(miner_id: str):
-        if miner_id not in miner_manager.adapters:
+        if miner_id not in svc.miner_manager.adapters:
             raise HTTPException(status_code=404, detail="Miner not found")
-        miner_manager.stop(miner_id)
+        await asyncio.to_thread(svc.miner_manager.stop, miner_id)
         return {"status": "stopped"}
 
     @app.post("/api/miners/{miner_id}/restart", dependencies=[Depends(api_key_dep)])
     async def restart_miner(miner_id: str):
-        if miner_id not in miner_manager.adapters:
+        if miner_id not in svc.miner_manager.adapters:
             raise HTTPException(status_code=404, detail="Miner not found")
-        miner_manager.restart(miner_id)
+        await asyncio.to_thread(_released, svc.miner_manager.restart, miner_id)
         return {"status": "restarting"}
 
-    @app.post("/api/miners/all/start", dependencies=[Depends(api_key_dep)])
-    async def start_all():
-        miner_manager.start_all()
-        return {"status": "starting"}
-
-    @app.post("/api/miners/all/stop", dependencies=[Depends(api_key_dep)])
-    async def stop_all():
-        miner_manager.stop_all()
+    def _group(group_id: str) -> MinerGroup:
+        g = svc.miner_manager.group_status(group_id)
+        if g is None:
+            raise HTTPException(status_code=404, detail="Replica group not found")
+        return g
+
+    @app.get("/api/groups", dependencies=[Depends(api_key_dep)], response_model=List[MinerGroup])
+    async def list_groups():
+        return svc.miner_manager.list_groups()
+
+    @app.get("/api/groups/{group_id}", dependencies=[Depends(api_key_dep)], response_model=MinerGroup)
+    async def get_group(group_id: str):
+        return _group(group_id)
+
+    @app.post("/api/groups/{group_id}/start", dependencies=[Depends(api_key_dep)])
+    async def start_group(group_id: str):
+        _group(group_id)
+        failed = await asyncio.to_thread(svc.miner_manager.start_group, group_id)
+        return {"status": "starting", "failed": failed}
+
+    @app.post("/api/groups/{group_id}/stop", dependencies=[Depends(api_key_dep)])
+    async def stop_group(group_id: str):
+        _group(group_id)
+        await asyncio.to_thread(svc.miner_manager.stop_group, group_id)
         return {"status": "stopped"}
 
+    @app.post("/api/groups/{group_id}/restart", dependencies=[Depends(api_key_dep)])
+    async def restart_group(group_id: str):
+        _group(group_id)
+        failed = await asyncio.to_thread(svc.miner_manager.restart_group, group_id)
+        return {"status": "restarted", "failed": failed}
+
     @app.get("/api/metrics/system", dependencies=[Depends(api_key_dep)])
     async def get_system_metrics():
-        m = sys_metrics.latest
+        m = svc.sys_metrics.latest
         return (m.dict() if m else {})
 
     @app.get("/api/metrics/miners", dependencies=[Depends(api_key_dep)], response_model=List[MinerMetrics])
     async def get_miner_metrics():
-        return miner_manager.get_metrics()
+        return svc.miner_manager.get_metrics()
+
+    @app.get("/api/metrics/health", dependencies=[Depends(api_key_dep)], response_model=List[MinerHealth])
+    async def get_miner_health():
+        return svc.miner_manager.list_health()
+
+    @app.get("/api/metrics/miners/{miner_id}/shares", dependencies=[Depends(api_key_dep)], response_model=ShareReport)
+    async def get_share_report(miner_id: str):
+        if miner_id not in svc.miner_manager.adapters:
+            raise HTTPException(status_code=404, detail="Miner not found")
+        return svc.miner_manager.share_report(miner_id)
 
     @app.get("/api/miners/{miner_id}", dependencies=[Depends(api_key_dep)])
     async def get_miner(miner_id: str):
-        if miner_id not in miner_manager.adapters:
+        if miner_id not in svc.miner_manager.adapters:
             raise HTTPException(status_code=404, detail="Miner not found")
-        rt = miner_manager.runtime.get(miner_id)
-        mt = miner_manager.metrics.get(miner_id)
-        df = miner_manager.adapters[miner_id].definition
+        rt = svc.miner_manager.get_runtime(miner_id)
+        mt = svc.miner_manager.get_miner_metrics(miner_id)
+        hl = svc.miner_manager.get_health(miner_id)
+        df = svc.miner_manager.adapters[miner_id].definition
         return {
             "runtime": rt.dict() if rt else {},
             "metrics": mt.dict() if mt else {},
+            "health": hl.dict() if hl else {},
             "definition": df.dict() if hasattr(df, 'dict') else df.__dict__,
         }
 
+    @app.get("/api/metrics/logging", dependencies=[Depends(api_key_dep)])
+    async def get_logging_stats():
+        stats = logging_stats()
+        if svc.journal:
+            stats["journal"] = svc.journal.stats()
+        return stats
+
+    @app.get("/api/metrics/cgroups", dependencies=[Depends(api_key_dep)])
+    async def get_cgroup_stats():
+        if not svc.cgroups:
+            return {"available": False, "reason": "disabled in config", "miners": {}}
+        # Sampled by update_statuses(); reading here too would skew its cpu_percent window
+        runtime = svc.miner_manager.runtime
+        return dict(svc.cgroups.status(), miners={mid: rt.snapshot()["cgroup"] for mid, rt in list(runtime.items())})
+
+    @app.get("/api/metrics/timings", dependencies=[Depends(api_key_dep)])
+    async def get_timings():
+        return timings.snapshot()
+
+    profile_lock = asyncio.Lock()
+
+    def _artifact(content: bytes | str, filename: str, media_type: str) -> Response:
+        return Response(
+            content=content,
+            media_type=media_type,
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    @app.get("/api/debug/profile", dependencies=[Depends(api_key_dep)])
+    async def debug_profile(seconds: float = 10.0, mode: str = "sampling", fmt: str = "pstats", interval_ms: float = 5.0):
+        if mode not in ("sampling", "cprofile"):
+            raise HTTPException(status_code=400, detail="mode must be 'sampling' or 'cprofile'")
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        if profile_lock.locked():
+            raise HTTPException(status_code=409, detail="Another capture is in progress")
+        from .profiling import profile_stats, sample_stacks
+
+        async with profile_lock:
+            stamp = time.strftime("%Y%m%d-%H%M%S")
+            if mode == "sampling":
+                # All threads, as collapsed stacks (flamegraph.pl / speedscope input)
+                text = await asyncio.to_thread(sample_stacks, seconds, max(interval_ms, 1.0) / 1000.0)
+                return _artifact(text, f"stacks-{stamp}.txt", "text/plain")
+            # cProfile is per-thread; this covers the event loop thread, i.e. every API handler
+            import cProfile
+
+            prof = cProfile.Profile()
+            prof.enable()
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                prof.disable()
+            if fmt == "text":
+                return _artifact(profile_stats(prof, "text"), f"profile-{stamp}.txt", "text/plain")
+            return _artifact(profile_stats(prof), f"profile-{stamp}.prof", "application/octet-stream")
+
+    @app.get("/api/debug/tracemalloc", dependencies=[Depends(api_key_dep)])
+    async def debug_tracemalloc(seconds: float = 10.0, top: int = 50):
+        seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+        if profile_lock.locked():
+            raise HTTPException(status_code=409, detail="Another capture is in progress")
+        from .profiling import tracemalloc_diff
+
+        async with profile_lock:
+            text = await asyncio.to_thread(tracemalloc_diff, seconds, max(1, min(top, 500)))
+            return _artifact(text, f"tracemalloc-{time.strftime('%Y%m%d-%H%M%S')}.txt", "text/plain")
+
+    @app.post("/api/bench/runs", dependencies=[Depends(api_key_dep)], status_code=202)
+    async def start_bench(req: BenchRunRequest):
+        try:
+            return svc.bench().start_job(req.miners, req.layouts, req.warmup_sec, req.duration_sec)
+        except KeyError as e:
+            raise HTTPException(status_code=404, detail=str(e).strip("'\""))
+        except RuntimeError as e:
+            raise HTTPException(status_code=409, detail=str(e))
+
+    @app.get("/api/bench/runs/current", dependencies=[Depends(api_key_dep)])
+    async def get_bench_job():
+        job = svc.bench().job()
+        if not job:
+            raise HTTPException(status_code=404, detail="No benchmark job")
+        return job
+
+    @app.delete("/api/bench/runs/current", dependencies=[Depends(api_key_dep)])
+    async def cancel_bench_job():
+        if not svc.bench().cancel():
+            raise HTTPException(status_code=404, detail="No running benchmark job")
+        return {"status": "cancelling"}
+
+    def _bench_host(host: str) -> Optional[str]:
+        # "current" (default) limits results to this machine, "all" compares across hosts
+        return svc.bench().host if host == "current" else None if host == "all" else host
+
+    @app.get("/api/bench/results", dependencies=[Depends(api_key_dep)])
+    async def list_bench_results(
+        algo: Optional[str] = None,
+        miner_id: Optional[str] = None,
+        miner_type: Optional[str] = None,
+        host: str = "current",
+        limit: int = 200,
+    ):
+        return svc.bench().store.results(
+            limit=min(limit, 5000), algo=algo, miner_id=miner_id, miner_type=miner_type, host=_bench_host(host)
+        )
+
+    @app.get("/api/bench/compare", dependencies=[Depends(api_key_dep)])
+    async def compare_bench_results(
+        algo: Optional[str] = None,
+        miner_type: Optional[str] = None,
+        binary_version: Optional[str] = None,
+        layout: Optional[str] = None,
+        host: str = "current",
+    ):
+        return svc.bench().store.compare(
+            algo=algo, miner_type=miner_type, binary_version=binary_version, layout=layout, host=_bench_host(host)
+        )
+
+    @app.get("/api/bench/hosts", dependencies=[Depends(api_key_dep)])
+    async def list_bench_hosts():
+        runner = svc.bench()
+        return {"current": runner.host, "hosts": runner.store.hosts()}
+
+    @app.get("/api/pools", dependencies=[Depends(api_key_dep)], response_model=List[PoolStatus])
+    async def list_pools():
+        return svc.prober.status()
+
     @app.get("/api/events", dependencies=[Depends(api_key_dep)])
     async def list_events(limit: int = 200):
-        return [e.__dict__ for e in events.list(limit=limit)]
+        return [e.__dict__ for e in svc.events.list(limit=limit)]
+
+    def _journal():
+        if not svc.journal:
+            raise HTTPException(status_code=404, detail="Event journal disabled")
+        return svc.journal
+
+    @app.get("/api/events/history", dependencies=[Depends(api_key_dep)])
+    async def event_history(
+        miner_id: Optional[str] = None,
+        level: Optional[str] = None,
+        message: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        before_id: Optional[int] = None,
+        limit: int = 200,
+    ):
+        journal = _journal()
+        return await asyncio.to_thread(
+            journal.query, miner_id, level, message, since, until, before_id, max(1, min(limit, 5000))
+        )
+
+    @app.get("/api/events/summary", dependencies=[Depends(api_key_dep)])
+    async def event_summary(
+        miner_id: Optional[str] = None, level: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None
+    ):
+        journal = _journal()
+        return await asyncio.to_thread(journal.summary, miner_id, level, since, until)
 
     @app.post("/api/config/reload", dependencies=[Depends(api_key_dep)])
     async def reload_config():
-        cfg_loader.reload()
-        miner_manager.synchronize({m.id: m for m in cfg_loader.config.miners})
+        await asyncio.to_thread(svc.cfg_loader.reload)
+        await asyncio.to_thread(svc.miner_manager.synchronize, svc.desired_miners())
         return {"status": "reloaded"}
 
     @app.get("/api/logs/{miner_id}", dependencies=[Depends(api_key_dep)])
     async def tail_logs(miner_id: str, lines: int = 200):
-        if miner_id not in miner_manager.adapters:
+        if miner_id not in svc.miner_manager.adapters:
             raise HTTPException(status_code=404, detail="Miner not found")
-        base = cfg.logging.directory
+        svc.miner_manager.adapters[miner_id].flush_logs()
+        base = svc.miner_manager.log_directory
         outp = os.path.join(base, f"{miner_id}.out.log")
         errp = os.path.join(base, f"{miner_id}.err.log")
         def _tail(path: str) -> str:
@@ -193,4 +384,9 @@ def create_app() -> FastAPI:
     return app
 
 
-app = create_app()
+def __getattr__(name: str):
+    # ``uvicorn orchestrator.app.main:app`` keeps working, but importing this module builds nothing
+    if name == "app":
+        app = globals()["app"] = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
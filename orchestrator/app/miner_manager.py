@@ -1,16 +1,31 @@
 from __future__ import annotations
 import os
-import threading
 import time
-from typing import Dict, Optional, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Set, Tuple
 
-from .models import MinerDefinition, MinerRuntime, MinerMetrics
+from .models import MinerDefinition, MinerGroup, MinerHealth, MinerRuntime, MinerMetrics, ShareReport
 from .adapters import MinerAdapter, XMRigAdapter, CpuMinerOptAdapter
+from .cgroups import CgroupManager
 from .utils import BackoffState
 from .logging_setup import get_logger
 from .events import EventLogger
+from .exit_cause import ExitCause
+from .health import DETECTED, FAILOVER, RECOVERED, RESTART, PerformanceHealth
+from .logwriter import LogWriterOptions
+from .pool_probe import PoolProber, PoolSelection, choose_failover
+from .profiling import InstrumentedRLock
+from .state import MinerState, health_model, metrics_model, runtime_model
+from .topology import expand_replicas
 
 
+EFFECTIVE_HASHRATE_WINDOW_SEC = 900
+# Crash loop: CRASH_LIMIT exits within CRASH_WINDOW_SEC quarantine the miner
+CRASH_WINDOW_SEC = 600
+CRASH_LIMIT = 5
+# Backoff starts over once a miner has stayed up this long
+STABLE_UPTIME_SEC = 300
+
 ADAPTERS = {
     "xmrig": XMRigAdapter,
     "cpuminer-opt": CpuMinerOptAdapter,
@@ -18,13 +33,24 @@ ADAPTERS = {
 
 
 class MinerManager:
-    def __init__(self, log_directory: str, get_scheduling=None, events: Optional[EventLogger] = None) -> None:
+    def __init__(
+        self,
+        log_directory: str,
+        get_scheduling=None,
+        events: Optional[EventLogger] = None,
+        prober: Optional[PoolProber] = None,
+        get_pools=None,
+        log_options: Optional[LogWriterOptions] = None,
+        cgroups: Optional[CgroupManager] = None,
+        get_health_config=None,
+    ) -> None:
         self.log_directory = log_directory
+        self.log_options = log_options
         os.makedirs(self.log_directory, exist_ok=True)
-        self._lock = threading.RLock()
+        self._lock = InstrumentedRLock("miner_manager")
         self.adapters: Dict[str, MinerAdapter] = {}
-        self.runtime: Dict[str, MinerRuntime] = {}
-        self.metrics: Dict[str, MinerMetrics] = {}
+        # Written under self._lock only; readers outside it use snapshot()/the model accessors
+        self.runtime: Dict[str, MinerState] = {}
         self.backoff: Dict[str, BackoffState] = {}
         self.logger = get_logger(__name__)
         self.get_scheduling = get_scheduling or (lambda: None)
@@ -32,28 +58,83 @@ class MinerManager:
         self.autoswitch_idx: int = 0
         self.last_switch_time: float = 0.0
         self.restart_history: Dict[str, List[float]] = {}
+        self.prober = prober
+        self.get_pools = get_pools or (lambda: None)
+        self.pool_state: Dict[str, PoolSelection] = {}
+        self.cgroups = cgroups
+        self.get_health_config = get_health_config or (lambda: None)
+        # Hashrate health per miner, judged by watchdog() (see health.PerformanceHealth)
+        self.health: Dict[str, PerformanceHealth] = {}
+        # Restart deadlines set by watchdog(); one entry per exited miner, no thread per restart
+        self._restart_at: Dict[str, float] = {}
+        # Health/failover restarts held back by the one-per-replica-group limit; the next pass runs them
+        self._restart_pending: Set[str] = set()
+        # pid of the last process whose exit was counted, so each exit is handled once
+        self._exit_seen: Dict[str, Optional[int]] = {}
+        # Classified cause of each miner's last exit; its policy drives the watchdog
+        self._exit_cause: Dict[str, ExitCause] = {}
+        # memory.events oom_kill count when the miner was last started
+        self._oom_base: Dict[str, int] = {}
+        # Replica groups: group id -> its definition and instance ids (see topology.expand_replicas)
+        self.group_defs: Dict[str, MinerDefinition] = {}
+        self.groups: Dict[str, List[str]] = {}
 
     def register(self, definition: MinerDefinition) -> None:
-        adapter_cls = ADAPTERS.get(definition.type)
-        if not adapter_cls:
+        """Register a miner, or each instance of it when ``replicas`` is set."""
+        if definition.type not in ADAPTERS:
             raise ValueError(f"Unsupported miner type: {definition.type}")
-        adapter = adapter_cls(definition, self.log_directory)
+        instances = expand_replicas(definition)
+        if definition.replicas:
+            self.group_defs[definition.id] = definition
+            self.groups[definition.id] = [d.id for d in instances]
+            self.logger.info(
+                f"replica group {definition.id}: "
+                + ", ".join(f"{d.id} cpus={d.cpu_affinity}" for d in instances),
+                extra={"miner_id": definition.id},
+            )
+        for d in instances:
+            self._register_instance(d)
+
+    def _register_instance(self, definition: MinerDefinition) -> None:
+        adapter_cls = ADAPTERS[definition.type]
+        adapter = adapter_cls(definition, self.log_directory, self.log_options)
         self.adapters[definition.id] = adapter
-        self.runtime[definition.id] = MinerRuntime(id=definition.id, pid=None, status="stopped")
-        self.metrics[definition.id] = MinerMetrics(id=definition.id)
+        self.runtime[definition.id] = MinerState()
         self.backoff[definition.id] = BackoffState()
-        self.events.emit("INFO", "miner registered", miner_id=definition.id, type=definition.type)
+        self.health[definition.id] = PerformanceHealth()
+        self.pool_state[definition.id] = PoolSelection(urls=definition.endpoints(), active=adapter.active_pool)
+        if self.prober:
+            self.prober.set_targets(definition.id, definition.endpoints())
+        self.events.emit("INFO", "miner registered", miner_id=definition.id, type=definition.type, group=definition.group)
         self.restart_history[definition.id] = []
 
     def start(self, miner_id: str) -> None:
+        urls = self.adapters[miner_id].definition.endpoints()
+        if self.prober and len(urls) > 1:
+            # Probe outside the lock so an unreachable pool can't stall other callers
+            self.prober.ensure_probed(urls)
         with self._lock:
             adapter = self.adapters[miner_id]
-            adapter.start()
-            rt = self.runtime[miner_id]
-            rt.status = "running"
-            rt.pid = adapter.process.pid if adapter.process else None
-            rt.uptime_sec = 0
-            self.logger.info(f"miner {miner_id} started pid={rt.pid}")
+            self._select_pool(miner_id)
+        if self.cgroups and not (adapter.process and adapter.process.poll() is None):
+            # Limits are re-applied on every start so definition changes take effect
+            adapter.cgroup_procs = self.cgroups.prepare(adapter.definition)
+            self._oom_base[miner_id] = self.cgroups.oom_kills(miner_id) or 0
+        # Preflight and spawn outside the lock so several miners can start at once;
+        # the adapter serializes its own start/stop
+        adapter.start()
+        with self._lock:
+            rt = self.runtime.get(miner_id)
+            if rt is None:
+                # Removed by synchronize() meanwhile; its stop() ran after this spawn
+                return
+            with rt:
+                rt.status = adapter.status()
+                rt.pid = adapter.process.pid if adapter.process else None
+                rt.pool = adapter.active_pool
+                rt.uptime_sec = 0
+            self._exit_cause.pop(miner_id, None)
+            self.logger.info(f"miner {miner_id} started pid={rt.pid}", extra={"miner_id": miner_id})
             self.events.emit("INFO", "miner started", miner_id=miner_id, pid=rt.pid)
 
     def stop(self, miner_id: str) -> None:
@@ -61,43 +142,146 @@ class MinerManager:
             adapter = self.adapters[miner_id]
             adapter.stop()
             rt = self.runtime[miner_id]
-            rt.status = "stopped"
-            rt.pid = None
-            rt.uptime_sec = 0
-            self.logger.info(f"miner {miner_id} stopped")
+            with rt:
+                rt.status = "stopped"
+                rt.pid = None
+                rt.uptime_sec = 0
+                rt.cgroup = {}
+            self.logger.info(f"miner {miner_id} stopped", extra={"miner_id": miner_id})
             self.events.emit("INFO", "miner stopped", miner_id=miner_id)
 
+    def _select_pool(self, miner_id: str) -> None:
+        adapter = self.adapters[miner_id]
+        sel = self.pool_state.setdefault(miner_id, PoolSelection())
+        sel.urls = adapter.definition.endpoints()
+        if not sel.urls:
+            return
+        keep = (
+            sel.active in sel.urls
+            and sel.switched_at > 0
+            and (not self.prober or self.prober.available(sel.active) is not False)
+        )
+        if not keep:
+            preferred = adapter.definition.pool_url
+            if preferred and (not self.prober or self.prober.available(preferred) is not False):
+                # pool_url wins over faster pools while it isn't known to be down
+                sel.active = preferred
+            else:
+                sel.active = self.prober.rank(sel.urls)[0] if self.prober else sel.urls[0]
+            sel.switched_at = time.time()
+        adapter.active_pool = sel.active
+
+    def _pool_failover_if_needed(self) -> List[str]:
+        """Switch pools where the failover policy says so; returns the miners to restart."""
+        policy = self.get_pools()
+        if not self.prober or not policy:
+            return []
+        now = time.time()
+        switched: List[str] = []
+        for mid, adapter in list(self.adapters.items()):
+            rt = self.runtime[mid]
+            sel = self.pool_state.get(mid)
+            if rt.status != "running" or not sel:
+                continue
+            sh = adapter.shares
+            target, reason = choose_failover(sel, self.prober, policy, sh.accepted, sh.rejected + sh.stale, now)
+            if not target:
+                continue
+            previous = sel.active
+            sel.active = target
+            sel.switched_at = now
+            self.logger.warning(f"pool failover for {mid}: {previous} -> {target} ({reason})", extra={"miner_id": mid})
+            self.events.emit("WARN", "pool failover", miner_id=mid, source=previous, target=target, reason=reason)
+            switched.append(mid)
+        return switched
+
     def restart(self, miner_id: str) -> None:
         self.stop(miner_id)
         time.sleep(0.2)
         self.start(miner_id)
 
-    def start_all(self) -> None:
-        for mid, adapter in list(self.adapters.items()):
+    def start_many(self, miner_ids: List[str]) -> Dict[str, str]:
+        """Start miners in parallel (``scheduling.start_concurrency``); returns id -> error for failures."""
+        sched = self.get_scheduling()
+        workers = max(1, min(int(getattr(sched, "start_concurrency", 8)), len(miner_ids)))
+        failed: Dict[str, str] = {}
+
+        def _start(mid: str) -> None:
             try:
                 self.start(mid)
             except Exception as e:
-                self.logger.error(f"failed to start {mid}: {e}")
+                failed[mid] = str(e)
+                self.logger.error(f"failed to start {mid}: {e}", extra={"miner_id": mid})
+
+        if workers == 1:
+            for mid in miner_ids:
+                _start(mid)
+            return failed
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="miner-start") as pool:
+            list(pool.map(_start, miner_ids))
+        return failed
+
+    def start_all(self) -> None:
+        self.start_many(list(self.adapters.keys()))
 
     def stop_all(self) -> None:
         for mid in list(self.adapters.keys()):
             try:
                 self.stop(mid)
             except Exception as e:
-                self.logger.error(f"failed to stop {mid}: {e}")
+                self.logger.error(f"failed to stop {mid}: {e}", extra={"miner_id": mid})
+
+    def close_log_writers(self) -> None:
+        """Flush buffered miner output to disk, e.g. on shutdown; a still-running pump reopens the file."""
+        for mid, adapter in list(self.adapters.items()):
+            try:
+                adapter.close_logs()
+            except Exception as e:
+                self.logger.error(f"failed closing logs for {mid}: {e}", extra={"miner_id": mid})
 
     def update_statuses(self) -> None:
         with self._lock:
             for mid, adapter in self.adapters.items():
                 rt = self.runtime[mid]
-                rt.status = adapter.status()
-                rt.uptime_sec = adapter.uptime()
-                self.metrics[mid] = adapter.metrics
-                if rt.status.startswith("exited:"):
+                status = adapter.status()
+                uptime = adapter.uptime()
+                running = status == "running"
+                pid = adapter.process.pid if adapter.process else None
+                cause = None
+                if status.startswith("exited:") and self._exit_seen.get(mid) != pid:
+                    self._exit_seen[mid] = pid
+                    cause = self._classify_exit(mid, adapter)
+                # Everything computed first so the write section is short and readers see
+                # the new status together with its cause
+                cgroup = self.cgroups.stats(mid) if running and self.cgroups and adapter.cgroup_procs else {}
+                effective = (
+                    adapter.shares.window(EFFECTIVE_HASHRATE_WINDOW_SEC, adapter.metrics.hashrate_hs).effective_hashrate_hs
+                    if running else rt.effective_hashrate_hs
+                )
+                with rt:
+                    rt.status = status
+                    rt.uptime_sec = uptime
+                    rt.cgroup = cgroup
+                    rt.effective_hashrate_hs = effective
+                    if cause:
+                        rt.restarts += 1
+                        rt.last_error = cause.summary()
+                if uptime >= STABLE_UPTIME_SEC and self.backoff[mid].attempt:
+                    self.backoff[mid].attempt = 0
+                if cause:
                     # Crash handling
-                    rt.restarts += 1
-                    self.events.emit("WARN", "miner exited", miner_id=mid, status=rt.status)
-                    # Crash loop detection and quarantine: 5 exits within 10 minutes
+                    self.logger.warning(f"miner {mid} exited: {rt.last_error}", extra={"miner_id": mid})
+                    self.events.emit(
+                        "WARN", "miner exited", miner_id=mid, status=rt.status, category=cause.category, reason=cause.reason
+                    )
+                    policy = cause.policy
+                    if not policy.restart:
+                        self.events.emit("ERROR", "miner not restarted: permanent failure", miner_id=mid, category=cause.category)
+                    if policy.failover:
+                        self._failover_after_exit(mid, cause)
+                    if not policy.quarantine:
+                        continue
+                    # Crash loop detection and quarantine
                     now = time.time()
                     hist = self.restart_history.setdefault(mid, [])
                     hist.append(now)
@@ -105,44 +289,216 @@ class MinerManager:
                     if len(hist) > 10:
                         self.restart_history[mid] = hist[-10:]
                         hist = self.restart_history[mid]
-                    # window 600s
-                    recent = [t for t in hist if now - t <= 600]
-                    if len(recent) >= 5:
-                        rt.quarantined = True
+                    recent = [t for t in hist if now - t <= CRASH_WINDOW_SEC]
+                    if len(recent) >= CRASH_LIMIT and not rt.quarantined:
+                        with rt:
+                            rt.quarantined = True
                         self.events.emit("ERROR", "miner quarantined due to crash loop", miner_id=mid)
 
+    def _classify_exit(self, miner_id: str, adapter: MinerAdapter) -> ExitCause:
+        oom_killed = False
+        if self.cgroups and adapter.cgroup_procs:
+            oom_killed = (self.cgroups.oom_kills(miner_id) or 0) > self._oom_base.get(miner_id, 0)
+        cause = adapter.classify_exit(oom_killed=oom_killed)
+        self._exit_cause[miner_id] = cause
+        return cause
+
+    def _failover_after_exit(self, miner_id: str, cause: ExitCause) -> None:
+        """Point the next restart at another pool after a connectivity failure."""
+        self._switch_pool(miner_id, f"exit: {cause.reason}")
+
+    def _switch_pool(self, miner_id: str, reason: str) -> bool:
+        """Make the best other pool the active one for the next start; False if there is none."""
+        sel = self.pool_state.get(miner_id)
+        if not sel:
+            return False
+        others = [u for u in sel.urls if u != sel.active]
+        if not others:
+            return False
+        if self.prober:
+            others = self.prober.rank(others)
+        previous, sel.active, sel.switched_at = sel.active, others[0], time.time()
+        self.logger.warning(f"pool failover for {miner_id}: {previous} -> {sel.active} ({reason})", extra={"miner_id": miner_id})
+        self.events.emit("WARN", "pool failover", miner_id=miner_id, source=previous, target=sel.active, reason=reason)
+        return True
+
+    def _check_health(self, now: float) -> List[str]:
+        """Judge every miner's hashrate health; returns running miners to restart."""
+        cfg = self.get_health_config()
+        if not cfg or not cfg.enabled:
+            return []
+        restart: List[str] = []
+        for mid, adapter in self.adapters.items():
+            rt, health = self.runtime[mid], self.health[mid]
+            running = rt.status == "running" and adapter.last_start_time > 0
+            sel = self.pool_state.get(mid)
+            action = health.evaluate(
+                cfg,
+                now,
+                adapter.last_start_time if running else None,
+                adapter.metrics.snapshot(),
+                can_failover=bool(sel and len(sel.urls) > 1),
+                reports_periodically=adapter.reports_periodically,
+            )
+            if action is None:
+                continue
+            st = health.status
+            if action == RECOVERED:
+                self.events.emit("INFO", "miner performance recovered", miner_id=mid)
+                continue
+            self.logger.warning(f"miner {mid} {st.state}: {st.reason} ({action})", extra={"miner_id": mid})
+            if action == DETECTED:
+                self.events.emit(
+                    "WARN", "miner performance degraded", miner_id=mid, state=st.state, reason=st.reason, baseline_hs=st.baseline_hs
+                )
+            elif action == FAILOVER:
+                self._switch_pool(mid, f"{st.state}: {st.reason}")
+                restart.append(mid)
+            elif action == RESTART:
+                self.events.emit("WARN", "miner restarted for performance", miner_id=mid, state=st.state, reason=st.reason)
+                restart.append(mid)
+        return restart
+
     def watchdog(self) -> None:
+        due: List[str] = []
+        now = time.time()
         with self._lock:
             for mid, adapter in self.adapters.items():
                 rt = self.runtime[mid]
-                if rt.status.startswith("exited:") and not rt.quarantined:
-                    # backoff restart
-                    sleep_s = self.backoff[mid].next_sleep()
-                    self.logger.warning(f"watchdog scheduling restart for {mid} in {sleep_s:.1f}s")
-                    threading.Thread(target=self._delayed_restart, args=(mid, sleep_s), daemon=True).start()
-
-            # Autoswitch scheduler
-            self._autoswitch_if_needed()
-
-    def _delayed_restart(self, miner_id: str, delay: float) -> None:
-        time.sleep(delay)
-        try:
-            self.start(miner_id)
-        except Exception as e:
-            self.logger.error(f"auto-restart failed for {miner_id}: {e}")
+                cause = self._exit_cause.get(mid)
+                if not rt.status.startswith("exited:") or rt.quarantined or (cause and not cause.policy.restart):
+                    self._restart_at.pop(mid, None)
+                    continue
+                restart_at = self._restart_at.get(mid)
+                if restart_at is None:
+                    # backoff restart, stretched for causes that need time to clear (e.g. memory pressure)
+                    sleep_s = self.backoff[mid].next_sleep() * (cause.policy.backoff_factor if cause else 1.0)
+                    self._restart_at[mid] = now + sleep_s
+                    self.logger.warning(
+                        f"watchdog scheduling restart for {mid} in {sleep_s:.1f}s"
+                        + (f" after {cause.category} failure" if cause else ""),
+                        extra={"miner_id": mid},
+                    )
+                elif now >= restart_at:
+                    due.append(mid)
+
+            # Their pool switch or health escalation has already happened; only the restart is left
+            restarts = [mid for mid in self._restart_pending if mid in self.runtime and self.runtime[mid].status == "running"]
+            self._restart_pending.clear()
+            for mid in self._check_health(now) + self._pool_failover_if_needed():
+                if mid not in restarts:
+                    restarts.append(mid)
+            switch = self._autoswitch_if_needed()
+
+        # Started outside the lock: start() may probe pools before taking it, and restart()
+        # sleeps between stop and start. At most one instance per replica group per pass:
+        # a held-back due miner is found due again, a held-back restart is kept pending.
+        groups_started = set()
+        held: List[str] = []
+        for mid in due + restarts:
+            adapter = self.adapters.get(mid)
+            group = adapter.definition.group if adapter else None
+            if group:
+                if group in groups_started:
+                    if mid not in due:
+                        held.append(mid)
+                    continue
+                groups_started.add(group)
+            try:
+                if mid in due:
+                    self._restart_at.pop(mid, None)
+                    self.start(mid)
+                else:
+                    self.restart(mid)
+            except Exception as e:
+                self.logger.error(f"auto-restart failed for {mid}: {e}", extra={"miner_id": mid})
+        if held:
+            with self._lock:
+                self._restart_pending.update(held)
+        if switch:
+            self._autoswitch(*switch)
+
+    def release_quarantine(self, miner_id: str) -> bool:
+        """Clear quarantine, crash history and backoff, e.g. when an operator starts the miner."""
+        with self._lock:
+            rt = self.runtime[miner_id]
+            if not rt.quarantined:
+                return False
+            with rt:
+                rt.quarantined = False
+            self.restart_history[miner_id] = []
+            self.backoff[miner_id].attempt = 0
+            self._restart_at.pop(miner_id, None)
+            self.events.emit("INFO", "miner quarantine released", miner_id=miner_id)
+            return True
+
+    def restore_crash_state(self, state: Dict[str, Tuple[List[float], bool]]) -> None:
+        """Seed crash history, backoff and quarantine from a persisted journal (see EventJournal.crash_state)."""
+        with self._lock:
+            for mid, (exits, quarantined) in state.items():
+                if mid not in self.adapters:
+                    continue
+                self.restart_history[mid] = exits[-10:]
+                # Exits within the crash window count as consecutive failures for backoff
+                self.backoff[mid].attempt = len(exits)
+                if quarantined:
+                    with self.runtime[mid] as rt:
+                        rt.quarantined = True
+                if exits or quarantined:
+                    self.logger.info(
+                        f"restored crash state for {mid}: {len(exits)} recent exits, quarantined={quarantined}",
+                        extra={"miner_id": mid},
+                    )
 
     def list_miners(self) -> List[Tuple[MinerDefinition, MinerRuntime]]:
         return [
-            (self.adapters[mid].definition, self.runtime[mid])
-            for mid in self.adapters
+            (adapter.definition, runtime_model(mid, rt.snapshot()))
+            for mid, adapter, rt in self._entries()
         ]
 
+    def get_runtime(self, miner_id: str) -> Optional[MinerRuntime]:
+        rt = self.runtime.get(miner_id)
+        return runtime_model(miner_id, rt.snapshot()) if rt else None
+
     def get_metrics(self) -> List[MinerMetrics]:
-        return [self.metrics[mid] for mid in self.adapters]
+        return [
+            metrics_model(mid, adapter.metrics.snapshot(), rt.snapshot())
+            for mid, adapter, rt in self._entries()
+        ]
+
+    def get_miner_metrics(self, miner_id: str) -> Optional[MinerMetrics]:
+        adapter, rt = self.adapters.get(miner_id), self.runtime.get(miner_id)
+        return metrics_model(miner_id, adapter.metrics.snapshot(), rt.snapshot()) if adapter and rt else None
+
+    def get_health(self, miner_id: str) -> Optional[MinerHealth]:
+        health = self.health.get(miner_id)
+        return health_model(miner_id, health.status.snapshot()) if health else None
+
+    def list_health(self) -> List[MinerHealth]:
+        health = dict(self.health)
+        return [health_model(mid, health[mid].status.snapshot()) for mid, _, _ in self._entries() if mid in health]
+
+    def _entries(self) -> List[Tuple[str, MinerAdapter, MinerState]]:
+        # Lock-free: copies of the dicts, then per-record snapshots; a miner removed
+        # meanwhile is simply skipped
+        adapters, runtime = dict(self.adapters), dict(self.runtime)
+        return [(mid, a, runtime[mid]) for mid, a in adapters.items() if mid in runtime]
+
+    def share_report(self, miner_id: str) -> ShareReport:
+        adapter = self.adapters[miner_id]
+        sh = adapter.shares
+        return ShareReport(
+            id=miner_id,
+            accepted=sh.accepted,
+            rejected=sh.rejected,
+            stale=sh.stale,
+            windows=sh.windows(adapter.metrics.hashrate_hs),
+        )
 
     def synchronize(self, desired: Dict[str, MinerDefinition]) -> None:
         """Sync adapters to desired miner set: add new, remove missing; restart changed."""
         with self._lock:
+            desired = self._expand_desired(desired)
             # Remove missing
             current_ids = set(self.adapters.keys())
             desired_ids = set(desired.keys())
@@ -153,8 +509,19 @@ class MinerManager:
                     pass
                 self.adapters.pop(mid, None)
                 self.runtime.pop(mid, None)
-                self.metrics.pop(mid, None)
                 self.backoff.pop(mid, None)
+                self.health.pop(mid, None)
+                self.pool_state.pop(mid, None)
+                self.restart_history.pop(mid, None)
+                self._restart_at.pop(mid, None)
+                self._restart_pending.discard(mid)
+                self._exit_seen.pop(mid, None)
+                self._exit_cause.pop(mid, None)
+                self._oom_base.pop(mid, None)
+                if self.prober:
+                    self.prober.set_targets(mid, [])
+                if self.cgroups:
+                    self.cgroups.remove(mid)
                 self.events.emit("INFO", "miner removed", miner_id=mid)
             # Add or update
             for mid in desired_ids:
@@ -171,28 +538,123 @@ class MinerManager:
                     old_def = self.adapters[mid].definition
                     if old_def.__dict__ != d.__dict__:
                         was_running = self.runtime[mid].status == "running"
+                        cause = self._exit_cause.get(mid)
+                        if cause and not cause.policy.restart:
+                            # The edit may have fixed what made it unrestartable; let the watchdog retry
+                            self._exit_cause.pop(mid, None)
+                            self.backoff[mid].attempt = 0
                         self.adapters[mid].definition = d
+                        # A new definition (threads, algo, affinity) means a new baseline
+                        self.health[mid] = PerformanceHealth()
+                        self.pool_state[mid].urls = d.endpoints()
+                        if self.prober:
+                            self.prober.set_targets(mid, d.endpoints())
                         if was_running:
                             try:
                                 self.restart(mid)
                             except Exception:
                                 pass
 
-    def _autoswitch_if_needed(self) -> None:
+    def _expand_desired(self, desired: Dict[str, MinerDefinition]) -> Dict[str, MinerDefinition]:
+        # Replica groups become their instances; the group maps are replaced wholesale
+        flat: Dict[str, MinerDefinition] = {}
+        group_defs: Dict[str, MinerDefinition] = {}
+        groups: Dict[str, List[str]] = {}
+        for gid, d in desired.items():
+            try:
+                instances = expand_replicas(d)
+            except ValueError as e:
+                # Keep whatever is running rather than tearing it down over a bad edit
+                self.logger.error(f"invalid replicas for {gid}, keeping current instances: {e}", extra={"miner_id": gid})
+                kept = [mid for mid in self.groups.get(gid, [gid]) if mid in self.adapters]
+                flat.update((mid, self.adapters[mid].definition) for mid in kept)
+                if gid in self.groups:
+                    group_defs[gid], groups[gid] = self.group_defs[gid], kept
+                continue
+            if d.replicas:
+                group_defs[gid] = d
+                groups[gid] = [i.id for i in instances]
+            flat.update((i.id, i) for i in instances)
+        self.group_defs, self.groups = group_defs, groups
+        return flat
+
+    def instances(self, miner_id: str) -> List[str]:
+        """Instance ids of a replica group, or ``[miner_id]`` for a plain miner."""
+        return list(self.groups.get(miner_id, [miner_id]))
+
+    def start_group(self, group_id: str) -> Dict[str, str]:
+        ids = self.instances(group_id)
+        for mid in ids:
+            self.release_quarantine(mid)
+        return self.start_many(ids)
+
+    def stop_group(self, group_id: str) -> None:
+        for mid in self.instances(group_id):
+            try:
+                self.stop(mid)
+            except Exception as e:
+                self.logger.error(f"failed to stop {mid}: {e}", extra={"miner_id": mid})
+
+    def restart_group(self, group_id: str) -> Dict[str, str]:
+        """Rolling restart, one instance at a time, so the group never drops to zero."""
+        failed: Dict[str, str] = {}
+        for mid in self.instances(group_id):
+            self.release_quarantine(mid)
+            try:
+                self.restart(mid)
+            except Exception as e:
+                failed[mid] = str(e)
+                self.logger.error(f"failed to restart {mid}: {e}", extra={"miner_id": mid})
+        return failed
+
+    def group_status(self, group_id: str) -> Optional[MinerGroup]:
+        d = self.group_defs.get(group_id)
+        if d is None:
+            return None
+        g = MinerGroup(id=group_id, replicas=d.replicas, instances=self.instances(group_id))
+        rates: List[float] = []
+        effective: List[float] = []
+        for mid in g.instances:
+            rt, mt = self.get_runtime(mid), self.get_miner_metrics(mid)
+            if rt is None or mt is None:
+                continue
+            g.restarts += rt.restarts
+            g.quarantined += int(rt.quarantined)
+            g.accepted += mt.accepted or 0
+            g.rejected += mt.rejected or 0
+            g.stale += mt.stale or 0
+            if rt.status == "running":
+                g.running += 1
+                if mt.hashrate_hs is not None:
+                    rates.append(mt.hashrate_hs)
+                if mt.effective_hashrate_hs is not None:
+                    effective.append(mt.effective_hashrate_hs)
+        g.status = "running" if g.running == len(g.instances) and g.running else "degraded" if g.running else "stopped"
+        g.hashrate_hs = sum(rates) if rates else None
+        g.effective_hashrate_hs = sum(effective) if effective else None
+        return g
+
+    def list_groups(self) -> List[MinerGroup]:
+        return [g for g in (self.group_status(gid) for gid in list(self.group_defs)) if g]
+
+    def _autoswitch_if_needed(self) -> Optional[Tuple[str, List[str]]]:
+        """Pick the next autoswitch target when due; returns (target, enabled ids) for _autoswitch()."""
         sched = self.get_scheduling()
         if not sched or not getattr(sched, 'autoswitch', False):
-            return
+            return None
         interval = max(30, int(getattr(sched, 'autoswitch_interval_sec', 600)))
         now = time.time()
         if (now - self.last_switch_time) < interval:
-            return
+            return None
+        self.last_switch_time = now
         enabled_ids = [mid for mid, ad in self.adapters.items() if getattr(ad.definition, 'enabled', True)]
         if len(enabled_ids) <= 1:
-            self.last_switch_time = now
-            return
+            return None
         # Round-robin switch: start next, stop others
         self.autoswitch_idx = (self.autoswitch_idx + 1) % len(enabled_ids)
-        target_id = enabled_ids[self.autoswitch_idx]
+        return enabled_ids[self.autoswitch_idx], enabled_ids
+
+    def _autoswitch(self, target_id: str, enabled_ids: List[str]) -> None:
         for mid in enabled_ids:
             if mid == target_id:
                 try:
@@ -205,4 +667,3 @@ class MinerManager:
                 except Exception:
                     pass
         self.events.emit("INFO", "autoswitch activated", target=target_id)
-        self.last_switch_time = now
@@ -10,20 +10,46 @@ class MinerDefinition(BaseModel):
     enabled: bool = True
     algo: Optional[str] = None
     pool_url: Optional[str] = None
+    pools: List[str] = Field(default_factory=list)
     wallet: Optional[str] = None
     password: Optional[str] = None
     threads: str | int | None = None
     donate_level: int | None = None
+    # Expected hashes per unit of share difficulty; None uses the adapter default
+    share_diff_multiplier: float | None = None
     extra_args: List[str] = Field(default_factory=list)
     env: Dict[str, str] = Field(default_factory=dict)
     nice: int | None = None
     cpu_affinity: List[int] = Field(default_factory=list)
+    # cgroup v2 limits: cpu.weight (1-10000), cpu.max in cores or "quota period", memory.max ("2G")
+    cpu_weight: int | None = None
+    cpu_max: float | str | None = None
+    memory_max: int | str | None = None
+    # Run as several pinned instances: a count, "per_numa_node" or "per_l3_domain"
+    replicas: int | str | None = None
+    # Set on instances expanded from a replica group: the group's (definition's) id
+    group: Optional[str] = None
+    # cpuminer-opt: poll its API (-b on a free local port) for hashrate, shares and per-thread rates
+    api_telemetry: bool = False
+    api_interval_sec: float = 5.0
+
+    def endpoints(self) -> List[str]:
+        """Ordered pool list: ``pool_url`` (if set), then ``pools``.
+
+        MinerManager starts on ``pool_url`` unless probing found it down; otherwise, and for
+        failover, the list is ranked by probed latency with this order breaking ties.
+        """
+        urls = [u for u in self.pools if u and u != self.pool_url]
+        if self.pool_url:
+            urls.insert(0, self.pool_url)
+        return urls
 
 
 class MinerRuntime(BaseModel):
     id: str
     pid: Optional[int]
     status: str
+    pool: Optional[str] = None
     uptime_sec: float = 0
     last_error: Optional[str] = None
     quarantined: bool = False
@@ -33,14 +59,77 @@ class MinerRuntime(BaseModel):
 class MinerMetrics(BaseModel):
     id: str
     hashrate_hs: float | None = None
+    # When hashrate_hs was last reported
+    hashrate_ts: float | None = None
     accepted: int | None = None
+    # Rejected shares not counting stale ones, for every miner type
     rejected: int | None = None
+    stale: int | None = None
+    effective_hashrate_hs: float | None = None
     uptime_sec: float | None = None
     temperature_c: float | None = None
     power_w: float | None = None
     extra: Dict[str, Any] = Field(default_factory=dict)
 
 
+class MinerHealth(BaseModel):
+    id: str
+    # stopped, warming_up, healthy, stalled, degraded or no_shares
+    state: str = "stopped"
+    reason: Optional[str] = None
+    # When the current problem began
+    since_ts: Optional[float] = None
+    baseline_hs: Optional[float] = None
+    baseline_minutes: int = 0
+    hashrate_hs: Optional[float] = None
+    last_share_ts: Optional[float] = None
+    # Escalation steps taken for the current problem: 1 event, 2 pool failover, 3 restart
+    level: int = 0
+    last_action: Optional[str] = None
+    last_action_ts: Optional[float] = None
+    restarts_last_hour: int = 0
+
+
+class MinerGroup(BaseModel):
+    id: str
+    replicas: int | str
+    instances: List[str] = Field(default_factory=list)
+    # running | degraded (some instances running) | stopped
+    status: str = "stopped"
+    running: int = 0
+    restarts: int = 0
+    quarantined: int = 0
+    hashrate_hs: float | None = None
+    effective_hashrate_hs: float | None = None
+    accepted: int = 0
+    rejected: int = 0
+    stale: int = 0
+
+
+class ShareWindowStats(BaseModel):
+    window_sec: int
+    elapsed_sec: float
+    accepted: int = 0
+    rejected: int = 0
+    stale: int = 0
+    reject_ratio: Optional[float] = None
+    stale_ratio: Optional[float] = None
+    accepted_difficulty: float = 0.0
+    effective_hashrate_hs: Optional[float] = None
+    reported_hashrate_hs: Optional[float] = None
+    # (reported - effective) / reported; large positive values point at pool or config problems
+    hashrate_gap_ratio: Optional[float] = None
+    avg_submit_latency_ms: Optional[float] = None
+
+
+class ShareReport(BaseModel):
+    id: str
+    accepted: int = 0
+    rejected: int = 0
+    stale: int = 0
+    windows: List[ShareWindowStats] = Field(default_factory=list)
+
+
 class SystemMetrics(BaseModel):
     cpu_percent: float
     cpu_count: int
@@ -53,9 +142,45 @@ class SystemMetrics(BaseModel):
     temps_c: Dict[str, float] = Field(default_factory=dict)
 
 
+class PoolStatus(BaseModel):
+    url: str
+    available: Optional[bool] = None
+    latency_ms: Optional[float] = None
+    connect_ms: Optional[float] = None
+    handshake_ms: Optional[float] = None
+    consecutive_failures: int = 0
+    probes: int = 0
+    last_error: Optional[str] = None
+    last_probe_ts: Optional[float] = None
+
+
 class HealthResponse(BaseModel):
     status: str
     version: str
+    live: bool = True
+    ready: bool = False
+    # starting | initializing | spawning | ready | failed | stopping
+    phase: str = "starting"
+    ready_after_ms: Optional[float] = None
+
+
+class BenchLayout(BaseModel):
+    threads: Optional[int] = None
+    # CPU set the benchmark process is pinned to; empty uses the miner's cpu_affinity
+    cpus: List[int] = Field(default_factory=list)
+
+    def key(self) -> str:
+        from .benchmark import compact_cpus
+
+        return f"t{self.threads or 'auto'}@{compact_cpus(self.cpus) if self.cpus else 'all'}"
+
+
+class BenchRunRequest(BaseModel):
+    # Empty: every configured miner
+    miners: List[str] = Field(default_factory=list)
+    layouts: List[BenchLayout] = Field(default_factory=list)
+    warmup_sec: Optional[float] = None
+    duration_sec: Optional[float] = None
 
 
 class ApiError(BaseModel):
@@ -0,0 +1,293 @@
+from __future__ import annotations
+import json
+import socket
+import ssl
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import PoolStatus
+
+
+_TLS_SCHEMES = ("stratum+ssl", "stratum+tls", "ssl", "tls")
+
+
+def parse_endpoint(url: str) -> Tuple[str, int, bool]:
+    """Split a miner pool URL ("stratum+tcp://host:port", "host:port") into host, port, tls."""
+    scheme = ""
+    rest = url.strip()
+    if "://" in rest:
+        scheme, rest = rest.split("://", 1)
+    rest = rest.split("/", 1)[0]
+    if rest.startswith("["):
+        host, _, port_s = rest[1:].partition("]:")
+    else:
+        host, _, port_s = rest.rpartition(":")
+    if not host or not port_s.isdigit():
+        raise ValueError(f"Invalid pool endpoint: {url}")
+    return host, int(port_s), scheme.lower() in _TLS_SCHEMES
+
+
+@dataclass
+class ProbeResult:
+    url: str
+    ok: bool
+    connect_ms: Optional[float] = None
+    handshake_ms: Optional[float] = None
+    error: Optional[str] = None
+    ts: float = 0.0
+
+    @property
+    def latency_ms(self) -> Optional[float]:
+        return self.handshake_ms if self.handshake_ms is not None else self.connect_ms
+
+
+def probe_endpoint(url: str, timeout: float = 3.0, handshake: bool = True) -> ProbeResult:
+    """Measure TCP connect time and, optionally, the first stratum reply round trip."""
+    res = ProbeResult(url=url, ok=False, ts=time.time())
+    try:
+        host, port, tls = parse_endpoint(url)
+    except ValueError as e:
+        res.error = str(e)
+        return res
+    t0 = time.perf_counter()
+    try:
+        sock = socket.create_connection((host, port), timeout=timeout)
+    except OSError as e:
+        res.error = f"connect: {e}"
+        return res
+    try:
+        res.connect_ms = (time.perf_counter() - t0) * 1000.0
+        res.ok = True
+        if not handshake:
+            return res
+        sock.settimeout(timeout)
+        if tls:
+            ctx = ssl.create_default_context()
+            # Latency probe only; many pools use self-signed certificates
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+            sock = ctx.wrap_socket(sock, server_hostname=host)
+        # Any reply line counts: Monero-style pools answer subscribe with an error object
+        req = {"id": 1, "jsonrpc": "2.0", "method": "mining.subscribe", "params": ["crypto-tool-probe/1.0"]}
+        t1 = time.perf_counter()
+        sock.sendall((json.dumps(req) + "\n").encode())
+        data = sock.recv(4096)
+        if data:
+            res.handshake_ms = (time.perf_counter() - t1) * 1000.0
+        else:
+            res.error = "handshake: connection closed"
+    except (OSError, ssl.SSLError) as e:
+        # TCP worked, so the pool counts as reachable; only the handshake sample is missing
+        res.error = f"handshake: {e}"
+    finally:
+        try:
+            sock.close()
+        except Exception:
+            pass
+    return res
+
+
+@dataclass
+class PoolStats:
+    url: str
+    ewma_ms: Optional[float] = None
+    consecutive_failures: int = 0
+    probes: int = 0
+    last: Optional[ProbeResult] = None
+
+    def update(self, result: ProbeResult, alpha: float = 0.3) -> None:
+        self.probes += 1
+        self.last = result
+        if not result.ok:
+            self.consecutive_failures += 1
+            return
+        self.consecutive_failures = 0
+        lat = result.latency_ms
+        if lat is None:
+            return
+        self.ewma_ms = lat if self.ewma_ms is None else (alpha * lat + (1 - alpha) * self.ewma_ms)
+
+    def available(self, down_after: int) -> Optional[bool]:
+        if self.probes == 0:
+            return None
+        return self.consecutive_failures < down_after
+
+    def to_status(self, down_after: int) -> PoolStatus:
+        last = self.last
+        return PoolStatus(
+            url=self.url,
+            available=self.available(down_after),
+            latency_ms=self.ewma_ms,
+            connect_ms=last.connect_ms if last else None,
+            handshake_ms=last.handshake_ms if last else None,
+            consecutive_failures=self.consecutive_failures,
+            probes=self.probes,
+            last_error=last.error if last else None,
+            last_probe_ts=last.ts if last else None,
+        )
+
+
+class PoolProber:
+    """Background prober keeping latency/availability stats for every tracked pool URL."""
+
+    def __init__(
+        self,
+        interval_sec: float = 30,
+        timeout_sec: float = 3.0,
+        handshake: bool = True,
+        down_after_failures: int = 2,
+        probe_fn: Callable[..., ProbeResult] = probe_endpoint,
+    ) -> None:
+        self.interval_sec = interval_sec
+        self.timeout_sec = timeout_sec
+        self.handshake = handshake
+        self.down_after_failures = max(1, down_after_failures)
+        self.probe_fn = probe_fn
+        self._lock = threading.Lock()
+        self._stats: Dict[str, PoolStats] = {}
+        self._targets: Dict[str, Set[str]] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def set_targets(self, owner: str, urls: Iterable[str]) -> None:
+        with self._lock:
+            urls = set(urls)
+            if urls:
+                self._targets[owner] = urls
+            else:
+                self._targets.pop(owner, None)
+            tracked = self._tracked_locked()
+            for url in list(self._stats):
+                if url not in tracked:
+                    del self._stats[url]
+
+    def _tracked_locked(self) -> Set[str]:
+        tracked: Set[str] = set()
+        for urls in self._targets.values():
+            tracked |= urls
+        return tracked
+
+    def probe(self, urls: Iterable[str]) -> List[ProbeResult]:
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(8, len(urls)), thread_name_prefix="pool-probe") as ex:
+            results = list(ex.map(lambda u: self.probe_fn(u, self.timeout_sec, self.handshake), urls))
+        with self._lock:
+            for r in results:
+                self._stats.setdefault(r.url, PoolStats(url=r.url)).update(r)
+        return results
+
+    def probe_all(self) -> List[ProbeResult]:
+        with self._lock:
+            urls = sorted(self._tracked_locked())
+        return self.probe(urls)
+
+    def ensure_probed(self, urls: Iterable[str]) -> None:
+        with self._lock:
+            missing = [u for u in urls if u not in self._stats]
+        if missing:
+            self.probe(missing)
+
+    def stats(self, url: str) -> Optional[PoolStats]:
+        with self._lock:
+            return self._stats.get(url)
+
+    def available(self, url: str) -> Optional[bool]:
+        st = self.stats(url)
+        return st.available(self.down_after_failures) if st else None
+
+    def latency_ms(self, url: str) -> Optional[float]:
+        st = self.stats(url)
+        return st.ewma_ms if st else None
+
+    def rank(self, urls: List[str]) -> List[str]:
+        """Order URLs best first: measured-available by latency, then unknown, then down.
+
+        Ties keep configuration order, so an unprobed list ranks as configured.
+        """
+        def key(item: Tuple[int, str]):
+            idx, url = item
+            avail = self.available(url)
+            lat = self.latency_ms(url)
+            if avail is False:
+                return (2, 0.0, idx)
+            if avail is None or lat is None:
+                return (1, 0.0, idx)
+            return (0, lat, idx)
+        return [u for _, u in sorted(enumerate(urls), key=key)]
+
+    def status(self) -> List[PoolStatus]:
+        with self._lock:
+            return [st.to_status(self.down_after_failures) for _, st in sorted(self._stats.items())]
+
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pool-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.probe_all()
+            except Exception:
+                # best-effort, next round retries
+                pass
+            self._stop.wait(self.interval_sec)
+
+
+@dataclass
+class PoolSelection:
+    """Per-miner failover state: which pool is active and since when."""
+    urls: List[str] = field(default_factory=list)
+    active: Optional[str] = None
+    switched_at: float = 0.0
+
+
+def choose_failover(
+    sel: PoolSelection,
+    prober: PoolProber,
+    policy,
+    accepted: Optional[int],
+    rejected: Optional[int],
+    now: float,
+) -> Tuple[Optional[str], str]:
+    """Decide whether the miner should move off ``sel.active``.
+
+    ``accepted``/``rejected`` are the running process' counters; every switch restarts
+    the miner, so they only cover the active pool. Returns ``(new_url, reason)``;
+    ``new_url`` is None when the miner should stay.
+    """
+    current = sel.active
+    if current is None or len(sel.urls) < 2:
+        return None, ""
+    ranked = [u for u in prober.rank(sel.urls) if u != current]
+    candidates = [u for u in ranked if prober.available(u) is not False]
+    if not candidates:
+        return None, ""
+    best = candidates[0]
+    # Outage is never subject to dwell time
+    if prober.available(current) is False:
+        return best, "pool unreachable"
+    if now - sel.switched_at < policy.min_dwell_sec:
+        return None, ""
+    acc = max(0, accepted or 0)
+    rej = max(0, rejected or 0)
+    if acc + rej >= max(1, policy.min_shares):
+        ratio = rej / float(acc + rej)
+        if ratio > policy.max_reject_ratio:
+            return best, f"reject ratio {ratio:.3f}"
+    cur_lat = prober.latency_ms(current)
+    best_lat = prober.latency_ms(best)
+    if cur_lat is not None and best_lat is not None and cur_lat > policy.max_latency_ms:
+        if best_lat <= cur_lat * (1.0 - policy.switch_margin):
+            return best, f"latency {cur_lat:.0f}ms > {policy.max_latency_ms:.0f}ms"
+    return None, ""
@@ -0,0 +1,206 @@
+from __future__ import annotations
+import bisect
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+if TYPE_CHECKING:
+    import cProfile
+
+
+# Bucket upper bounds in seconds: 1us .. 60s, roughly 1-2-5 spaced
+_BOUNDS: List[float] = [m * 10.0 ** e for e in range(-6, 2) for m in (1, 2, 5)] + [60.0]
+
+
+class Histogram:
+    """Fixed-bucket latency histogram; percentiles are bucket upper bounds."""
+
+    __slots__ = ("_lock", "counts", "count", "total", "max")
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        i = bisect.bisect_left(_BOUNDS, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def _percentile(self, counts: List[int], count: int, pct: float) -> Optional[float]:
+        if not count:
+            return None
+        rank = pct / 100.0 * count
+        seen = 0
+        for i, c in enumerate(counts):
+            seen += c
+            if seen >= rank:
+                return _BOUNDS[i] if i < len(_BOUNDS) else float("inf")
+        return None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self.counts)
+            count, total, mx = self.count, self.total, self.max
+
+        def ms(v: Optional[float]) -> Optional[float]:
+            return None if v is None else round(v * 1000.0, 4)
+
+        return {
+            "count": count,
+            "sum_ms": ms(total),
+            "mean_ms": ms(total / count) if count else None,
+            "max_ms": ms(mx),
+            "p50_ms": ms(self._percentile(counts, count, 50)),
+            "p90_ms": ms(self._percentile(counts, count, 90)),
+            "p99_ms": ms(self._percentile(counts, count, 99)),
+            "buckets_ms": {
+                (str(round(b * 1000.0, 4)) if i < len(_BOUNDS) else "+inf"): c
+                for i, (b, c) in enumerate(zip(_BOUNDS + [float("inf")], counts))
+                if c
+            },
+        }
+
+
+class TimerRegistry:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._hists: Dict[str, Histogram] = {}
+
+    def histogram(self, name: str) -> Histogram:
+        h = self._hists.get(name)
+        if h is None:
+            with self._lock:
+                h = self._hists.setdefault(name, Histogram())
+        return h
+
+    def observe(self, name: str, seconds: float) -> None:
+        self.histogram(name).observe(seconds)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).observe(time.perf_counter() - t0)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            items = sorted(self._hists.items())
+        return {name: h.snapshot() for name, h in items}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hists.clear()
+
+
+timings = TimerRegistry()
+
+
+class InstrumentedRLock:
+    """RLock recording wait time per acquire and hold time per outermost acquire/release."""
+
+    def __init__(self, name: str, registry: TimerRegistry = timings) -> None:
+        self._lock = threading.RLock()
+        self._wait = registry.histogram(f"lock.{name}.wait")
+        self._hold = registry.histogram(f"lock.{name}.hold")
+        # Only touched by the owning thread while it holds the lock
+        self._depth = 0
+        self._acquired_at = 0.0
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        t0 = time.perf_counter()
+        ok = self._lock.acquire(blocking, timeout)
+        if ok:
+            t1 = time.perf_counter()
+            self._depth += 1
+            if self._depth == 1:
+                self._wait.observe(t1 - t0)
+                self._acquired_at = t1
+        return ok
+
+    def release(self) -> None:
+        self._depth -= 1
+        if self._depth == 0:
+            self._hold.observe(time.perf_counter() - self._acquired_at)
+        self._lock.release()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> str:
+    """Sample every thread's stack for ``seconds``; returns collapsed stacks for flamegraph tools."""
+    me = threading.get_ident()
+    names = {}
+    stacks: Counter = Counter()
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        names.update({t.ident: t.name for t in threading.enumerate()})
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            parts = []
+            f = frame
+            while f is not None:
+                code = f.f_code
+                parts.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{f.f_lineno})")
+                f = f.f_back
+            parts.append(names.get(ident, str(ident)))
+            stacks[";".join(reversed(parts))] += 1
+        time.sleep(interval)
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+def profile_stats(prof: cProfile.Profile, fmt: str = "pstats", limit: int = 100) -> bytes:
+    """Serialize a finished profile: raw pstats (for snakeviz/pstats) or a text report."""
+    import io
+    import marshal
+    import pstats
+
+    prof.create_stats()
+    if fmt == "text":
+        out = io.StringIO()
+        pstats.Stats(prof, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue().encode()
+    return marshal.dumps(prof.stats)
+
+
+def tracemalloc_diff(seconds: float, top: int = 50, frames: int = 10) -> str:
+    """Snapshot allocations, wait, snapshot again and report the biggest growth by line."""
+    import tracemalloc
+
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start(frames)
+    try:
+        filters = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        )
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        time.sleep(seconds)
+        after = tracemalloc.take_snapshot().filter_traces(filters)
+        traced, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+    lines = [f"# tracemalloc diff over {seconds:.1f}s; traced={traced / 1048576:.2f}MB peak={peak / 1048576:.2f}MB"]
+    if started:
+        lines.append("# tracing was started for this capture; only allocations made during the window are attributed")
+    for st in after.compare_to(before, "lineno")[:top]:
+        lines.append(str(st))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,277 @@
+from __future__ import annotations
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional
+
+from .logging_setup import get_logger, log_context, setup_logging
+from .profiling import timings
+
+if TYPE_CHECKING:
+    from .benchmark import BenchRunner
+    from .cgroups import CgroupManager
+    from .config import ConfigLoader
+    from .events import EventLogger
+    from .journal import EventJournal
+    from .metrics import SystemMetricsCollector
+    from .miner_manager import MinerManager
+    from .models import MinerDefinition
+    from .pool_probe import PoolProber
+
+
+BACKGROUND_INTERVAL_SEC = 2.0
+
+
+class StartupReport:
+    """Wall-clock breakdown of startup, stage by stage, plus the readiness phase."""
+
+    def __init__(self, origin: Optional[float] = None) -> None:
+        # Measured from ``origin`` (perf_counter), normally when main.py was imported
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phase = "starting"
+        self.error: Optional[str] = None
+        self.stages: Dict[str, float] = {}
+        self.ready_after_ms: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] = round((time.perf_counter() - t0) * 1000.0, 3)
+
+    def set_phase(self, phase: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.phase = phase
+            self.error = error
+            if phase == "ready" and self.ready_after_ms is None:
+                self.ready_after_ms = round((time.perf_counter() - self.origin) * 1000.0, 3)
+
+    @property
+    def ready(self) -> bool:
+        return self.phase == "ready"
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "phase": self.phase,
+                "ready": self.phase == "ready",
+                "error": self.error,
+                "ready_after_ms": self.ready_after_ms,
+                "stages_ms": dict(self.stages),
+            }
+
+
+class Services:
+    """Config, managers and background threads behind the API, built by the app lifespan.
+
+    Nothing happens at construction; ``start()`` brings up everything the routes need and
+    ``spawn()`` launches enabled miners on a separate thread so the API serves meanwhile.
+    """
+
+    def __init__(self, config_path: Optional[str] = None, report: Optional[StartupReport] = None) -> None:
+        self.config_path = config_path
+        self.report = report or StartupReport()
+        self.logger = get_logger(__name__)
+        self.cfg_loader: Optional[ConfigLoader] = None
+        self.events: Optional[EventLogger] = None
+        self.cgroups: Optional[CgroupManager] = None
+        self.journal: Optional[EventJournal] = None
+        self.prober: Optional[PoolProber] = None
+        self.miner_manager: Optional[MinerManager] = None
+        self.sys_metrics: Optional[SystemMetricsCollector] = None
+        self._bench: Optional[BenchRunner] = None
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def api_key(self) -> str:
+        return self.cfg_loader.config.api.api_key if self.cfg_loader else ""
+
+    def start(self) -> None:
+        r = self.report
+        r.set_phase("initializing")
+        # Heavy modules (yaml, psutil, adapters) are imported here rather than with main.py
+        with r.stage("imports"):
+            from .auth import configure_rate_limiting
+            from .cgroups import CgroupManager
+            from .config import ConfigLoader
+            from .events import EventLogger
+            from .exit_cause import POLICIES
+            from .journal import EventJournal
+            from .logwriter import LogWriterOptions
+            from .metrics import SystemMetricsCollector
+            from .miner_manager import CRASH_WINDOW_SEC, MinerManager
+            from .pool_probe import PoolProber
+
+        with r.stage("config"):
+            self.cfg_loader = ConfigLoader(self.config_path)
+        cfg = self.cfg_loader.config
+
+        with r.stage("logging"):
+            setup_logging(cfg.logging.directory, cfg.logging.level, cfg.logging.queue_size)
+            configure_rate_limiting(cfg.api.rate_limit)
+
+        if cfg.journal.enabled:
+            with r.stage("journal"):
+                try:
+                    self.journal = EventJournal(
+                        cfg.journal.path,
+                        batch_size=cfg.journal.batch_size,
+                        flush_interval_sec=cfg.journal.flush_interval_sec,
+                        queue_size=cfg.journal.queue_size,
+                        retention_days=cfg.journal.retention_days,
+                    )
+                except Exception as e:
+                    # Run without persistence rather than not at all
+                    self.logger.error(f"event journal unavailable ({cfg.journal.path}): {e}")
+
+        if cfg.cgroups.enabled:
+            with r.stage("cgroups"):
+                self.cgroups = CgroupManager(cfg.cgroups.root, cfg.cgroups.base, tuple(cfg.cgroups.controllers))
+                self.cgroups.setup()
+
+        with r.stage("managers"):
+            self.events = EventLogger(sink=self.journal.append if self.journal else None)
+            self.prober = PoolProber(
+                interval_sec=cfg.pools.probe_interval_sec,
+                timeout_sec=cfg.pools.probe_timeout_sec,
+                handshake=cfg.pools.stratum_handshake,
+                down_after_failures=cfg.pools.down_after_failures,
+            )
+            self.miner_manager = MinerManager(
+                log_directory=cfg.logging.directory,
+                get_scheduling=lambda: self.cfg_loader.config.scheduling,
+                events=self.events,
+                prober=self.prober if cfg.pools.probe_enabled else None,
+                get_pools=lambda: self.cfg_loader.config.pools,
+                log_options=LogWriterOptions(
+                    max_bytes=max(1, cfg.logging.rotate_mb) * 1024 * 1024,
+                    keep=cfg.logging.keep,
+                    flush_interval_sec=cfg.logging.flush_interval_sec,
+                    compress=cfg.logging.compress,
+                ),
+                cgroups=self.cgroups if self.cgroups and self.cgroups.available else None,
+                get_health_config=lambda: self.cfg_loader.config.health,
+            )
+
+        with r.stage("register"):
+            for mid, d in self.desired_miners().items():
+                try:
+                    self.miner_manager.register(d)
+                except Exception as e:
+                    self.logger.error(f"failed registering miner {mid}: {e}", extra={"miner_id": mid})
+
+        if self.journal:
+            with r.stage("restore"):
+                try:
+                    skip = [c for c, p in POLICIES.items() if not p.quarantine]
+                    self.miner_manager.restore_crash_state(self.journal.crash_state(CRASH_WINDOW_SEC, skip_categories=skip))
+                except Exception as e:
+                    self.logger.error(f"failed restoring crash state from journal: {e}")
+
+        with r.stage("threads"):
+            self.sys_metrics = SystemMetricsCollector(interval_sec=cfg.telemetry.metrics_interval_sec)
+            if cfg.telemetry.enable_system_metrics:
+                self.sys_metrics.start()
+            if cfg.pools.probe_enabled:
+                self.prober.start()
+            self._stop.clear()
+            self._start_thread(self._background_loop, "bg-loop")
+
+    def spawn(self) -> None:
+        """Start enabled miners in parallel when ``scheduling.autostart`` is set, then report ready."""
+        self.report.set_phase("spawning")
+        self._start_thread(self._spawn, "startup-spawn")
+
+    def _spawn(self) -> None:
+        try:
+            cfg = self.cfg_loader.config
+            if cfg.scheduling.autostart:
+                mm = self.miner_manager
+                rts = mm.runtime
+                ids = [
+                    mid
+                    for m in cfg.miners if m.enabled
+                    for mid in mm.instances(m.id) if mid in rts and not rts[mid].quarantined
+                ]
+                with self.report.stage("spawn"):
+                    failed = self.miner_manager.start_many(ids)
+                if failed:
+                    self.logger.warning(f"{len(failed)}/{len(ids)} miners failed to start: {', '.join(sorted(failed))}")
+            self.report.set_phase("ready")
+            self.logger.info(f"orchestrator ready: {self.report.snapshot()}")
+        except Exception as e:
+            self.logger.error(f"startup spawn failed: {e}")
+            self.report.set_phase("failed", error=str(e))
+
+    def stop(self) -> None:
+        self.report.set_phase("stopping")
+        self._stop.set()
+        if self.sys_metrics:
+            self.sys_metrics.stop()
+        if self.prober:
+            self.prober.stop()
+        for t in self._threads:
+            if t.is_alive():
+                t.join(timeout=5.0)
+        self._threads = []
+        if self.miner_manager:
+            self.miner_manager.close_log_writers()
+        if self.journal:
+            self.journal.close()
+
+    def bench(self) -> BenchRunner:
+        """Benchmark runner and results store, created on first use."""
+        if self._bench is None:
+            from .benchmark import BenchRunner, BenchStore
+            from .miner_manager import ADAPTERS
+
+            cfg = self.cfg_loader.config
+            mm = self.miner_manager
+            self._bench = BenchRunner(
+                store=BenchStore(cfg.bench.db_path),
+                get_config=lambda: self.cfg_loader.config.bench,
+                definitions=self.desired_miners,
+                running_miners=lambda: [mid for mid, rt in list(mm.runtime.items()) if rt.status == "running"],
+                log_dir=mm.log_directory,
+                adapters=ADAPTERS,
+            )
+        return self._bench
+
+    def desired_miners(self) -> Dict[str, MinerDefinition]:
+        from .models import MinerDefinition
+
+        return {m.id: MinerDefinition(**m.__dict__) for m in self.cfg_loader.config.miners}
+
+    def _start_thread(self, target, name: str) -> None:
+        t = threading.Thread(target=target, name=name, daemon=True)
+        self._threads.append(t)
+        t.start()
+
+    def _background_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                with log_context(request_id=f"bg-{uuid.uuid4().hex[:12]}"):
+                    self.background_tick()
+            except Exception as e:
+                self.logger.error(f"background loop error: {e}")
+            self._stop.wait(BACKGROUND_INTERVAL_SEC)
+
+    def background_tick(self) -> None:
+        mm = self.miner_manager
+        with timings.time("bg.tick"):
+            with timings.time("bg.reload_check"):
+                reloaded = self.cfg_loader.maybe_reload()
+            if reloaded:
+                self.logger.info("config reloaded")
+                # Apply dynamic changes for miners (add/update/remove)
+                with timings.time("bg.synchronize"):
+                    mm.synchronize(self.desired_miners())
+            with timings.time("bg.update_statuses"):
+                mm.update_statuses()
+            with timings.time("bg.watchdog"):
+                mm.watchdog()
@@ -0,0 +1,106 @@
+from __future__ import annotations
+import threading
+import time
+from collections import deque
+from typing import Deque, Iterable, List, Optional, Tuple
+
+from .models import ShareWindowStats
+
+
+ACCEPTED = "accepted"
+REJECTED = "rejected"
+STALE = "stale"
+
+DEFAULT_WINDOWS = (60, 900, 3600)
+
+# (ts, outcome, difficulty, submit latency ms)
+_Share = Tuple[float, str, Optional[float], Optional[float]]
+
+
+class ShareAnalytics:
+    """Per-miner share log with sliding-window effective hashrate and reject/stale ratios.
+
+    Effective hashrate is accepted difficulty over time: ``sum(diff) * diff_to_hashes / elapsed``.
+    ``diff_to_hashes`` is the expected number of hashes per unit of share difficulty
+    (1 for CryptoNote pools, 2**32 for Bitcoin-style stratum difficulty).
+    """
+
+    def __init__(self, diff_to_hashes: float = 1.0, horizon_sec: float = 3600, max_shares: int = 20000) -> None:
+        self.diff_to_hashes = diff_to_hashes
+        self.horizon_sec = horizon_sec
+        self._lock = threading.Lock()
+        self._shares: Deque[_Share] = deque(maxlen=max_shares)
+        self.started_at = time.time()
+        self.accepted = 0
+        self.rejected = 0
+        self.stale = 0
+
+    def reset(self, now: Optional[float] = None) -> None:
+        with self._lock:
+            self._shares.clear()
+            self.started_at = now if now is not None else time.time()
+            self.accepted = self.rejected = self.stale = 0
+
+    def record(
+        self,
+        outcome: str,
+        difficulty: Optional[float] = None,
+        latency_ms: Optional[float] = None,
+        ts: Optional[float] = None,
+    ) -> None:
+        ts = ts if ts is not None else time.time()
+        with self._lock:
+            if outcome == ACCEPTED:
+                self.accepted += 1
+            elif outcome == STALE:
+                self.stale += 1
+            else:
+                self.rejected += 1
+            self._shares.append((ts, outcome, difficulty, latency_ms))
+            cutoff = ts - self.horizon_sec
+            while self._shares and self._shares[0][0] < cutoff:
+                self._shares.popleft()
+
+    def window(self, window_sec: float, reported_hs: Optional[float] = None, now: Optional[float] = None) -> ShareWindowStats:
+        now = now if now is not None else time.time()
+        with self._lock:
+            started_at = self.started_at
+            shares = [s for s in self._shares if s[0] >= now - window_sec]
+        acc = rej = stale = 0
+        acc_diff = 0.0
+        latencies: List[float] = []
+        for _, outcome, diff, lat in shares:
+            if outcome == ACCEPTED:
+                acc += 1
+                acc_diff += diff or 0.0
+            elif outcome == STALE:
+                stale += 1
+            else:
+                rej += 1
+            if lat is not None:
+                latencies.append(lat)
+        # A window reaching back before the process started would understate the rate
+        elapsed = min(float(window_sec), max(0.0, now - started_at))
+        total = acc + rej + stale
+        effective = (acc_diff * self.diff_to_hashes / elapsed) if elapsed > 0 else None
+        gap = None
+        if reported_hs and effective is not None:
+            gap = (reported_hs - effective) / reported_hs
+        return ShareWindowStats(
+            window_sec=int(window_sec),
+            elapsed_sec=elapsed,
+            accepted=acc,
+            rejected=rej,
+            stale=stale,
+            reject_ratio=(rej / total) if total else None,
+            stale_ratio=(stale / total) if total else None,
+            accepted_difficulty=acc_diff,
+            effective_hashrate_hs=effective,
+            reported_hashrate_hs=reported_hs,
+            hashrate_gap_ratio=gap,
+            avg_submit_latency_ms=(sum(latencies) / len(latencies)) if latencies else None,
+        )
+
+    def windows(self, reported_hs: Optional[float] = None, windows: Iterable[float] = DEFAULT_WINDOWS) -> List[ShareWindowStats]:
+        now = time.time()
+        return [self.window(w, reported_hs, now) for w in windows]
@@ -0,0 +1,158 @@
+from __future__ import annotations
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from .models import MinerHealth, MinerMetrics, MinerRuntime
+
+
+# Optimistic snapshot attempts before a reader waits for the writer's lock instead
+SNAPSHOT_SPINS = 256
+
+class SeqRecord:
+    """Fixed-field record with a sequence lock for a single writer.
+
+    The writer wraps each group of field updates in ``with record:``; the counter is odd
+    while a write is in progress. ``snapshot()`` copies every field and retries if the
+    counter moved, so readers normally never block the writer. Writes also hold an
+    uncontended lock: it keeps the counter consistent if two writers ever overlap, and
+    a reader that keeps losing the race takes it after SNAPSHOT_SPINS attempts.
+    """
+
+    __slots__ = ("_seq", "_lock")
+    FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self) -> None:
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SeqRecord":
+        self._lock.acquire()
+        self._seq += 1
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._seq += 1
+        self._lock.release()
+
+    def _copy(self) -> Dict[str, Any]:
+        # Nested dicts may be mutated in place by the writer; copy them inside the window
+        values = [getattr(self, f) for f in self.FIELDS]
+        return dict(zip(self.FIELDS, [dict(v) if type(v) is dict else v for v in values]))
+
+    def snapshot(self) -> Dict[str, Any]:
+        for spins in range(1, SNAPSHOT_SPINS + 1):
+            seq = self._seq
+            if not seq & 1:
+                values = self._copy()
+                if self._seq == seq:
+                    return values
+            if spins % 64 == 0:
+                # The writer is mid-update (e.g. parsing a line); let it run
+                time.sleep(0)
+        with self._lock:
+            return self._copy()
+
+
+class MinerStats(SeqRecord):
+    """Values parsed from miner output; written only by the adapter's pump thread."""
+
+    FIELDS = ("hashrate_hs", "hashrate_ts", "accepted", "rejected", "stale", "temperature_c", "power_w", "extra")
+    __slots__ = ("_hashrate_hs",) + FIELDS[1:]
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._hashrate_hs: Optional[float] = None
+        # When the miner last reported a hashrate; the value itself outlives a stalled miner
+        self.hashrate_ts: Optional[float] = None
+        self.accepted: Optional[int] = None
+        self.rejected: Optional[int] = None
+        self.stale: Optional[int] = None
+        self.temperature_c: Optional[float] = None
+        self.power_w: Optional[float] = None
+        self.extra: Dict[str, Any] = {}
+
+    @property
+    def hashrate_hs(self) -> Optional[float]:
+        return self._hashrate_hs
+
+    @hashrate_hs.setter
+    def hashrate_hs(self, value: Optional[float]) -> None:
+        self._hashrate_hs = value
+        self.hashrate_ts = time.time()
+
+
+class MinerState(SeqRecord):
+    """Supervision state of a miner; written only under MinerManager's lock."""
+
+    FIELDS = (
+        "pid", "status", "pool", "uptime_sec", "last_error", "quarantined", "restarts",
+        "effective_hashrate_hs", "cgroup",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.pid: Optional[int] = None
+        self.status = "stopped"
+        self.pool: Optional[str] = None
+        self.uptime_sec = 0.0
+        self.last_error: Optional[str] = None
+        self.quarantined = False
+        self.restarts = 0
+        self.effective_hashrate_hs: Optional[float] = None
+        self.cgroup: Dict[str, Any] = {}
+
+
+class HealthState(SeqRecord):
+    """Performance health of a miner; written only by the watchdog (see health.PerformanceHealth)."""
+
+    FIELDS = (
+        "state", "reason", "since_ts", "baseline_hs", "baseline_minutes", "hashrate_hs", "last_share_ts",
+        "level", "last_action", "last_action_ts", "restarts_last_hour",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.state = "stopped"
+        self.reason: Optional[str] = None
+        self.since_ts: Optional[float] = None
+        self.baseline_hs: Optional[float] = None
+        self.baseline_minutes = 0
+        self.hashrate_hs: Optional[float] = None
+        self.last_share_ts: Optional[float] = None
+        self.level = 0
+        self.last_action: Optional[str] = None
+        self.last_action_ts: Optional[float] = None
+        self.restarts_last_hour = 0
+
+
+def runtime_model(miner_id: str, state: Dict[str, Any]) -> MinerRuntime:
+    return MinerRuntime(
+        id=miner_id,
+        pid=state["pid"],
+        status=state["status"],
+        pool=state["pool"],
+        uptime_sec=state["uptime_sec"],
+        last_error=state["last_error"],
+        quarantined=state["quarantined"],
+        restarts=state["restarts"],
+    )
+
+
+def metrics_model(miner_id: str, stats: Dict[str, Any], state: Dict[str, Any]) -> MinerMetrics:
+    extra = stats.pop("extra")
+    if state["cgroup"]:
+        extra["cgroup"] = state["cgroup"]
+    return MinerMetrics(
+        id=miner_id,
+        effective_hashrate_hs=state["effective_hashrate_hs"],
+        uptime_sec=state["uptime_sec"],
+        extra=extra,
+        **stats,
+    )
+
+
+def health_model(miner_id: str, state: Dict[str, Any]) -> MinerHealth:
+    return MinerHealth(id=miner_id, **state)
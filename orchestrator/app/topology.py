@@ -0,0 +1,140 @@
+from __future__ import annotations
+import glob
+import os
+import re
+from typing import Iterable, List, Optional
+
+from .models import MinerDefinition
+
+
+SYSFS_SYSTEM = "/sys/devices/system"
+PER_NUMA_NODE = "per_numa_node"
+PER_L3_DOMAIN = "per_l3_domain"
+REPLICA_MODES = (PER_NUMA_NODE, PER_L3_DOMAIN)
+# Separates a group id from the instance index in instance ids ("xmrig-main@0")
+INSTANCE_SEP = "@"
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """"0-3,8,10-11" (sysfs cpulist format) -> [0, 1, 2, 3, 8, 10, 11]."""
+    cpus: List[int] = []
+    for part in text.strip().split(","):
+        part = part.strip()
+        if not part:
+            continue
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+    return cpus
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _natural(path: str) -> int:
+    m = re.search(r"(\d+)$", path.rstrip("/"))
+    return int(m.group(1)) if m else 0
+
+
+def online_cpus(sysfs: str = SYSFS_SYSTEM) -> List[int]:
+    text = _read(os.path.join(sysfs, "cpu", "online"))
+    return parse_cpu_list(text) if text else list(range(os.cpu_count() or 1))
+
+
+def numa_nodes(sysfs: str = SYSFS_SYSTEM) -> List[List[int]]:
+    nodes = []
+    for path in sorted(glob.glob(os.path.join(sysfs, "node", "node[0-9]*")), key=_natural):
+        text = _read(os.path.join(path, "cpulist"))
+        cpus = parse_cpu_list(text) if text else []
+        if cpus:
+            nodes.append(cpus)
+    return nodes
+
+
+def l3_domains(sysfs: str = SYSFS_SYSTEM) -> List[List[int]]:
+    """CPU sets sharing an L3 cache (one per CCX/CCD on chiplet parts, per socket elsewhere)."""
+    seen = set()
+    domains = []
+    for cpu_dir in sorted(glob.glob(os.path.join(sysfs, "cpu", "cpu[0-9]*")), key=_natural):
+        for index in glob.glob(os.path.join(cpu_dir, "cache", "index[0-9]*")):
+            if (_read(os.path.join(index, "level")) or "").strip() != "3":
+                continue
+            text = _read(os.path.join(index, "shared_cpu_list"))
+            cpus = tuple(parse_cpu_list(text)) if text else ()
+            if cpus and cpus not in seen:
+                seen.add(cpus)
+                domains.append(list(cpus))
+    return domains
+
+
+def _allowed(d: MinerDefinition, sysfs: str) -> List[int]:
+    if d.cpu_affinity:
+        return sorted({int(c) for c in d.cpu_affinity})
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return online_cpus(sysfs)
+
+
+def _restrict(domains: Iterable[List[int]], allowed: List[int]) -> List[List[int]]:
+    allow = set(allowed)
+    return [c for c in ([x for x in dom if x in allow] for dom in domains) if c]
+
+
+def replica_cpu_sets(d: MinerDefinition, sysfs: str = SYSFS_SYSTEM) -> List[List[int]]:
+    """Disjoint CPU sets, one per instance, for ``d.replicas``.
+
+    ``per_numa_node``/``per_l3_domain`` give one instance per domain that intersects the
+    miner's CPUs (its ``cpu_affinity``, or everything this process may use). A count splits
+    those CPUs into contiguous, near-equal chunks in L3 order, so chunks straddle as few
+    cache domains as possible. Hosts without topology info are one domain.
+    """
+    allowed = _allowed(d, sysfs)
+    mode = d.replicas
+    if mode in REPLICA_MODES:
+        domains = _restrict(numa_nodes(sysfs) if mode == PER_NUMA_NODE else l3_domains(sysfs), allowed)
+        return domains or [allowed]
+    count = int(mode)
+    if count < 1:
+        raise ValueError(f"replicas must be >= 1, got {count}")
+    if count > len(allowed):
+        raise ValueError(f"{count} replicas need at least {count} CPUs, {d.id} has {len(allowed)}")
+    ordered = [c for dom in _restrict(l3_domains(sysfs), allowed) for c in dom]
+    in_domains = set(ordered)
+    ordered += [c for c in allowed if c not in in_domains]
+    size, rest = divmod(len(ordered), count)
+    sets, start = [], 0
+    for i in range(count):
+        end = start + size + (1 if i < rest else 0)
+        sets.append(ordered[start:end])
+        start = end
+    return sets
+
+
+def expand_replicas(d: MinerDefinition, sysfs: str = SYSFS_SYSTEM) -> List[MinerDefinition]:
+    """Instance definitions for a replica group; ``[d]`` when ``replicas`` is unset."""
+    if d.replicas in (None, "", 0):
+        return [d]
+    if not isinstance(d.replicas, int) and d.replicas not in REPLICA_MODES and not str(d.replicas).isdigit():
+        raise ValueError(f"replicas for {d.id} must be a count or one of {', '.join(REPLICA_MODES)}")
+    instances = []
+    for i, cpus in enumerate(replica_cpu_sets(d, sysfs)):
+        instances.append(
+            d.model_copy(
+                update={
+                    "id": f"{d.id}{INSTANCE_SEP}{i}",
+                    "group": d.id,
+                    "replicas": None,
+                    "cpu_affinity": cpus,
+                    "threads": len(cpus),
+                }
+            )
+        )
+    return instances
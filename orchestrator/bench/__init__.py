@@ -0,0 +1 @@
+__all__ = ["fake_miner", "common", "run"]
@@ -0,0 +1,156 @@
+from __future__ import annotations
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import yaml
+
+from ..app.models import MinerDefinition
+
+
+FAKE_MINER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_miner.py")
+FLAVOR_TYPES = {"xmrig": "xmrig", "cpuminer-opt": "cpuminer-opt"}
+
+
+def fake_env(
+    flavor: str = "xmrig",
+    line_rate: float = 2.0,
+    crash_after: float = 0.0,
+    exit_code: int = 1,
+    hashrate: float = 5000.0,
+) -> Dict[str, str]:
+    return {
+        "FAKE_MINER_FLAVOR": flavor,
+        "FAKE_MINER_LINE_RATE": str(line_rate),
+        "FAKE_MINER_CRASH_AFTER": str(crash_after),
+        "FAKE_MINER_EXIT_CODE": str(exit_code),
+        "FAKE_MINER_HASHRATE": str(hashrate),
+        "PYTHONUNBUFFERED": "1",
+    }
+
+
+def fake_definition(miner_id: str, flavor: str = "xmrig", **env_kwargs: Any) -> MinerDefinition:
+    return MinerDefinition(
+        id=miner_id,
+        type=FLAVOR_TYPES[flavor],
+        executable=FAKE_MINER,
+        algo="rx/0" if flavor == "xmrig" else "yescrypt",
+        pool_url="127.0.0.1:3333",
+        wallet="BENCH",
+        env=fake_env(flavor=flavor, **env_kwargs),
+    )
+
+
+def write_config(path: str, log_dir: str, definitions: Sequence[MinerDefinition], **sections: Dict[str, Any]) -> None:
+    """Write an orchestrator config.yaml for the given fake miners.
+
+    Rate limiting is effectively disabled and pool probing is off so neither skews timings;
+    ``sections`` override/extend top-level config sections.
+    """
+    data: Dict[str, Any] = {
+        "api": {
+            "host": "127.0.0.1",
+            "port": 0,
+            "api_key": "bench-key",
+            "rate_limit": {"capacity": 1e12, "refill_per_sec": 1e12},
+        },
+        "telemetry": {"enable_system_metrics": True, "metrics_interval_sec": 5},
+        "pools": {"probe_enabled": False},
+        "logging": {"level": "WARNING", "directory": log_dir},
+        # Keep SQLite state next to the logs, inside the run's scratch directory
+        "journal": {"path": os.path.join(log_dir, "journal.sqlite")},
+        "bench": {"db_path": os.path.join(log_dir, "bench.sqlite")},
+        "miners": [d.model_dump(exclude_none=True) for d in definitions],
+    }
+    for name, values in sections.items():
+        data.setdefault(name, {}).update(values)
+    with open(path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(data, f, sort_keys=False)
+
+
+def percentile(samples: Sequence[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def summarize(samples: Sequence[float], scale: float = 1000.0) -> Dict[str, Any]:
+    """p50/p90/p99/max of ``samples`` (seconds), scaled to milliseconds by default."""
+    def s(v: Optional[float]) -> Optional[float]:
+        return None if v is None else round(v * scale, 3)
+    return {
+        "count": len(samples),
+        "p50_ms": s(percentile(samples, 50)),
+        "p90_ms": s(percentile(samples, 90)),
+        "p99_ms": s(percentile(samples, 99)),
+        "max_ms": s(max(samples) if samples else None),
+    }
+
+
+def run_metadata() -> Dict[str, Any]:
+    from ..app.main import APP_VERSION
+
+    commit = None
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(FAKE_MINER),
+            capture_output=True,
+            text=True,
+            timeout=5,
+        ).stdout.strip() or None
+    except Exception:
+        pass
+    return {
+        "app_version": APP_VERSION,
+        "git_commit": commit,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.time(),
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, sort_keys=True, default=str)
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn on a background thread."""
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0) -> None:
+        import uvicorn
+        from ..app.utils import find_free_port
+
+        self.host = host
+        self.port = port or find_free_port(28000)
+        self.server = uvicorn.Server(uvicorn.Config(app, host=host, port=self.port, log_level="warning", lifespan="on"))
+        self._thread = threading.Thread(target=self.server.run, name="bench-uvicorn", daemon=True)
+
+    def __enter__(self) -> "ServerThread":
+        self._thread.start()
+        deadline = time.time() + 30
+        while not self.server.started:
+            if time.time() > deadline or not self._thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.02)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def split_ints(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v.strip()]
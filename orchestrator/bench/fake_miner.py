@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""Stand-in miner that prints XMRig or cpuminer-opt style output at a fixed line rate.
+
+Accepts (and ignores) the real miners' command-line flags, so it can be used as the
+``executable`` of any miner definition. Behaviour is controlled through environment
+variables, which MinerDefinition.env passes through:
+
+    FAKE_MINER_FLAVOR        xmrig | cpuminer-opt            (default xmrig)
+    FAKE_MINER_LINE_RATE     lines per second                (default 2)
+    FAKE_MINER_HASHRATE      reported H/s                    (default 5000)
+    FAKE_MINER_REJECT_RATE   fraction of rejected shares     (default 0.01)
+    FAKE_MINER_CRASH_AFTER   exit after N seconds, 0 = never (default 0)
+    FAKE_MINER_EXIT_CODE     exit code used for crashes      (default 1)
+    FAKE_MINER_CRASH_MESSAGE last line printed before a crash (default "fake miner: simulated crash")
+
+SIGUSR1 makes it crash immediately with FAKE_MINER_EXIT_CODE; SIGTERM exits cleanly.
+With ``-b HOST:PORT`` (cpuminer-opt's --api-bind) it serves ``summary`` and ``threads``
+like cpuminer-opt's API, closing after each reply unless FAKE_MINER_API_PERSISTENT=1.
+Benchmark flags are honoured offline: cpuminer-opt's ``--time-limit=N`` exits after N
+seconds, XMRig's ``--bench=SIZE`` prints "benchmark finished" after
+FAKE_MINER_BENCH_SEC seconds (default 5).
+"""
+from __future__ import annotations
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Iterator, List
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class LineGenerator:
+    """Endless stream of realistic log lines for one miner flavor."""
+
+    def __init__(self, flavor: str = "xmrig", hashrate: float = 5000.0, reject_rate: float = 0.01, seed: int | None = None) -> None:
+        self.flavor = flavor
+        self.hashrate = hashrate
+        self.reject_rate = reject_rate
+        self.rng = random.Random(seed)
+        self.accepted = 0
+        self.rejected = 0
+        self.stale = 0
+        self.shares = 0
+        self.height = 3_000_000
+
+    def _ts(self) -> str:
+        t = time.time()
+        if self.flavor == "xmrig":
+            return time.strftime("[%Y-%m-%d %H:%M:%S", time.localtime(t)) + f".{int(t * 1000) % 1000:03d}]"
+        return time.strftime("[%Y-%m-%d %H:%M:%S]", time.localtime(t))
+
+    def _rate(self) -> float:
+        return self.hashrate * self.rng.uniform(0.97, 1.03)
+
+    def _xmrig(self) -> str:
+        r = self.rng.random()
+        ts = self._ts()
+        if r < 0.4:
+            return (f"{ts}  miner    speed 10s/60s/15m {self._rate():.1f} {self._rate():.1f} {self._rate():.1f} H/s "
+                    f"max {self.hashrate * 1.05:.1f} H/s")
+        if r < 0.55:
+            self.height += 1
+            return f"{ts}  net      new job from pool.example.com:3333 diff 120001 algo rx/0 height {self.height}"
+        lat = self.rng.randint(20, 120)
+        if self.rng.random() < self.reject_rate:
+            self.rejected += 1
+            return f'{ts}  cpu      rejected ({self.accepted}/{self.rejected}) diff 120001 "Low difficulty share" ({lat} ms)'
+        self.accepted += 1
+        return f"{ts}  cpu      accepted ({self.accepted}/{self.rejected}) diff 120001 ({lat} ms)"
+
+    def _cpuminer(self) -> Iterator[str]:
+        r = self.rng.random()
+        ts = self._ts()
+        if r < 0.3:
+            yield f"{ts} Miner TTF @ {self._rate() / 1000:.2f} kh/s 1m04s, Net TTF @ 1.20 Gh/s 3d02h"
+            return
+        if r < 0.45:
+            cpu = self.rng.randint(0, 7)
+            yield f"{ts} CPU #{cpu}: {self._rate() / 8000:.2f} kH/s"
+            return
+        self.shares += 1
+        diff = self.rng.choice((0.0005, 0.001, 0.002))
+        yield f"{ts} {self.shares}  Submitted Diff {diff:.6f}, Block {self.height}, Job {self.shares:x}"
+        lat = self.rng.randint(20, 120)
+        if self.rng.random() < self.reject_rate:
+            self.rejected += 1
+            yield (f"{ts} {self.shares}  A{self.accepted} S{self.stale} Rejected {self.rejected} B0, "
+                   f"{self.rng.uniform(0.5, 5):.3f} sec ({lat}ms)")
+        else:
+            self.accepted += 1
+            yield (f"{ts} {self.shares}  Accepted {self.accepted} S{self.stale} R{self.rejected} B0, "
+                   f"{self.rng.uniform(0.5, 5):.3f} sec ({lat}ms)")
+
+    def lines(self) -> Iterator[str]:
+        while True:
+            if self.flavor == "xmrig":
+                yield self._xmrig()
+            else:
+                yield from self._cpuminer()
+
+    def take(self, n: int) -> List[str]:
+        it = self.lines()
+        return [next(it) + "\n" for _ in range(n)]
+
+
+class FakeCpuMinerApi:
+    """cpuminer-opt style text API over TCP, fed from a LineGenerator's counters."""
+
+    def __init__(self, gen: "LineGenerator", host: str = "127.0.0.1", port: int = 0, threads: int = 4, persistent: bool = False) -> None:
+        self.gen = gen
+        self.threads = threads
+        self.persistent = persistent
+        self.started = time.time()
+        self.requests = 0
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind((host, port))
+        self.sock.listen(8)
+        self.port = self.sock.getsockname()[1]
+
+    def start(self) -> "FakeCpuMinerApi":
+        threading.Thread(target=self._serve, name="fake-api", daemon=True).start()
+        return self
+
+    def close(self) -> None:
+        self.sock.close()
+
+    def reply(self, command: str) -> str:
+        g = self.gen
+        if command.startswith("summary"):
+            return (
+                f"NAME=cpuminer-opt;VER=23.15;API=1.0;ALGO=yescrypt;CPUS={self.threads};URL=stratum+tcp://pool.example.com:3333;"
+                f"HS={g._rate():.2f};KHS={g.hashrate / 1000:.2f};ACC={g.accepted};REJ={g.rejected};SOL=0;"
+                f"ACCMN=1.2;DIFF=0.001000;TEMP=0.0;FAN=0;FREQ=3600000;UPTIME={int(time.time() - self.started)};TS={int(time.time())}|"
+            )
+        if command.startswith("threads"):
+            return "".join(f"CPU={i};kH/s={g._rate() / self.threads / 1000:.2f}|" for i in range(self.threads))
+        return ""
+
+    def _serve(self) -> None:
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket) -> None:
+        with conn:
+            while True:
+                try:
+                    data = conn.recv(1024)
+                except OSError:
+                    return
+                if not data:
+                    return
+                self.requests += 1
+                conn.sendall(self.reply(data.decode(errors="replace").strip()).encode())
+                if not self.persistent:
+                    return
+
+
+def _arg_value(argv: List[str], name: str) -> str | None:
+    for i, arg in enumerate(argv):
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+    return None
+
+
+def main(argv: List[str]) -> int:
+    flavor = os.environ.get("FAKE_MINER_FLAVOR", "xmrig")
+    rate = max(0.1, _env_float("FAKE_MINER_LINE_RATE", 2.0))
+    crash_after = _env_float("FAKE_MINER_CRASH_AFTER", 0.0)
+    time_limit = float(_arg_value(argv, "--time-limit") or 0)
+    bench_size = _arg_value(argv, "--bench")
+    bench_sec = _env_float("FAKE_MINER_BENCH_SEC", 5.0)
+    exit_code = int(_env_float("FAKE_MINER_EXIT_CODE", 1))
+    gen = LineGenerator(
+        flavor=flavor,
+        hashrate=_env_float("FAKE_MINER_HASHRATE", 5000.0),
+        reject_rate=_env_float("FAKE_MINER_REJECT_RATE", 0.01),
+    )
+    if "--version" in argv:
+        print("XMRig 6.21.0 (fake)" if flavor == "xmrig" else "cpuminer-opt 23.15 (fake)")
+        return 0
+    # cpuminer-opt logs to stderr, XMRig to stdout
+    out = sys.stdout if flavor == "xmrig" else sys.stderr
+    api_bind = _arg_value(argv, "-b") or _arg_value(argv, "--api-bind")
+    if api_bind:
+        host, _, port = api_bind.rpartition(":")
+        FakeCpuMinerApi(
+            gen, host or "127.0.0.1", int(port), persistent=os.environ.get("FAKE_MINER_API_PERSISTENT") == "1"
+        ).start()
+
+    def _crash(signum, frame):
+        out.flush()
+        os._exit(exit_code)
+
+    signal.signal(signal.SIGUSR1, _crash)
+    signal.signal(signal.SIGTERM, lambda s, f: sys.exit(0))
+
+    started = time.monotonic()
+    interval = 1.0 / rate
+    next_at = started
+    lines = gen.lines()
+    if flavor == "xmrig":
+        out.write(f" * ABOUT        XMRig/6.21.0 gcc/11.2.0 (fake, args: {' '.join(argv[1:])[:120]})\n")
+    else:
+        out.write(" cpuminer-opt 23.15 (fake)\n")
+    out.flush()
+    try:
+        while True:
+            now = time.monotonic()
+            if crash_after > 0 and now - started >= crash_after:
+                out.write(os.environ.get("FAKE_MINER_CRASH_MESSAGE", "fake miner: simulated crash") + "\n")
+                out.flush()
+                return exit_code
+            if time_limit > 0 and now - started >= time_limit:
+                return 0
+            if bench_size and now - started >= bench_sec:
+                out.write(f"{gen._ts()}  bench    benchmark finished in {now - started:.3f} seconds (hash sum = 0)\n")
+                out.flush()
+                return 0
+            # Emit whatever is due in one batch so high rates don't need sub-ms sleeps
+            while next_at <= now:
+                out.write(next(lines) + "\n")
+                next_at += interval
+            out.flush()
+            time.sleep(min(0.05, max(0.0, next_at - time.monotonic())))
+    except (BrokenPipeError, KeyboardInterrupt):
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,255 @@
+"""Orchestrator overhead benchmarks driven by the bundled fake miner.
+
+    python -m orchestrator.bench.run --out bench_results.json
+
+Sections (``--sections``, comma separated):
+    parse     MinerAdapter.parse_stdout_line throughput per adapter
+    api       p50/p99 latency of every API route with N fake miners registered
+    crash     crash-to-restart latency through update_statuses()/watchdog()
+    overhead  orchestrator CPU and RSS per managed miner
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+import psutil
+
+from ..app.adapters import CpuMinerOptAdapter, XMRigAdapter
+from ..app.miner_manager import MinerManager
+from ..app.models import MinerDefinition
+from .common import (
+    ServerThread,
+    fake_definition,
+    run_metadata,
+    split_ints,
+    summarize,
+    write_config,
+    write_results,
+)
+from .fake_miner import LineGenerator
+
+
+def bench_parse(lines: int, workdir: str) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    for flavor, cls in (("xmrig", XMRigAdapter), ("cpuminer-opt", CpuMinerOptAdapter)):
+        d = MinerDefinition(id=f"parse-{flavor}", type=flavor, executable="/bin/true", algo="rx/0")
+        adapter = cls(d, workdir)
+        sample = LineGenerator(flavor=flavor, seed=1).take(lines)
+        parse = adapter.parse_stdout_line
+        t0 = time.perf_counter()
+        for line in sample:
+            parse(line)
+        elapsed = time.perf_counter() - t0
+        results[flavor] = {
+            "lines": lines,
+            "seconds": round(elapsed, 6),
+            "lines_per_sec": round(lines / elapsed, 1),
+            "ns_per_line": round(elapsed / lines * 1e9, 1),
+        }
+    return results
+
+
+def _route_targets(
+    app, params: Dict[str, str], skip_prefixes: List[str]
+) -> Tuple[List[Tuple[str, str, str]], Dict[str, str]]:
+    """(method, template, path) per benchmarkable route, and the skipped ones with the reason.
+
+    Routes are only timed when ``params`` fills every path parameter and no request body is
+    needed; otherwise they would only measure a 404/422 response.
+    """
+    from fastapi.routing import APIRoute
+
+    targets, skipped = [], {}
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or any(route.path.startswith(p) for p in skip_prefixes):
+            continue
+        missing = [p.name for p in route.dependant.path_params if p.name not in params]
+        path = route.path
+        for name, value in params.items():
+            path = path.replace("{" + name + "}", value)
+        for method in sorted(route.methods):
+            if missing:
+                skipped[f"{method} {route.path}"] = f"no value for {', '.join(missing)}"
+            elif route.body_field is not None:
+                skipped[f"{method} {route.path}"] = "needs a request body"
+            else:
+                targets.append((method, route.path, path))
+    # Reads first, then control operations, with the global stop last
+    def order(t):
+        return (t[0] != "GET", t[1] == "/api/miners/all/stop", t[1])
+    return sorted(targets, key=order), skipped
+
+
+def bench_api(miners: int, requests: int, control_requests: int, workdir: str, skip_prefixes: List[str]) -> Dict[str, Any]:
+    from ..app.main import create_app
+
+    log_dir = os.path.join(workdir, "api-logs")
+    cfg_path = os.path.join(workdir, "api-config.yaml")
+    defs = [fake_definition(f"api-{i}", line_rate=2.0) for i in range(miners)]
+    # A single-instance replica group, so the /api/groups/{group_id} routes have a target
+    group = fake_definition("api-group", line_rate=2.0).model_copy(update={"replicas": 1})
+    write_config(cfg_path, log_dir, defs + [group])
+    app = create_app(cfg_path)
+    targets, skipped = _route_targets(app, {"miner_id": defs[0].id, "group_id": group.id}, skip_prefixes)
+    results: Dict[str, Any] = {"miners": miners, "groups": 1, "skipped": skipped}
+    with ServerThread(app) as srv:
+        conn = http.client.HTTPConnection(srv.host, srv.port, timeout=30)
+        headers = {"X-API-KEY": "bench-key"}
+        conn.request("POST", "/api/miners/all/start", headers=headers)
+        conn.getresponse().read()
+        for method, template, path in targets:
+            n = requests if method == "GET" else control_requests
+            samples: List[float] = []
+            statuses: Dict[int, int] = {}
+            for _ in range(n):
+                t0 = time.perf_counter()
+                conn.request(method, path, headers=headers)
+                resp = conn.getresponse()
+                resp.read()
+                elapsed = time.perf_counter() - t0
+                # Error responses (e.g. no benchmark job to show) say nothing about the handler
+                if resp.status < 400:
+                    samples.append(elapsed)
+                statuses[resp.status] = statuses.get(resp.status, 0) + 1
+            if samples:
+                results[f"{method} {template}"] = dict(summarize(samples), statuses=statuses)
+            else:
+                skipped[f"{method} {template}"] = "only error responses: " + ", ".join(f"HTTP {c}" for c in sorted(statuses))
+        conn.request("POST", "/api/miners/all/stop", headers=headers)
+        conn.getresponse().read()
+        conn.close()
+    return results
+
+
+def bench_crash(miners: int, duration: float, tick: float, workdir: str) -> Dict[str, Any]:
+    mm = MinerManager(log_directory=os.path.join(workdir, "crash-logs"))
+    rng = random.Random(7)
+    for i in range(miners):
+        mm.register(fake_definition(f"crash-{i}", line_rate=5.0, crash_after=rng.uniform(1.0, 4.0)))
+    mm.start_all()
+
+    exited: Dict[str, Tuple[int, float]] = {}
+    latencies: List[float] = []
+    done = threading.Event()
+
+    def monitor() -> None:
+        # Poll far faster than the watchdog so the exit timestamp is accurate
+        while not done.is_set():
+            now = time.perf_counter()
+            for mid, adapter in list(mm.adapters.items()):
+                proc = adapter.process
+                if proc is None:
+                    continue
+                if mid not in exited:
+                    if proc.poll() is not None:
+                        exited[mid] = (proc.pid, now)
+                elif proc.pid != exited[mid][0] and proc.poll() is None:
+                    latencies.append(now - exited.pop(mid)[1])
+            time.sleep(0.005)
+
+    t = threading.Thread(target=monitor, daemon=True)
+    t.start()
+    end = time.time() + duration
+    while time.time() < end:
+        mm.update_statuses()
+        mm.watchdog()
+        time.sleep(tick)
+    done.set()
+    t.join()
+    quarantined = sum(1 for rt in mm.runtime.values() if rt.quarantined)
+    mm.stop_all()
+    return dict(
+        summarize(latencies),
+        miners=miners,
+        duration_sec=duration,
+        tick_sec=tick,
+        restarts=sum(rt.restarts for rt in mm.runtime.values()),
+        quarantined=quarantined,
+    )
+
+
+def bench_overhead(sizes: List[int], duration: float, line_rate: float, tick: float, workdir: str) -> Dict[str, Any]:
+    proc = psutil.Process()
+    results: Dict[str, Any] = {}
+    for n in sizes:
+        rss_before = proc.memory_info().rss
+        threads_before = proc.num_threads()
+        mm = MinerManager(log_directory=os.path.join(workdir, f"overhead-{n}"))
+        for i in range(n):
+            flavor = "xmrig" if i % 2 == 0 else "cpuminer-opt"
+            mm.register(fake_definition(f"ovh-{n}-{i}", flavor=flavor, line_rate=line_rate))
+        mm.start_all()
+        time.sleep(min(2.0, duration / 4))
+        cpu0 = proc.cpu_times()
+        t0 = time.perf_counter()
+        end = t0 + duration
+        while time.perf_counter() < end:
+            mm.update_statuses()
+            mm.watchdog()
+            time.sleep(tick)
+        elapsed = time.perf_counter() - t0
+        cpu1 = proc.cpu_times()
+        cpu_sec = (cpu1.user - cpu0.user) + (cpu1.system - cpu0.system)
+        rss_after = proc.memory_info().rss
+        results[str(n)] = {
+            "miners": n,
+            "line_rate": line_rate,
+            "cpu_percent_total": round(cpu_sec / elapsed * 100, 3),
+            "cpu_percent_per_miner": round(cpu_sec / elapsed * 100 / n, 4),
+            "rss_delta_mb": round((rss_after - rss_before) / 1048576, 3),
+            "rss_per_miner_kb": round((rss_after - rss_before) / 1024 / n, 1),
+            "threads_per_miner": round((proc.num_threads() - threads_before) / n, 2),
+        }
+        mm.stop_all()
+    return results
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--sections", default="parse,api,crash,overhead")
+    ap.add_argument("--parse-lines", type=int, default=200000)
+    ap.add_argument("--api-miners", type=int, default=20)
+    ap.add_argument("--api-requests", type=int, default=300)
+    ap.add_argument("--control-requests", type=int, default=10)
+    ap.add_argument("--skip-routes", default="/api/debug", help="comma separated path prefixes")
+    ap.add_argument("--crash-miners", type=int, default=10)
+    ap.add_argument("--crash-duration", type=float, default=30.0)
+    ap.add_argument("--overhead-sizes", default="1,10,50")
+    ap.add_argument("--overhead-duration", type=float, default=15.0)
+    ap.add_argument("--line-rate", type=float, default=5.0)
+    ap.add_argument("--tick", type=float, default=2.0, help="background loop interval (main.py uses 2s)")
+    args = ap.parse_args(argv)
+
+    sections = {s.strip() for s in args.sections.split(",") if s.strip()}
+    workdir = tempfile.mkdtemp(prefix="orch-bench-")
+    results: Dict[str, Any] = {"meta": run_metadata(), "params": vars(args)}
+    try:
+        if "parse" in sections:
+            results["parse"] = bench_parse(args.parse_lines, workdir)
+        if "api" in sections:
+            skip = [p for p in args.skip_routes.split(",") if p]
+            results["api"] = bench_api(args.api_miners, args.api_requests, args.control_requests, workdir, skip)
+        if "crash" in sections:
+            results["crash"] = bench_crash(args.crash_miners, args.crash_duration, args.tick, workdir)
+        if "overhead" in sections:
+            results["overhead"] = bench_overhead(
+                split_ints(args.overhead_sizes), args.overhead_duration, args.line_rate, args.tick, workdir
+            )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    write_results(args.out, results)
+    print(f"results written to {args.out}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
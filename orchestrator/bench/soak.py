@@ -0,0 +1,288 @@
+"""Long-running scale and leak soak for the orchestrator.
+
+    python -m orchestrator.bench.soak --miners 300 --duration 3600 --out soak_results.json
+
+Runs the full app (API server, background loop, metrics collector) against hundreds of
+fake miners while injecting random crashes (SIGUSR1), config reloads through the
+ConfigLoader file watch, API traffic and rate-limiter churn from many distinct clients.
+Thread count, open FDs, RSS and tracemalloc totals are sampled over time; after the
+warm-up, a least-squares trend is fitted to each series and the run fails (exit code 1)
+when the projected growth over the measured span exceeds its tolerance.
+"""
+from __future__ import annotations
+import argparse
+import http.client
+import os
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+from .common import ServerThread, fake_definition, run_metadata, write_config, write_results
+
+
+def linear_slope(points: List[Tuple[float, float]]) -> float:
+    n = len(points)
+    if n < 2:
+        return 0.0
+    mx = sum(x for x, _ in points) / n
+    my = sum(y for _, y in points) / n
+    var = sum((x - mx) ** 2 for x, _ in points)
+    if var == 0:
+        return 0.0
+    return sum((x - mx) * (y - my) for x, y in points) / var
+
+
+class Sampler:
+    def __init__(self, interval: float, top_n: int = 10) -> None:
+        self.interval = interval
+        self.top_n = top_n
+        self.proc = psutil.Process()
+        self.samples: List[Dict[str, Any]] = []
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.last: Optional[tracemalloc.Snapshot] = None
+
+    def sample(self, t: float) -> Dict[str, Any]:
+        snap = tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap>"))
+        )
+        self.last = snap
+        traced, _ = tracemalloc.get_traced_memory()
+        s = {
+            "t": round(t, 1),
+            "threads": threading.active_count(),
+            "os_threads": self.proc.num_threads(),
+            "fds": self.proc.num_fds() if hasattr(self.proc, "num_fds") else len(self.proc.open_files()),
+            "rss_mb": round(self.proc.memory_info().rss / 1048576, 2),
+            "traced_mb": round(traced / 1048576, 3),
+            "top": [
+                {"where": str(st.traceback), "size_kb": round(st.size / 1024, 1), "count": st.count}
+                for st in snap.statistics("lineno")[: self.top_n]
+            ],
+        }
+        self.samples.append(s)
+        return s
+
+    def growth_top(self) -> List[Dict[str, Any]]:
+        if not self.baseline or not self.last:
+            return []
+        return [
+            {"where": str(st.traceback), "size_diff_kb": round(st.size_diff / 1024, 1), "count_diff": st.count_diff}
+            for st in self.last.compare_to(self.baseline, "lineno")[: self.top_n]
+        ]
+
+
+class Chaos:
+    """Background drivers: crashes, config rewrites, API requests and limiter churn."""
+
+    def __init__(self, cfg_path: str, log_dir: str, miners: int, args) -> None:
+        self.app = None
+        self.srv: Optional[ServerThread] = None
+        self.cfg_path = cfg_path
+        self.log_dir = log_dir
+        self.miners = miners
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.stop = threading.Event()
+        self.counters = {"crashes": 0, "reloads": 0, "api_requests": 0, "api_errors": 0, "limiter_checks": 0}
+        self.generation = 0
+
+    def definitions(self):
+        # Each reload adds/removes a few miners and changes args on others
+        defs = []
+        for i in range(self.miners):
+            if (i + self.generation) % 50 == 0:
+                continue
+            flavor = "xmrig" if i % 3 else "cpuminer-opt"
+            d = fake_definition(f"soak-{i}", flavor=flavor, line_rate=self.args.line_rate)
+            if (i + self.generation) % 7 == 0:
+                d.extra_args = [f"--soak-generation={self.generation}"]
+            defs.append(d)
+        return defs
+
+    def write(self) -> None:
+        write_config(self.cfg_path, self.log_dir, self.definitions(), logging={"rotate_mb": 1, "keep": 2})
+
+    def crash_loop(self) -> None:
+        mm = self.app.state.miner_manager
+        while not self.stop.wait(1.0):
+            for adapter in list(mm.adapters.values()):
+                proc = adapter.process
+                if proc and proc.poll() is None and self.rng.random() < self.args.crash_rate:
+                    try:
+                        os.kill(proc.pid, signal.SIGUSR1)
+                        self.counters["crashes"] += 1
+                    except OSError:
+                        pass
+
+    def reload_loop(self) -> None:
+        while not self.stop.wait(self.args.reload_interval):
+            self.generation += 1
+            self.write()
+            # mtime granularity: make sure the loader sees a newer file
+            now = time.time()
+            os.utime(self.cfg_path, (now, now))
+            self.counters["reloads"] += 1
+
+    def api_loop(self) -> None:
+        from fastapi.routing import APIRoute
+
+        paths = [
+            r.path for r in self.app.routes
+            if isinstance(r, APIRoute) and "GET" in r.methods and not r.path.startswith("/api/debug")
+        ]
+        conn: Optional[http.client.HTTPConnection] = None
+        interval = 1.0 / max(0.1, self.args.api_rps)
+        while not self.stop.wait(interval):
+            path = self.rng.choice(paths).replace("{miner_id}", f"soak-{self.rng.randrange(self.miners)}")
+            try:
+                if conn is None:
+                    conn = http.client.HTTPConnection(self.srv.host, self.srv.port, timeout=10)
+                conn.request("GET", path, headers={"X-API-KEY": "bench-key"})
+                conn.getresponse().read()
+                self.counters["api_requests"] += 1
+            except Exception:
+                self.counters["api_errors"] += 1
+                conn = None
+
+    def limiter_loop(self) -> None:
+        from ..app import auth
+
+        while not self.stop.wait(0.05):
+            for _ in range(self.args.limiter_clients_per_tick):
+                ip = f"10.{self.rng.randrange(256)}.{self.rng.randrange(256)}.{self.rng.randrange(256)}"
+                auth.rate_limiter.check(ip)
+                self.counters["limiter_checks"] += 1
+
+    def start(self, app, srv: ServerThread) -> List[threading.Thread]:
+        self.app = app
+        self.srv = srv
+        threads = [
+            threading.Thread(target=fn, name=f"soak-{fn.__name__}", daemon=True)
+            for fn in (self.crash_loop, self.reload_loop, self.api_loop, self.limiter_loop)
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+
+TOLERANCES = ("threads", "fds", "rss_mb", "traced_mb")
+
+
+def evaluate(samples: List[Dict[str, Any]], warmup: float, tolerances: Dict[str, float]) -> Dict[str, Any]:
+    measured = [s for s in samples if s["t"] >= warmup]
+    report: Dict[str, Any] = {}
+    if len(measured) < 3:
+        return {"error": "not enough samples after warm-up", "passed": False}
+    span = measured[-1]["t"] - measured[0]["t"]
+    passed = True
+    for key in TOLERANCES:
+        slope = linear_slope([(s["t"], float(s[key])) for s in measured])
+        growth = slope * span
+        ok = growth <= tolerances[key]
+        passed = passed and ok
+        report[key] = {
+            "start": measured[0][key],
+            "end": measured[-1][key],
+            "slope_per_hour": round(slope * 3600, 4),
+            "projected_growth": round(growth, 4),
+            "tolerance": tolerances[key],
+            "ok": ok,
+        }
+    report["passed"] = passed
+    return report
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default="soak_results.json")
+    ap.add_argument("--miners", type=int, default=200)
+    ap.add_argument("--duration", type=float, default=1800.0)
+    ap.add_argument("--warmup", type=float, default=120.0)
+    ap.add_argument("--sample-interval", type=float, default=15.0)
+    ap.add_argument("--line-rate", type=float, default=1.0)
+    ap.add_argument("--crash-rate", type=float, default=0.002, help="per-miner crash probability per second")
+    ap.add_argument("--reload-interval", type=float, default=60.0)
+    ap.add_argument("--api-rps", type=float, default=20.0)
+    ap.add_argument("--limiter-clients-per-tick", type=int, default=50)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--tol-threads", type=float, default=5.0)
+    ap.add_argument("--tol-fds", type=float, default=10.0)
+    ap.add_argument("--tol-rss-mb", type=float, default=32.0)
+    ap.add_argument("--tol-traced-mb", type=float, default=8.0)
+    ap.add_argument("--keep-workdir", action="store_true")
+    args = ap.parse_args(argv)
+
+    tracemalloc.start(1)
+    workdir = tempfile.mkdtemp(prefix="orch-soak-")
+    cfg_path = os.path.join(workdir, "config.yaml")
+    log_dir = os.path.join(workdir, "logs")
+    results: Dict[str, Any] = {"meta": run_metadata(), "params": vars(args)}
+    from ..app.main import create_app
+
+    chaos = None
+    try:
+        # Build the config before the app so the loader reads it at startup
+        chaos = Chaos(cfg_path, log_dir, args.miners, args)
+        chaos.write()
+        app = create_app(cfg_path)
+        with ServerThread(app) as srv:
+            conn = http.client.HTTPConnection(srv.host, srv.port, timeout=60)
+            conn.request("POST", "/api/miners/all/start", headers={"X-API-KEY": "bench-key"})
+            conn.getresponse().read()
+            conn.close()
+
+            threads = chaos.start(app, srv)
+            sampler = Sampler(args.sample_interval)
+            t0 = time.time()
+            while True:
+                t = time.time() - t0
+                s = sampler.sample(t)
+                if sampler.baseline is None and t >= args.warmup:
+                    sampler.baseline = sampler.last
+                print(
+                    f"[soak] t={s['t']:.0f}s threads={s['threads']} fds={s['fds']} "
+                    f"rss={s['rss_mb']}MB traced={s['traced_mb']}MB {chaos.counters}",
+                    file=sys.stderr,
+                )
+                if t >= args.duration:
+                    break
+                time.sleep(min(args.sample_interval, max(0.0, args.duration - t)))
+            chaos.stop.set()
+            for th in threads:
+                th.join(timeout=5)
+            conn = http.client.HTTPConnection(srv.host, srv.port, timeout=60)
+            conn.request("POST", "/api/miners/all/stop", headers={"X-API-KEY": "bench-key"})
+            conn.getresponse().read()
+            conn.close()
+
+        tolerances = {
+            "threads": args.tol_threads,
+            "fds": args.tol_fds,
+            "rss_mb": args.tol_rss_mb,
+            "traced_mb": args.tol_traced_mb,
+        }
+        results["counters"] = chaos.counters
+        results["samples"] = sampler.samples
+        results["top_growth"] = sampler.growth_top()
+        results["verdict"] = evaluate(sampler.samples, args.warmup, tolerances)
+    finally:
+        if chaos:
+            chaos.stop.set()
+        if not args.keep_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    write_results(args.out, results)
+    verdict = results.get("verdict", {})
+    print(f"[soak] results written to {args.out}; passed={verdict.get('passed')}", file=sys.stderr)
+    return 0 if verdict.get("passed") else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,34 @@
+from __future__ import annotations
+import json
+import socketserver
+import threading
+import time
+
+
+class StratumStub:
+    """Local stratum server answering each request line after ``delay_sec``."""
+
+    def __init__(self, delay_sec: float = 0.0) -> None:
+        self.delay_sec = delay_sec
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    req = json.loads(line)
+                    time.sleep(stub.delay_sec)
+                    reply = {"id": req.get("id"), "result": None, "error": None}
+                    self.wfile.write((json.dumps(reply) + "\n").encode())
+
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"stratum+tcp://127.0.0.1:{self.server.server_address[1]}"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self) -> "StratumStub":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
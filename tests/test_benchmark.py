@@ -0,0 +1,46 @@
+import os
+import sys
+import textwrap
+
+from orchestrator.app.benchmark import BenchJob, BenchRunner, BenchStore
+from orchestrator.app.config import BenchConfig
+from orchestrator.app.miner_manager import ADAPTERS
+from orchestrator.app.models import BenchLayout, MinerDefinition
+
+# Warm-up readings, a valid one after warm-up, then only "n/a" lines
+SCRIPT = """
+import sys, time
+if "--version" in sys.argv:
+    print("XMRig 6.21.0")
+    sys.exit(0)
+def speed(v):
+    print(f"[2024-01-01 00:00:00.000]  miner    speed 10s/60s/15m {v} n/a n/a H/s max 9000.0 H/s", flush=True)
+for _ in range(3):
+    speed("9000.0")
+    time.sleep(0.1)
+time.sleep(0.5)
+speed("5000.0")
+for _ in range(10):
+    time.sleep(0.05)
+    speed("n/a")
+"""
+
+
+def test_bench_samples_only_fresh_hashrates(tmp_path):
+    exe = tmp_path / "xmrig"
+    exe.write_text(f"#!{sys.executable}\n" + textwrap.dedent(SCRIPT))
+    os.chmod(exe, 0o755)
+    d = MinerDefinition(id="x", type="xmrig", executable=str(exe), algo="rx/0")
+    runner = BenchRunner(
+        store=BenchStore(str(tmp_path / "bench.sqlite")),
+        get_config=BenchConfig,
+        definitions=lambda: {"x": d},
+        running_miners=lambda: [],
+        log_dir=str(tmp_path),
+        adapters=ADAPTERS,
+    )
+    job = BenchJob(id="j", cases=[], warmup_sec=0.5, duration_sec=5.0)
+    result = runner._run_case(job, d, BenchLayout(threads=1), BenchConfig())
+    assert result["status"] == "ok"
+    assert result["samples"] == 1
+    assert result["hashrate_hs"] == 5000.0
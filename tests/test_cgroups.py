@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from orchestrator.app.cgroups import CgroupManager
+from orchestrator.bench.common import fake_definition
+
+PID = str(os.getpid())
+
+
+def _write(path, text=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+def _read(path):
+    with open(path) as f:
+        return f.read()
+
+
+@pytest.fixture
+def cgroupfs(tmp_path):
+    """cgroup v2 tree with this process in /svc.service, like a systemd unit."""
+    root = tmp_path / "cgroup"
+    _write(str(root / "cgroup.controllers"), "cpuset cpu io memory pids\n")
+    svc = root / "svc.service"
+    _write(str(svc / "cgroup.controllers"), "cpuset cpu memory\n")
+    _write(str(svc / "cgroup.subtree_control"))
+    _write(str(svc / "cgroup.procs"), PID + "\n")
+    proc = tmp_path / "proc_cgroup"
+    _write(str(proc), "0::/svc.service\n")
+    return root, str(proc)
+
+
+def test_default_base_requires_delegation(cgroupfs, monkeypatch):
+    root, proc = cgroupfs
+    # As root every file is writable; only systemd's Delegate= marker counts
+    monkeypatch.setattr(os, "geteuid", lambda: 0)
+    cg = CgroupManager(str(root), proc_cgroup=proc)
+    assert not cg.setup()
+    assert "not delegated" in cg.reason
+    assert not (root / "svc.service" / "orchestrator").exists()
+
+
+def test_delegated_base_moves_only_this_process(cgroupfs, monkeypatch):
+    root, proc = cgroupfs
+    monkeypatch.setattr(CgroupManager, "_delegated", staticmethod(lambda base: True))
+    cg = CgroupManager(str(root), proc_cgroup=proc)
+    assert cg.setup()
+    svc = root / "svc.service"
+    assert _read(str(svc / "orchestrator" / "cgroup.procs")) == PID
+    assert cg.controllers == ["cpu", "cpuset", "memory"]
+    assert _read(str(svc / "miners" / "cgroup.subtree_control")) == "+memory"
+
+
+def test_shared_cgroup_is_left_alone(cgroupfs, monkeypatch):
+    root, proc = cgroupfs
+    _write(str(root / "svc.service" / "cgroup.procs"), f"1\n{PID}\n4242\n")
+    monkeypatch.setattr(CgroupManager, "_delegated", staticmethod(lambda base: True))
+    cg = CgroupManager(str(root), proc_cgroup=proc)
+    assert not cg.setup()
+    assert "2 other processes" in cg.reason
+    assert not (root / "svc.service" / "orchestrator").exists()
+
+
+@pytest.fixture
+def manager(cgroupfs):
+    root, proc = cgroupfs
+    _write(str(root / "miners.slice" / "cgroup.controllers"), "cpuset cpu memory\n")
+    _write(str(root / "miners.slice" / "cgroup.subtree_control"))
+    _write(str(root / "miners.slice" / "miners" / "cpuset.cpus.effective"), "0-7\n")
+    cg = CgroupManager(str(root), base="miners.slice", proc_cgroup=proc)
+    assert cg.setup()
+    return cg
+
+
+def test_limits_written_to_leaf(manager):
+    d = fake_definition("m1").model_copy(update={"cpu_weight": 50, "cpu_max": 1.5, "memory_max": "2G"})
+    procs = manager.prepare(d)
+    leaf = os.path.dirname(procs)
+    assert leaf == manager.leaf("m1")
+    assert _read(os.path.join(leaf, "cpu.weight")) == "50"
+    assert _read(os.path.join(leaf, "cpu.max")) == "150000 100000"
+    assert _read(os.path.join(leaf, "memory.max")) == str(2 << 30)
+
+
+def test_removed_affinity_restores_all_cpus(manager):
+    d = fake_definition("m1").model_copy(update={"cpu_affinity": [0, 1]})
+    leaf = manager.leaf("m1")
+    manager.prepare(d)
+    assert _read(os.path.join(leaf, "cpuset.cpus")) == "0,1"
+    manager.prepare(d.model_copy(update={"cpu_affinity": []}))
+    assert _read(os.path.join(leaf, "cpuset.cpus")) == "0-7"
+
+
+def test_stats_from_accounting_files(manager):
+    leaf = manager.leaf("m1")
+    _write(os.path.join(leaf, "cpu.stat"), "usage_usec 1000\nuser_usec 800\nsystem_usec 200\nnr_throttled 3\nthrottled_usec 50\n")
+    _write(os.path.join(leaf, "memory.current"), "4096\n")
+    _write(os.path.join(leaf, "memory.events"), "low 0\nhigh 0\nmax 2\noom 1\noom_kill 1\n")
+    stats = manager.stats("m1")
+    assert stats["cpu_usage_usec"] == 1000 and stats["cpu_nr_throttled"] == 3
+    assert stats["memory_bytes"] == 4096 and stats["oom_kills"] == 1
@@ -0,0 +1,78 @@
+import pytest
+
+from orchestrator.app.adapters import cpuminer_opt
+from orchestrator.app.adapters.cpuminer_api import CpuMinerApiClient, parse_reply, summary_values
+from orchestrator.app.adapters.cpuminer_opt import CpuMinerOptAdapter
+from orchestrator.app.models import MinerDefinition
+from orchestrator.bench.fake_miner import FakeCpuMinerApi, LineGenerator
+
+
+def _gen(accepted: int = 7) -> LineGenerator:
+    gen = LineGenerator(flavor="cpuminer-opt", hashrate=4000.0, seed=1)
+    gen.accepted = accepted
+    return gen
+
+
+@pytest.mark.parametrize("persistent", [False, True])
+def test_client_detects_connection_reuse(persistent):
+    api = FakeCpuMinerApi(_gen(), persistent=persistent).start()
+    client = CpuMinerApiClient("127.0.0.1", api.port)
+    try:
+        for _ in range(3):
+            rec = parse_reply(client.request("summary"))[0]
+            assert summary_values(rec)["accepted"] == 7
+        assert client.persistent is persistent
+        assert (client._sock is not None) is persistent
+        assert api.requests == 3
+    finally:
+        client.close()
+        api.close()
+
+
+def _adapter(tmp_path) -> CpuMinerOptAdapter:
+    d = MinerDefinition(id="cpu", type="cpuminer-opt", executable="cpuminer", algo="yescrypt", api_telemetry=True)
+    return CpuMinerOptAdapter(d, str(tmp_path))
+
+
+def _launch(adapter: CpuMinerOptAdapter, gen: LineGenerator):
+    """What start() does with the API: build the command, then hand the client to the pump."""
+    cmd = adapter.build_command()
+    port = int(cmd[cmd.index("-b") + 1].rsplit(":", 1)[1])
+    api = FakeCpuMinerApi(gen, port=port).start()
+    poller = adapter.open_telemetry()
+    poller.next_poll = 0.0
+    return api, poller
+
+
+def test_poll_telemetry_fills_metrics(tmp_path):
+    adapter = _adapter(tmp_path)
+    api, poller = _launch(adapter, _gen())
+    try:
+        assert adapter.poll_telemetry(poller) == adapter.definition.api_interval_sec
+        snap = adapter.metrics.snapshot()
+        assert snap["accepted"] == 7
+        assert 3800 < snap["hashrate_hs"] < 4200
+        assert sorted(snap["extra"]["threads_hs"]) == ["0", "1", "2", "3"]
+        assert snap["extra"]["api"]["ok"] and snap["extra"]["api"]["polls"] == 1
+    finally:
+        adapter.close_telemetry(None, poller)
+        api.close()
+    assert poller.client.port not in cpuminer_opt._api_ports
+
+
+def test_old_pump_leaves_the_new_client_alone(tmp_path):
+    adapter = _adapter(tmp_path)
+    old_api, old = _launch(adapter, _gen(accepted=1))
+    new_api, new = _launch(adapter, _gen(accepted=2))
+    try:
+        assert old.client is not new.client and old.client.port != new.client.port
+        # The previous process's pump exits after the restart
+        adapter.close_telemetry(None, old)
+        adapter.poll_telemetry(new)
+        assert adapter.metrics.snapshot()["accepted"] == 2
+        assert new.client.port in cpuminer_opt._api_ports
+        assert old_api.requests == 0
+    finally:
+        adapter.close_telemetry(None, new)
+        old_api.close()
+        new_api.close()
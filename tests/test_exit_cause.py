@@ -0,0 +1,58 @@
+import signal
+
+from orchestrator.app.adapters.cpuminer_opt import CpuMinerOptAdapter
+from orchestrator.app.adapters.xmrig import XMRigAdapter
+from orchestrator.app.exit_cause import CONFIG, CONNECTIVITY, CRASH, RESOURCE, classify
+
+
+def test_oom_kill_wins_over_everything():
+    cause = classify(-signal.SIGSEGV, ["no valid configuration found"], XMRigAdapter.exit_patterns, oom_killed=True)
+    assert cause.category == RESOURCE
+    assert cause.policy.backoff_factor == 4.0
+
+
+def test_signals():
+    assert classify(-signal.SIGILL, ["connection refused"]).category == CONFIG
+    assert classify(-signal.SIGKILL, ["connection refused"]).category == RESOURCE
+    # Other signals only fall back to crash when the output says nothing
+    assert classify(-signal.SIGSEGV, ["connection refused"]).category == CONNECTIVITY
+    cause = classify(-signal.SIGSEGV, [])
+    assert (cause.category, cause.reason) == (CRASH, "killed by SIGSEGV")
+
+
+def test_exec_failure_exit_codes():
+    assert classify(126, []).category == CONFIG
+    assert classify(127, []).category == CONFIG
+    assert not classify(127, []).policy.restart
+    assert classify(1, []).reason == "exit code 1"
+
+
+def test_config_only_from_miner_specific_messages():
+    for line in ("open: No such file or directory", "setsockopt: Invalid argument", "401 Unauthorized", "login failed"):
+        assert classify(1, [line], XMRigAdapter.exit_patterns).category != CONFIG
+    assert classify(1, ["[2024-01-01] config  no valid configuration found"], XMRigAdapter.exit_patterns).category == CONFIG
+    cause = classify(1, ["Try `cpuminer --help' for more information."], CpuMinerOptAdapter.exit_patterns)
+    assert cause.category == CONFIG
+    assert cause.line == "Try `cpuminer --help' for more information."
+    # The same text is no config error for the other miner
+    assert classify(1, ["Try `cpuminer --help' for more information."], XMRigAdapter.exit_patterns).category == CRASH
+
+
+def test_newest_final_line_decides():
+    lines = ["net  connect error: connection refused", "cpu  memory: failed to allocate 2336 MB"]
+    assert classify(1, lines).category == RESOURCE
+    assert classify(1, list(reversed(lines))).category == CONNECTIVITY
+    # Within one line, precedence follows the category order
+    assert classify(1, ["failed to allocate buffer: connection refused"]).category == RESOURCE
+    # Lines before the final ones don't count
+    assert classify(1, lines + ["a", "b", "c"]).category == CRASH
+
+
+def test_startup_fallback_warning_is_not_the_cause():
+    lines = [
+        "randomx  failed to allocate RandomX dataset using 1GB pages",
+        "randomx  dataset ready (4531 ms)",
+        "Segmentation fault",
+    ]
+    assert classify(-signal.SIGSEGV, lines, XMRigAdapter.exit_patterns).category == CRASH
+    assert classify(-signal.SIGSEGV, lines[:1], XMRigAdapter.exit_patterns).category == CRASH
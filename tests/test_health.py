@@ -0,0 +1,43 @@
+from orchestrator.app import health
+from orchestrator.app.adapters.cpuminer_opt import CpuMinerOptAdapter
+from orchestrator.app.adapters.xmrig import XMRigAdapter
+from orchestrator.app.config import HealthConfig
+from orchestrator.app.models import MinerDefinition
+
+START = 1_000_000.0
+
+
+def _stats(hs, hs_ts, accepted):
+    return {"hashrate_hs": hs, "hashrate_ts": hs_ts, "accepted": accepted}
+
+
+def _adapter(tmp_path, cls, type_, **kwargs):
+    return cls(MinerDefinition(id=type_, type=type_, executable=type_, **kwargs), str(tmp_path))
+
+
+def test_reports_periodically(tmp_path):
+    assert _adapter(tmp_path, XMRigAdapter, "xmrig").reports_periodically
+    assert not _adapter(tmp_path, CpuMinerOptAdapter, "cpuminer-opt").reports_periodically
+    assert _adapter(tmp_path, CpuMinerOptAdapter, "cpuminer-opt", api_telemetry=True).reports_periodically
+
+
+def test_share_only_miner_is_not_stalled_between_shares():
+    cfg = HealthConfig(grace_sec=0, stall_after_sec=120, share_stall_sec=1800)
+    h = health.PerformanceHealth()
+    # Hashrate printed with the share accepted at +100 s, then silence until the next one
+    for t in range(0, 1200, 10):
+        stats = _stats(None, None, 0) if t < 100 else _stats(2500.0, START + 100, 1)
+        assert h.evaluate(cfg, START + t, START, stats, can_failover=False, reports_periodically=False) is None
+        assert h.status.state == health.HEALTHY
+
+    # Silence still counts once it outlasts share_stall_sec
+    assert h.evaluate(cfg, START + 1900, START, _stats(2500.0, START + 100, 1), False, False) == health.DETECTED
+    assert h.status.state == health.NO_SHARES
+
+
+def test_periodic_miner_silence_is_a_stall():
+    cfg = HealthConfig(grace_sec=0, stall_after_sec=120, share_stall_sec=1800)
+    h = health.PerformanceHealth()
+    assert h.evaluate(cfg, START + 60, START, _stats(5000.0, START + 60, 1), False) is None
+    assert h.evaluate(cfg, START + 200, START, _stats(5000.0, START + 60, 1), False) == health.DETECTED
+    assert h.status.state == health.STALLED
@@ -0,0 +1,60 @@
+import time
+
+from orchestrator.app.events import Event
+from orchestrator.app.exit_cause import CONNECTIVITY, CRASH, POLICIES, RESOURCE
+from orchestrator.app.journal import EXITED, QUARANTINED, RELEASED, EventJournal
+from orchestrator.app.miner_manager import CRASH_WINDOW_SEC, MinerManager
+from orchestrator.app.models import MinerDefinition
+
+
+def _event(ts, message, miner_id, **ctx):
+    return Event(ts=ts, level="WARN", message=message, ctx=dict(ctx, miner_id=miner_id))
+
+
+def test_crash_state_survives_a_restart(tmp_path):
+    path = str(tmp_path / "events.sqlite")
+    now = time.time()
+    journal = EventJournal(path)
+    for e in [
+        # Too old to count
+        _event(now - CRASH_WINDOW_SEC - 60, EXITED, "crashing", category=CRASH),
+        _event(now - 300, EXITED, "crashing", category=CRASH),
+        _event(now - 200, EXITED, "crashing", category=RESOURCE),
+        _event(now - 100, EXITED, "crashing", category=CRASH),
+        *[_event(now - 50 + i, EXITED, "parked", category=CRASH) for i in range(5)],
+        _event(now - 40, QUARANTINED, "parked"),
+        _event(now - 300, EXITED, "released", category=CRASH),
+        _event(now - 250, QUARANTINED, "released"),
+        _event(now - 200, RELEASED, "released"),
+        _event(now - 10, EXITED, "released", category=CRASH),
+        *[_event(now - 60 + i, EXITED, "offline", category=CONNECTIVITY) for i in range(5)],
+    ]:
+        journal.append(e)
+    journal.close()
+
+    # A new orchestrator process: reopen the file and restore like OrchestratorService does
+    journal = EventJournal(path)
+    skip = [c for c, p in POLICIES.items() if not p.quarantine]
+    state = journal.crash_state(CRASH_WINDOW_SEC, now=now, skip_categories=skip)
+    journal.close()
+    mm = MinerManager(str(tmp_path / "logs"))
+    for mid in ("crashing", "parked", "released", "offline"):
+        mm.register(MinerDefinition(id=mid, type="xmrig", executable="xmrig"))
+    mm.restore_crash_state(state)
+
+    assert mm.restart_history["crashing"] == [now - 300, now - 200, now - 100]
+    assert mm.backoff["crashing"].attempt == 3
+    assert not mm.runtime["crashing"].quarantined
+
+    assert len(mm.restart_history["parked"]) == 5
+    assert mm.runtime["parked"].quarantined
+
+    # Only the exit after the release counts, and the quarantine is over
+    assert mm.restart_history["released"] == [now - 10]
+    assert mm.backoff["released"].attempt == 1
+    assert not mm.runtime["released"].quarantined
+
+    # Pool outages never count towards quarantine
+    assert "offline" not in state
+    assert mm.restart_history["offline"] == []
+    assert mm.backoff["offline"].attempt == 0
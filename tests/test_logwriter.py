@@ -0,0 +1,47 @@
+import os
+
+from orchestrator.app import logrotate
+from orchestrator.app.logwriter import LogWriterOptions, MinerLogWriter
+
+
+def _drain() -> None:
+    logrotate.submit(lambda: None).result(timeout=5)
+
+
+def test_failed_compression_keeps_plain_segment_counted_in_keep(tmp_path, monkeypatch):
+    path = str(tmp_path / "m.out.log")
+
+    def broken(src, dest):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(logrotate, "compress_segment", broken)
+    for i in range(4):
+        rotated = f"{path}.rotating.{os.getpid()}.{i}"
+        with open(rotated, "w") as f:
+            f.write(f"segment {i}\n")
+        logrotate.finalize_rotation(path, rotated, keep=2, compress=True)
+    assert sorted(os.listdir(tmp_path)) == ["m.out.log.1", "m.out.log.2"]
+    with open(path + ".1") as f:
+        assert f.read() == "segment 3\n"
+
+
+def test_writer_finalizes_stale_rotations(tmp_path):
+    path = str(tmp_path / "m.out.log")
+    stale = f"{path}.rotating.999999999.1"
+    with open(stale, "w") as f:
+        f.write("left behind\n")
+    w = MinerLogWriter(path, LogWriterOptions(compress=False))
+    _drain()
+    assert not os.path.exists(stale)
+    with open(path + ".1") as f:
+        assert f.read() == "left behind\n"
+    w.close()
+
+
+def test_close_flushes_buffered_lines(tmp_path):
+    path = str(tmp_path / "m.out.log")
+    w = MinerLogWriter(path, LogWriterOptions(flush_interval_sec=3600))
+    w.write("buffered\n")
+    w.close()
+    with open(path) as f:
+        assert f.read() == "buffered\n"
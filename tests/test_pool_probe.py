@@ -0,0 +1,125 @@
+import threading
+import time
+
+import pytest
+
+from orchestrator.app.config import PoolsConfig
+from orchestrator.app.miner_manager import MinerManager
+from orchestrator.app.pool_probe import PoolProber, PoolSelection, choose_failover, probe_endpoint
+from orchestrator.bench.common import fake_definition
+
+from .stratum import StratumStub
+
+
+@pytest.fixture
+def pools():
+    with StratumStub(0.0) as fast, StratumStub(0.3) as slow:
+        yield fast.url, slow.url
+
+
+def _closed_url() -> str:
+    with StratumStub() as stub:
+        url = stub.url
+    return url
+
+
+def _prober(*urls) -> PoolProber:
+    prober = PoolProber(timeout_sec=2.0, down_after_failures=1)
+    prober.probe(urls)
+    return prober
+
+
+def test_probe_measures_handshake_delay(pools):
+    fast, slow = pools
+    res = probe_endpoint(slow, timeout=2.0)
+    assert res.ok and res.handshake_ms >= 300
+    assert probe_endpoint(fast, timeout=2.0).handshake_ms < 300
+
+
+def test_rank_prefers_fast_then_unknown_then_down(pools):
+    fast, slow = pools
+    down = _closed_url()
+    prober = _prober(slow, fast, down)
+    assert prober.available(down) is False
+    assert prober.rank([down, "127.0.0.1:1", slow, fast]) == [fast, slow, "127.0.0.1:1", down]
+
+
+def test_failover_on_latency_with_margin_and_dwell(pools):
+    fast, slow = pools
+    prober = _prober(slow, fast)
+    policy = PoolsConfig(max_latency_ms=100, switch_margin=0.3, min_dwell_sec=600)
+    now = time.time()
+    sel = PoolSelection(urls=[slow, fast], active=slow, switched_at=now - 1000)
+    assert choose_failover(sel, prober, policy, 0, 0, now)[0] == fast
+    # Hysteresis: too soon after the last switch
+    sel.switched_at = now - 10
+    assert choose_failover(sel, prober, policy, 0, 0, now) == (None, "")
+    # The candidate isn't faster by switch_margin
+    sel.switched_at = now - 1000
+    prober.stats(fast).ewma_ms = prober.stats(slow).ewma_ms * 0.8
+    assert choose_failover(sel, prober, policy, 0, 0, now) == (None, "")
+
+
+def test_failover_on_outage_ignores_dwell(pools):
+    fast, _ = pools
+    down = _closed_url()
+    prober = _prober(fast, down)
+    now = time.time()
+    sel = PoolSelection(urls=[down, fast], active=down, switched_at=now)
+    assert choose_failover(sel, prober, PoolsConfig(), 0, 0, now) == (fast, "pool unreachable")
+
+
+def test_failover_on_reject_ratio(pools):
+    fast, slow = pools
+    prober = _prober(slow, fast)
+    now = time.time()
+    sel = PoolSelection(urls=[fast, slow], active=fast, switched_at=now - 1000)
+    policy = PoolsConfig(max_reject_ratio=0.05, min_shares=20, min_dwell_sec=600)
+    assert choose_failover(sel, prober, policy, 15, 3, now) == (None, "")
+    assert choose_failover(sel, prober, policy, 18, 3, now)[0] == slow
+
+
+def test_watchdog_restarts_failover_outside_lock(tmp_path, pools):
+    fast, _ = pools
+    down = _closed_url()
+    prober = _prober(fast, down)
+    mm = MinerManager(str(tmp_path), prober=prober, get_pools=lambda: PoolsConfig())
+    mm.register(fake_definition("m1").model_copy(update={"pool_url": down, "pools": [fast]}))
+    mm.pool_state["m1"].active = down
+    with mm.runtime["m1"] as rt:
+        rt.status = "running"
+    acquired = []
+
+    def try_lock():
+        ok = mm._lock.acquire(timeout=1.0)
+        if ok:
+            mm._lock.release()
+        acquired.append(ok)
+
+    def restart(mid):
+        # Another thread (an API handler) must be able to take the lock meanwhile
+        t = threading.Thread(target=try_lock)
+        t.start()
+        t.join()
+
+    mm.restart = restart
+    mm.watchdog()
+    assert mm.pool_state["m1"].active == fast
+    assert acquired == [True]
+
+
+def test_start_prefers_pool_url_until_it_is_down(tmp_path, pools):
+    fast, slow = pools
+    down = _closed_url()
+    prober = PoolProber(timeout_sec=2.0, down_after_failures=1)
+    mm = MinerManager(str(tmp_path), prober=prober, get_pools=lambda: PoolsConfig())
+    mm.register(fake_definition("m1").model_copy(update={"pool_url": slow, "pools": [fast, slow]}))
+    mm.register(fake_definition("m2").model_copy(update={"pool_url": down, "pools": [slow, fast]}))
+    mm.register(fake_definition("m3").model_copy(update={"pool_url": None, "pools": [slow, fast]}))
+    prober.probe_all()
+    assert mm.adapters["m1"].definition.endpoints() == [slow, fast]
+    for mid in ("m1", "m2", "m3"):
+        mm._select_pool(mid)
+    assert mm.pool_state["m1"].active == slow
+    assert mm.pool_state["m2"].active == fast
+    assert mm.pool_state["m3"].active == fast
@@ -0,0 +1,39 @@
+import threading
+
+from orchestrator.app import auth
+from orchestrator.app.config import RateLimitConfig
+
+
+def test_evictions_counted_across_shards_under_contention():
+    limiter = auth.RateLimiter(max_clients=16, shards=4)
+
+    def churn(t):
+        for i in range(2000):
+            limiter.check(f"{t}-{i}")
+
+    threads = [threading.Thread(target=churn, args=(t,)) for t in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert limiter.evictions == 8 * 2000 - limiter.size()
+
+
+def test_costs_above_bucket_capacity_are_clamped():
+    cfg = RateLimitConfig(
+        capacity=10,
+        default_cost=50,
+        route_costs={"GET /api/debug/profile": 100, "GET /api/miners": 2},
+        route_buckets={"GET /api/debug/profile": "debug"},
+        buckets={"debug": {"capacity": 40, "refill_per_sec": 1}},
+    )
+    auth.configure_rate_limiting(cfg)
+    try:
+        policy = auth.route_policy
+        assert policy.default_cost == 10
+        assert policy.costs["GET /api/debug/profile"] == 40
+        assert policy.costs["GET /api/miners"] == 2
+        assert policy.costs["POST /api/miners/all/start"] == 10
+        assert auth.rate_limiter.check("c", policy.costs["GET /api/debug/profile"], "debug").allowed
+    finally:
+        auth.configure_rate_limiting(RateLimitConfig())
@@ -0,0 +1,79 @@
+from orchestrator.app.adapters.cpuminer_opt import CpuMinerOptAdapter
+from orchestrator.app.adapters.xmrig import XMRigAdapter
+from orchestrator.app.models import MinerDefinition
+from orchestrator.app.shares import ACCEPTED, REJECTED, STALE, ShareAnalytics
+
+
+def _parse(adapter, lines):
+    for line in lines:
+        with adapter.metrics:
+            adapter.parse_stdout_line(line)
+    return adapter.metrics.snapshot()
+
+
+def test_xmrig_shares(tmp_path):
+    adapter = XMRigAdapter(MinerDefinition(id="x", type="xmrig", executable="xmrig", algo="rx/0"), str(tmp_path))
+    snap = _parse(adapter, [
+        "[2024-05-01 12:00:01.123]  cpu      accepted (1/0) diff 120001 (48 ms)",
+        '[2024-05-01 12:00:09.456]  cpu      rejected (1/1) diff 120001 "Block expired" (40 ms)',
+        '[2024-05-01 12:00:17.789]  cpu      rejected (1/2) diff 120001 "Low difficulty share" (51 ms)',
+        "[2024-05-01 12:00:30.000]  cpu      accepted (2/2) diff 240002 (45 ms)",
+        "[2024-05-01 12:01:00.000]  miner    speed 10s/60s/15m 4286.5 4290.1 n/a H/s max 4322.0 H/s",
+    ])
+    # (N/M) counts stale shares as rejected; metrics keep them apart
+    assert (snap["accepted"], snap["rejected"], snap["stale"]) == (2, 1, 1)
+    assert snap["hashrate_hs"] == 4286.5
+    assert snap["extra"]["hashrate_15m_hs"] is None
+    sh = adapter.shares
+    assert (sh.accepted, sh.rejected, sh.stale) == (2, 1, 1)
+
+
+def test_cpuminer_opt_shares(tmp_path):
+    d = MinerDefinition(id="c", type="cpuminer-opt", executable="cpuminer", algo="yescrypt")
+    adapter = CpuMinerOptAdapter(d, str(tmp_path))
+    snap = _parse(adapter, [
+        "[2024-05-01 12:00:00] 1 Submitted Diff 0.0012345, Block 123456, Job 1a2b",
+        "[2024-05-01 12:00:00] 1 Accepted 1 S0 R0 B0, 3.212 sec (31ms)",
+        "[2024-05-01 12:00:05] 2 Submitted Diff 0.0023, Block 123456, Job 1a2c",
+        "[2024-05-01 12:00:05] 2 A1 Stale 1 R0 B0, 8.120 sec (35ms)",
+        "[2024-05-01 12:00:09] 3 Submitted Diff 0.0031, Block 123457, Job 1a2d",
+        "[2024-05-01 12:00:09] 3 A1 S1 Rejected 1 B0, 4.002 sec (29ms)",
+        "[2024-05-01 12:00:10] CPU #1: 1.25 kH/s",
+        "[2024-05-01 12:00:10] Miner TTF @ 2.50 kh/s 1m, Net TTF @ 1.20 Mh/s 2h",
+    ])
+    assert (snap["accepted"], snap["rejected"], snap["stale"]) == (1, 1, 1)
+    assert snap["hashrate_hs"] == 2500.0
+    assert snap["extra"]["threads_hs"] == {"1": 1250.0}
+    # Submitted difficulties are matched to results in order
+    outcomes = [(o, diff) for _, o, diff, _ in adapter.shares._shares]
+    assert outcomes == [(ACCEPTED, 0.0012345), (STALE, 0.0023), (REJECTED, 0.0031)]
+    assert adapter.shares.diff_to_hashes == 65536.0
+
+
+def test_window_effective_hashrate_and_ratios():
+    sa = ShareAnalytics(diff_to_hashes=2.0)
+    sa.reset(now=1000.0)
+    for ts, outcome, diff in [(1010, ACCEPTED, 100.0), (1020, STALE, 100.0), (1030, ACCEPTED, 300.0), (1040, REJECTED, 100.0)]:
+        sa.record(outcome, difficulty=diff, latency_ms=ts - 1000.0, ts=ts)
+    w = sa.window(60, reported_hs=40.0, now=1060.0)
+    assert (w.accepted, w.rejected, w.stale) == (2, 1, 1)
+    assert w.accepted_difficulty == 400.0
+    # 400 accepted difficulty * 2 hashes over 60 s
+    assert abs(w.effective_hashrate_hs - 800.0 / 60.0) < 1e-9
+    assert abs(w.hashrate_gap_ratio - (40.0 - 800.0 / 60.0) / 40.0) < 1e-9
+    assert (w.reject_ratio, w.stale_ratio) == (0.25, 0.25)
+    assert w.avg_submit_latency_ms == 25.0
+
+    # Shorter window, and a window reaching back before the start uses the real uptime
+    assert (sa.window(35, now=1060.0).accepted, sa.window(35, now=1060.0).rejected) == (1, 1)
+    early = sa.window(3600, now=1040.0)
+    assert early.elapsed_sec == 40.0
+    assert early.effective_hashrate_hs == 800.0 / 40.0
+
+
+def test_reset_starts_a_new_run():
+    sa = ShareAnalytics()
+    sa.record(ACCEPTED, difficulty=1.0, ts=100.0)
+    sa.reset(now=200.0)
+    w = sa.window(60, now=230.0)
+    assert (sa.accepted, w.accepted, w.reject_ratio, w.effective_hashrate_hs) == (0, 0, None, 0.0)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from orchestrator.app.adapters import base
+from orchestrator.app.adapters.xmrig import XMRigAdapter
+from orchestrator.app.state import MinerStats
+from orchestrator.bench.common import fake_definition
+
+
+def test_snapshot_falls_back_to_lock_when_counter_is_stuck():
+    stats = MinerStats()
+    # What a lost increment used to leave behind: odd forever, readers spun without end
+    stats._seq = 1
+    assert stats.snapshot()["accepted"] is None
+
+
+def test_locked_snapshot_waits_for_the_writer():
+    stats = MinerStats()
+    entered = threading.Event()
+
+    def write():
+        with stats:
+            entered.set()
+            stats.accepted = 1
+            time.sleep(0.2)
+            stats.rejected = 1
+
+    t = threading.Thread(target=write)
+    t.start()
+    entered.wait(timeout=5)
+    snap = stats.snapshot()
+    t.join()
+    assert (snap["accepted"], snap["rejected"]) == (1, 1)
+
+
+class _SlowTelemetry(XMRigAdapter):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release = threading.Event()
+        self.block = True
+
+    def poll_telemetry(self, telemetry):
+        if self.block:
+            self.release.wait(timeout=30)
+        return None
+
+
+def test_start_waits_for_the_previous_pump(tmp_path, monkeypatch):
+    monkeypatch.setattr(base, "PUMP_EXIT_TIMEOUT_SEC", 0.2)
+    adapter = _SlowTelemetry(fake_definition("slow", line_rate=20.0), str(tmp_path))
+    adapter.start()
+    old = adapter._pump_thread
+    time.sleep(0.3)
+    adapter.stop()
+    assert old.is_alive()
+    try:
+        adapter.start()
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("started while the previous pump was still writing metrics")
+    assert adapter.process is None
+
+    adapter.release.set()
+    adapter.block = False
+    adapter.start()
+    try:
+        assert not old.is_alive()
+        assert adapter._pump_thread is not old and adapter._pump_thread.is_alive()
+    finally:
+        adapter.stop()
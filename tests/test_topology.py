@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from orchestrator.app.models import MinerDefinition
+from orchestrator.app.topology import expand_replicas, parse_cpu_list, replica_cpu_sets
+
+
+def _write(path, text):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def sysfs(tmp_path, monkeypatch):
+    """8 CPUs on 2 NUMA nodes; the L3 domains pair SMT siblings numbered n and n+4."""
+    root = tmp_path / "system"
+    _write(str(root / "cpu" / "online"), "0-7\n")
+    _write(str(root / "node" / "node0" / "cpulist"), "0-1,4-5\n")
+    _write(str(root / "node" / "node1" / "cpulist"), "2-3,6-7\n")
+    for cpu in range(8):
+        cache = root / "cpu" / f"cpu{cpu}" / "cache"
+        _write(str(cache / "index0" / "level"), "1\n")
+        _write(str(cache / "index0" / "shared_cpu_list"), f"{cpu}\n")
+        _write(str(cache / "index3" / "level"), "3\n")
+        _write(str(cache / "index3" / "shared_cpu_list"), f"{cpu % 4},{cpu % 4 + 4}\n")
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    return str(root)
+
+
+def _miner(replicas, **kwargs):
+    return MinerDefinition(id="m", type="xmrig", executable="xmrig", replicas=replicas, **kwargs)
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-3,8,10-11\n") == [0, 1, 2, 3, 8, 10, 11]
+    assert parse_cpu_list("") == []
+
+
+def test_per_numa_node(sysfs):
+    assert replica_cpu_sets(_miner("per_numa_node"), sysfs) == [[0, 1, 4, 5], [2, 3, 6, 7]]
+
+
+def test_per_l3_domain(sysfs):
+    assert replica_cpu_sets(_miner("per_l3_domain"), sysfs) == [[0, 4], [1, 5], [2, 6], [3, 7]]
+
+
+def test_count_splits_along_l3_domains(sysfs):
+    assert replica_cpu_sets(_miner(2), sysfs) == [[0, 4, 1, 5], [2, 6, 3, 7]]
+    # Uneven: the first chunks take the extra CPU, so one chunk straddles two domains
+    assert replica_cpu_sets(_miner(3), sysfs) == [[0, 4, 1], [5, 2, 6], [3, 7]]
+
+
+def test_cpu_affinity_restricts_domains(sysfs):
+    d = _miner("per_l3_domain", cpu_affinity=[0, 1, 4])
+    assert replica_cpu_sets(d, sysfs) == [[0, 4], [1]]
+    assert replica_cpu_sets(_miner("per_numa_node", cpu_affinity=[2, 3]), sysfs) == [[2, 3]]
+
+
+def test_more_replicas_than_cpus(sysfs):
+    with pytest.raises(ValueError, match="need at least 3 CPUs"):
+        replica_cpu_sets(_miner(3, cpu_affinity=[0, 1]), sysfs)
+    with pytest.raises(ValueError, match=">= 1"):
+        replica_cpu_sets(_miner(-1), sysfs)
+
+
+def test_without_topology_everything_is_one_domain(tmp_path, monkeypatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: {0, 1, 2}, raising=False)
+    assert replica_cpu_sets(_miner("per_l3_domain"), str(tmp_path)) == [[0, 1, 2]]
+    assert replica_cpu_sets(_miner(2), str(tmp_path)) == [[0, 1], [2]]
+
+
+def test_expand_replicas(sysfs):
+    instances = expand_replicas(_miner("per_numa_node", threads=16), sysfs)
+    assert [(d.id, d.group, d.cpu_affinity, d.threads, d.replicas) for d in instances] == [
+        ("m@0", "m", [0, 1, 4, 5], 4, None),
+        ("m@1", "m", [2, 3, 6, 7], 4, None),
+    ]
+    d = _miner(None)
+    assert expand_replicas(d, sysfs) == [d]
+    with pytest.raises(ValueError, match="must be a count"):
+        expand_replicas(_miner("per_socket"), sysfs)
@@ -0,0 +1,37 @@
+from orchestrator.app.config import HealthConfig
+from orchestrator.app.miner_manager import MinerManager
+from orchestrator.app.models import MinerDefinition
+
+
+def _stalled_group(tmp_path, cfg):
+    mm = MinerManager(str(tmp_path), get_health_config=lambda: cfg)
+    mm.register(
+        MinerDefinition(id="g", type="xmrig", executable="xmrig", pool_url="pool:3333", replicas=2, cpu_affinity=[0, 1])
+    )
+    for mid, adapter in mm.adapters.items():
+        adapter.last_start_time = 1.0
+        with adapter.metrics:
+            adapter.metrics.hashrate_hs = 0.0
+        with mm.runtime[mid] as rt:
+            rt.status = "running"
+    restarted = []
+    mm.restart = restarted.append
+    return mm, restarted
+
+
+def test_held_back_health_restart_runs_on_the_next_pass(tmp_path):
+    cfg = HealthConfig(grace_sec=0, stall_after_sec=0, escalate_after_sec=0, failover=False)
+    mm, restarted = _stalled_group(tmp_path, cfg)
+    # Detection, then both instances escalate to a restart in the same pass
+    mm.watchdog()
+    assert restarted == []
+    mm.watchdog()
+    assert restarted == ["g@0"]
+    assert {mm.health[mid].status.last_action for mid in mm.adapters} == {"restart"}
+
+    # Escalation won't ask again for an hour; the held-back sibling still gets its restart
+    cfg.escalate_after_sec = 3600
+    mm.watchdog()
+    assert restarted == ["g@0", "g@1"]
+    mm.watchdog()
+    assert restarted == ["g@0", "g@1"]